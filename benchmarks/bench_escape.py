@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+
+import argparse
+import json
+import sys
+import tempfile
+import time
+
+from benchmarks import corpus
+from benchmarks.bench_stages import collect_strings
+from convert import TAG_REGEX, TEXT_ESCAPES, Escaper, replace_strings
+from docfxmd_class import DocfxMd
+
+
+def collect_texts(dname):
+    doc_md = DocfxMd(dname)
+    for path in doc_md.link_index.index_directory():
+        doc_md.load_file(path)
+    html, _ = collect_strings(doc_md)
+
+    # the plain text between tags is what html_to_md escapes
+    texts = []
+    for string in html:
+        texts.extend(TAG_REGEX.split(string)[::TAG_REGEX.groups + 1])
+
+    names = [itm.name for items in doc_md.uids.items_by_file.values() for itm in items]
+    return texts, names
+
+def bench(func, strings, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for string in strings:
+            func(string)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    return {
+        'seconds': best,
+        'count': len(strings),
+        'per_sec': len(strings) / best,
+    }
+
+def run(dname, repeat):
+    texts, names = collect_texts(dname)
+
+    cases = {
+        'text': (texts, TEXT_ESCAPES, Escaper(TEXT_ESCAPES)),
+        'name': (names, TEXT_ESCAPES, Escaper(TEXT_ESCAPES)),
+    }
+
+    results = {}
+    for name, (strings, escapes, escaper) in cases.items():
+        if any(escaper(string) != replace_strings(string, escapes) for string in strings):
+            raise RuntimeError('escaper output differs for %s' % name)
+
+        results[name] = {
+            'replace_strings': bench(lambda s, e=escapes: replace_strings(s, e), strings, repeat),
+            'escaper': bench(escaper, strings, repeat),
+        }
+    return results
+
+def main(args):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-d', '--dir',
+        action='store', metavar='DIR',
+        help='docfx api directory to benchmark instead of a generated corpus'
+    )
+    corpus.add_arguments(parser)
+    parser.add_argument('--repeat', action='store', type=int, default=5)
+    parser.add_argument('--json',
+        action='store', metavar='PATH',
+        help='write the results as json'
+    )
+    argspace = parser.parse_args(args[1:])
+    if argspace.remarks_size is None:
+        argspace.remarks_size = 12
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        dname = argspace.dir
+        if dname is None:
+            dname = tmpdir
+            corpus.from_arguments(argspace).write(dname)
+        results = run(dname, argspace.repeat)
+
+    print('%-8s %8s %16s %10s %8s' % ('strings', 'count', 'replace_strings', 'escaper', 'speedup'))
+    for name, result in results.items():
+        old = result['replace_strings']['seconds']
+        new = result['escaper']['seconds']
+        print('%-8s %8d %16.4f %10.4f %7.2fx' % (
+            name, result['escaper']['count'], old, new, old / new
+        ))
+
+    if argspace.json is not None:
+        with open(argspace.json, 'w', encoding='utf-8') as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == '__main__':
+    main(sys.argv)
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+
+import argparse
+import json
+import random
+import sys
+import time
+
+from benchmarks.corpus import WORDS
+from convert import html_to_md
+
+
+def remarks(rnd, size):
+    parts = []
+    length = 0
+    while length < size:
+        kind = rnd.randrange(6)
+        words = ' '.join(rnd.choice(WORDS) for _ in range(rnd.randint(4, 16)))
+        if kind == 0:
+            part = '<p>%s <code>%s</code> %s</p>' % (words, rnd.choice(WORDS), words)
+        elif kind == 1:
+            part = '<para>%s <see cref="T:Ns.%s"/> (%s_%s)</para>' % (
+                words, rnd.choice(WORDS).title(), rnd.choice(WORDS), rnd.choice(WORDS)
+            )
+        elif kind == 2:
+            part = '<xref href="Ns.%s" data-throw-if-not-resolved="false"></xref> %s' % (
+                rnd.choice(WORDS).title(), words
+            )
+        elif kind == 3:
+            part = (
+                '<pre><code class="lang-csharp">var %s = new List&lt;int&gt;();\n</code></pre>'
+                % rnd.choice(WORDS)
+            )
+        elif kind == 4:
+            part = '%s <paramref name="%s"/> <b>%s</b> <see langword="null"/>' % (
+                words, rnd.choice(WORDS), rnd.choice(WORDS)
+            )
+        else:
+            part = '<p>%s {braces} | pipe #%d</p>' % (words, rnd.randrange(100))
+        parts.append(part)
+        length += len(part)
+    return '\n'.join(parts)
+
+def pathological(size):
+    count = size // 8
+    return {
+        'unclosed': '<b>' * count,
+        'mismatched': '<b>' * count + '</i>' * count,
+        'raw_tags': '<code>' + '<x>' * count,
+        'open_brackets': '<a ' * count,
+        'long_attribute': '<x href="' + 'a' * size,
+    }
+
+def bench(data, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        html_to_md(data)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    return {
+        'bytes': len(data),
+        'seconds': best,
+        'mb_per_sec': len(data) / best / 1e6,
+    }
+
+def main(args):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes',
+        action='store', default='4096,65536,1048576',
+        help='comma separated input sizes in bytes (default %(default)s)'
+    )
+    parser.add_argument('--seed', action='store', type=int, default=0)
+    parser.add_argument('--repeat', action='store', type=int, default=5)
+    parser.add_argument('--json',
+        action='store', metavar='PATH',
+        help='write the results as json'
+    )
+    argspace = parser.parse_args(args[1:])
+
+    rnd = random.Random(argspace.seed)
+    results = {}
+    for size in map(int, argspace.sizes.split(',')):
+        cases = {'remarks': remarks(rnd, size)}
+        cases.update(pathological(size))
+        for name, data in cases.items():
+            results.setdefault(name, []).append(bench(data, argspace.repeat))
+
+    print('%-16s %10s %10s %8s' % ('input', 'bytes', 'seconds', 'MB/sec'))
+    for name, runs in results.items():
+        for result in runs:
+            print('%-16s %10d %10.4f %8.2f' % (
+                name, result['bytes'], result['seconds'], result['mb_per_sec']
+            ))
+
+    if argspace.json is not None:
+        with open(argspace.json, 'w', encoding='utf-8') as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == '__main__':
+    main(sys.argv)
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import yaml
+
+from benchmarks import corpus
+from documents import CompactLoader
+
+
+def get_loaders():
+    loaders = {
+        'Loader': yaml.Loader,
+        'SafeLoader': yaml.SafeLoader,
+    }
+    if hasattr(yaml, 'CSafeLoader'):
+        loaders['CSafeLoader'] = yaml.CSafeLoader
+    loaders['CompactLoader'] = CompactLoader
+    return loaders
+
+def read_corpus(dname):
+    contents = []
+    for root, _, files in os.walk(dname):
+        for fname in sorted(files):
+            if fname.endswith('.yml'):
+                with open(os.path.join(root, fname), 'rb') as file:
+                    contents.append(file.read())
+    return contents
+
+def bench_loader(loader, contents, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for data in contents:
+            yaml.load(data, Loader=loader)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    size = sum(map(len, contents))
+    return {
+        'seconds': best,
+        'files_per_sec': len(contents) / best,
+        'mb_per_sec': size / best / 1e6,
+    }
+
+def main(args):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-d', '--dir',
+        action='store', metavar='DIR',
+        help='docfx api directory to benchmark instead of a generated corpus'
+    )
+    corpus.add_arguments(parser)
+    parser.add_argument('--repeat', action='store', type=int, default=3)
+    parser.add_argument('--json',
+        action='store', metavar='PATH',
+        help='write the results as json'
+    )
+    argspace = parser.parse_args(args[1:])
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        dname = argspace.dir
+        if dname is None:
+            dname = tmpdir
+            corpus.from_arguments(argspace).write(dname)
+        contents = read_corpus(dname)
+
+    results = {}
+    for name, loader in get_loaders().items():
+        results[name] = bench_loader(loader, contents, argspace.repeat)
+
+    print('%d files, %.2f MB' % (len(contents), sum(map(len, contents)) / 1e6))
+    print('%-16s %10s %12s %10s' % ('loader', 'seconds', 'files/sec', 'MB/sec'))
+    for name, result in results.items():
+        print('%-16s %10.3f %12.1f %10.2f' % (
+            name, result['seconds'], result['files_per_sec'], result['mb_per_sec']
+        ))
+
+    if argspace.json is not None:
+        with open(argspace.json, 'w', encoding='utf-8') as file:
+            json.dump({'files': len(contents), 'loaders': results}, file, indent=2)
+
+
+if __name__ == '__main__':
+    main(sys.argv)
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+
+import argparse
+import gc
+import json
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks import corpus
+from docfxmd_class import DocfxMd
+
+
+def measure(dname, streaming):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+
+    doc_md = DocfxMd(dname, streaming=streaming, compact=streaming)
+    for path in doc_md.link_index.index_directory():
+        if streaming:
+            doc_md.load_index(path)
+        else:
+            doc_md.load_file(path)
+
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'uids': len(doc_md.uids.items),
+        'seconds': elapsed,
+        'retained_mb': current / 1e6,
+        'peak_mb': peak / 1e6,
+        'bytes_per_uid': current / max(len(doc_md.uids.items), 1),
+    }
+
+def main(args):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-d', '--dir',
+        action='store', metavar='DIR',
+        help='docfx api directory to measure instead of a generated corpus'
+    )
+    corpus.add_arguments(parser)
+    parser.add_argument('--json',
+        action='store', metavar='PATH',
+        help='write the results as json'
+    )
+    argspace = parser.parse_args(args[1:])
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        dname = argspace.dir
+        if dname is None:
+            dname = tmpdir
+            corpus.from_arguments(argspace).write(dname)
+
+        results = {
+            'index': measure(dname, True),
+            'full': measure(dname, False),
+        }
+
+    print('%-6s %8s %10s %12s %10s %14s' % (
+        'mode', 'uids', 'seconds', 'retained MB', 'peak MB', 'bytes per uid'
+    ))
+    for name, result in results.items():
+        print('%-6s %8d %10.3f %12.2f %10.2f %14.1f' % (
+            name, result['uids'], result['seconds'], result['retained_mb'],
+            result['peak_mb'], result['bytes_per_uid']
+        ))
+
+    if argspace.json is not None:
+        with open(argspace.json, 'w', encoding='utf-8') as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == '__main__':
+    main(sys.argv)
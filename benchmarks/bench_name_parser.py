@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+
+import argparse
+import json
+import os
+import sys
+import time
+
+from documents import load_yaml
+import name_parser
+
+
+# uids and type strings as docfx writes them for the .NET base class library
+UIDS = [
+    'System.String',
+    'System.Int32',
+    'System.Byte[]',
+    'System.Object.ToString',
+    'System.Object.Equals(System.Object)',
+    'System.Object.ReferenceEquals(System.Object,System.Object)',
+    'System.Collections.Generic.List{System.Int32}',
+    'System.Collections.Generic.List`1',
+    'System.Collections.Generic.List`1.Add(`0)',
+    'System.Collections.Generic.Dictionary{System.String,System.Object}',
+    'System.Collections.Generic.Dictionary{{TKey},{TValue}}',
+    'System.Collections.Generic.IEnumerable{System.Collections.Generic.KeyValuePair'
+        '{System.String,System.Collections.Generic.List{System.Int32}}}',
+    'System.Func{System.Int32,System.Threading.Tasks.Task{System.Boolean}}',
+    'System.Linq.Enumerable.Select``2(System.Collections.Generic.IEnumerable{``0},'
+        'System.Func{``0,``1})',
+    'System.Threading.Tasks.Task{System.Collections.Generic.IReadOnlyList{System.String}}',
+    'System.Span{System.Byte}',
+    'System.Tuple{System.Int32,System.String[]}',
+    'Microsoft.Extensions.DependencyInjection.IServiceCollection',
+    'System.IO.Stream.ReadAsync(System.Byte[],System.Int32,System.Int32,'
+        'System.Threading.CancellationToken)',
+    'System.Collections.Generic.List{{T}}',
+]
+
+
+def collect_types(dname):
+    types = []
+    for root, _, files in os.walk(dname):
+        for fname in files:
+            if not fname.endswith('.yml'):
+                continue
+            with open(os.path.join(root, fname), 'rb') as file:
+                data = load_yaml(file.read(), compact=True)
+            if not isinstance(data, dict):
+                continue
+
+            for item in data.get('items', []):
+                types.append(item['uid'])
+                for key in ('inheritance', 'derivedClasses', 'inheritedMembers'):
+                    types.extend(item.get(key, []))
+                syntax = item.get('syntax', {})
+                types.extend(param['type'] for param in syntax.get('parameters', []))
+                if 'return' in syntax:
+                    types.append(syntax['return']['type'])
+    return types
+
+def bench(func, strings, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for string in strings:
+            try:
+                func(string)
+            except ValueError:
+                pass
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    return {
+        'seconds': best,
+        'count': len(strings),
+        'per_sec': len(strings) / best,
+    }
+
+def main(args):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-d', '--dir',
+        action='store', metavar='DIR',
+        help='docfx api directory to take type strings from instead of the built-in uids'
+    )
+    parser.add_argument('-n', '--number',
+        action='store', type=int, default=2000,
+        help='number of times to repeat the built-in uids (default %(default)s)'
+    )
+    parser.add_argument('--repeat', action='store', type=int, default=5)
+    parser.add_argument('--json',
+        action='store', metavar='PATH',
+        help='write the results as json'
+    )
+    argspace = parser.parse_args(args[1:])
+
+    if argspace.dir is not None:
+        strings = collect_types(argspace.dir)
+    else:
+        strings = UIDS * argspace.number
+
+    results = {
+        'tokenize': bench(name_parser.tokenize, strings, argspace.repeat),
+        'parse': bench(name_parser.parse, strings, argspace.repeat),
+    }
+
+    print('%-10s %10s %10s %12s' % ('function', 'seconds', 'count', 'per sec'))
+    for name, result in results.items():
+        print('%-10s %10.4f %10d %12.1f' % (
+            name, result['seconds'], result['count'], result['per_sec']
+        ))
+
+    if argspace.json is not None:
+        with open(argspace.json, 'w', encoding='utf-8') as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == '__main__':
+    main(sys.argv)
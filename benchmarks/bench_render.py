@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+
+import argparse
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks import corpus
+from docfxmd_class import DocfxMd, TYPE_CLASS, TYPE_ENUM
+from writer import FragmentWriter
+
+
+def load(dname):
+    doc_md = DocfxMd(dname, link_extensions=False)
+    for path in doc_md.link_index.index_directory():
+        doc_md.load_file(path)
+    return doc_md
+
+def largest_page(doc_md, kind):
+    pages = [
+        (len(items), basename) for basename, items in doc_md.uids.items_by_file.items()
+        if len(items) != 0 and items[0].type == kind
+    ]
+    return doc_md.documents.files[max(pages)[1]]
+
+def bench(func, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def run(size, repeat, tmpdir):
+    dname = os.path.join(tmpdir, 'api%d' % size)
+    corpus.CorpusGenerator(
+        namespaces=1,
+        classes=1,
+        members=size,
+        overloads=1,
+        enums=1,
+        enum_fields=size,
+    ).write(dname)
+    doc_md = load(dname)
+
+    results = {}
+    for name, kind in (('class', TYPE_CLASS), ('enum', TYPE_ENUM)):
+        data = largest_page(doc_md, kind)
+
+        def to_string(data=data):
+            doc_md.names.clear()
+            doc_md.docfx_to_md(data)
+
+        def to_file(data=data):
+            doc_md.names.clear()
+            with open(os.path.join(tmpdir, 'page.md'), 'w', encoding='utf-8') as file:
+                doc_md.write_docfx_md(data, FragmentWriter(file))
+
+        def to_stringio(data=data):
+            doc_md.names.clear()
+            doc_md.write_docfx_md(data, FragmentWriter(io.StringIO()))
+
+        results[name] = {
+            'items': len(data['items']),
+            'bytes': len(doc_md.docfx_to_md(data)),
+            'list': bench(to_string, repeat),
+            'stringio': bench(to_stringio, repeat),
+            'file': bench(to_file, repeat),
+        }
+    return results
+
+def main(args):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes',
+        action='store', default='500,2000,8000',
+        help='comma separated member and enum field counts (default %(default)s)'
+    )
+    parser.add_argument('--repeat', action='store', type=int, default=3)
+    parser.add_argument('--json',
+        action='store', metavar='PATH',
+        help='write the results as json'
+    )
+    argspace = parser.parse_args(args[1:])
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for size in map(int, argspace.sizes.split(',')):
+            results[size] = run(size, argspace.repeat, tmpdir)
+
+    print('%-6s %8s %10s %10s %10s %10s %12s' % (
+        'page', 'items', 'bytes', 'list', 'stringio', 'file', 'us/item'
+    ))
+    for size, pages in results.items():
+        for name, result in pages.items():
+            print('%-6s %8d %10d %10.4f %10.4f %10.4f %12.1f' % (
+                name, result['items'], result['bytes'], result['list'],
+                result['stringio'], result['file'], result['list'] / result['items'] * 1e6
+            ))
+
+    if argspace.json is not None:
+        with open(argspace.json, 'w', encoding='utf-8') as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == '__main__':
+    main(sys.argv)
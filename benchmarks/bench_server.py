@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks import corpus
+import docfxmd
+from docfxmd_class import DocfxMd
+from server import PageServer
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+def retained(func):
+    gc.collect()
+    tracemalloc.start()
+    result = func()
+    gc.collect()
+    current = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, current / 1e6
+
+def load_full(dname):
+    doc_md = DocfxMd(dname)
+    for path in doc_md.link_index.index_directory():
+        doc_md.load_file(path)
+    return doc_md
+
+def request(app, path):
+    environ = {'PATH_INFO': path}
+    return b''.join(app(environ, lambda status, headers: None))
+
+def replay(app, requests, seed):
+    # a few pages get most of the requests
+    rnd = random.Random(seed)
+    names = sorted(app.doc_md.link_index.links.keys())
+    rnd.shuffle(names)
+    for _ in range(requests):
+        index = min(int(rnd.paretovariate(1.2)) - 1, len(names) - 1)
+        request(app, '/%s.md' % names[index])
+    return app.stats()
+
+def measure(argspace):
+    corpus.from_arguments(argspace).write('api')
+
+    _, build_seconds = timed(lambda: docfxmd.build_directory('api', 'out'))
+    _, full_mb = retained(lambda: load_full('api'))
+
+    _, cold_seconds = timed(lambda: PageServer('api', compact=True, cache_dir='cache'))
+    app, warm_seconds = timed(lambda: PageServer(
+        'api', compact=True, cache_dir='cache', page_cache_size=argspace.page_cache_size
+    ))
+    _, server_mb = retained(lambda: PageServer('api', compact=True))
+
+    return {
+        'full_build_seconds': build_seconds,
+        'full_model_mb': full_mb,
+        'cold_startup_seconds': cold_seconds,
+        'warm_startup_seconds': warm_seconds,
+        'server_model_mb': server_mb,
+        'server': replay(app, argspace.requests, argspace.seed),
+    }
+
+def print_results(results):
+    print('%-24s %10.3f' % ('full build seconds', results['full_build_seconds']))
+    print('%-24s %10.3f' % ('cold startup seconds', results['cold_startup_seconds']))
+    print('%-24s %10.3f' % ('warm startup seconds', results['warm_startup_seconds']))
+    print('%-24s %10.2f' % ('full model MB', results['full_model_mb']))
+    print('%-24s %10.2f' % ('server model MB', results['server_model_mb']))
+    print('%-24s %10.3f' % ('hit rate', results['server']['hit_rate']))
+    for name, millis in results['server']['render_ms'].items():
+        print('%-24s %10.2f' % ('render ms ' + name, millis))
+
+def main(args):
+    parser = argparse.ArgumentParser()
+    corpus.add_arguments(parser)
+    parser.add_argument('--requests', action='store', type=int, default=2000)
+    parser.add_argument('--page-cache-size', action='store', type=int, default=256)
+    parser.add_argument('--json',
+        action='store', metavar='PATH',
+        help='write the results as json'
+    )
+    argspace = parser.parse_args(args[1:])
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmpdir:
+        os.chdir(tmpdir)
+        try:
+            results = measure(argspace)
+        finally:
+            os.chdir(cwd)
+
+    print_results(results)
+
+    if argspace.json is not None:
+        with open(argspace.json, 'w', encoding='utf-8') as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == '__main__':
+    main(sys.argv)
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import yaml
+
+from benchmarks import corpus
+from convert import html_to_md
+from docfxmd_class import DocfxMd, TYPE_ENUM, TYPE_NAMESPACE
+from documents import is_page
+import name_parser
+
+
+STAGES = (
+    'load_file',
+    'docfx_to_md',
+    'namespace_md',
+    'enum_md',
+    'html_to_md',
+    'name_parser.parse',
+    'write',
+)
+
+
+def best_of(repeat, func):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def stage_result(seconds, count):
+    return {
+        'seconds': seconds,
+        'count': count,
+        'per_sec': count / seconds if seconds != 0 else None,
+    }
+
+def collect_strings(doc_md):
+    html = []
+    types = []
+
+    for data in doc_md.documents.files.values():
+        if not isinstance(data, dict):
+            continue
+
+        for item in data.get('items', []):
+            for key in ('summary', 'remarks', 'description'):
+                if key in item:
+                    html.append(item[key])
+            for key in ('inheritance', 'derivedClasses', 'inheritedMembers'):
+                types.extend(item.get(key, []))
+
+            syntax = item.get('syntax', {})
+            for param in syntax.get('parameters', []):
+                types.append(param['type'])
+                if 'description' in param:
+                    html.append(param['description'])
+            if 'return' in syntax:
+                types.append(syntax['return']['type'])
+                if 'description' in syntax['return']:
+                    html.append(syntax['return']['description'])
+
+    return html, types
+
+def run_stages(dname, repeat):
+    results = {}
+
+    def load():
+        doc_md = DocfxMd(dname, link_extensions=False)
+        for path in doc_md.link_index.index_directory():
+            doc_md.load_file(path)
+        return doc_md
+
+    doc_md = load()
+    results['load_file'] = stage_result(best_of(repeat, load), len(doc_md.documents.files))
+
+    results.update(render_stages(doc_md, repeat))
+    results.update(string_stages(doc_md, repeat))
+    results['write'] = write_stage(doc_md, repeat)
+    return results
+
+def render_stages(doc_md, repeat):
+    pages = {TYPE_NAMESPACE: [], TYPE_ENUM: [], None: []}
+    for basename, data in doc_md.documents.files.items():
+        if not is_page(data) or len(data['items']) == 0:
+            continue
+        items = doc_md.load_page(basename)[1]
+        kind = items[0].type if items[0].type in pages else None
+        pages[kind].append((data, items))
+
+    def render(kind, func):
+        def run():
+            # every repetition starts with the cold caches of a fresh build
+            doc_md.names.clear()
+            for data, items in pages[kind]:
+                func(data, items)
+        return stage_result(best_of(repeat, run), len(pages[kind]))
+
+    return {
+        'docfx_to_md': render(None, doc_md.docfx_to_md),
+        'namespace_md': render(TYPE_NAMESPACE, doc_md.docfx_to_md),
+        'enum_md': render(TYPE_ENUM, doc_md.docfx_to_md),
+    }
+
+def string_stages(doc_md, repeat):
+    html, types = collect_strings(doc_md)
+
+    def convert_html():
+        for string in html:
+            html_to_md(string)
+
+    def parse_types():
+        for string in types:
+            try:
+                name_parser.parse(string)
+            except ValueError:
+                pass
+
+    return {
+        'html_to_md': stage_result(best_of(repeat, convert_html), len(html)),
+        'name_parser.parse': stage_result(best_of(repeat, parse_types), len(types)),
+    }
+
+def write_stage(doc_md, repeat):
+    outputs = []
+    for basename, data in doc_md.documents.files.items():
+        result = doc_md.docfx_to_md(data)
+        if result is not None:
+            outputs.append((basename, result))
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        def write():
+            for basename, result in outputs:
+                path = os.path.join(tmpdir, 'out', basename + '.md')
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, 'w', encoding='utf-8') as file:
+                    file.write(result)
+
+        return stage_result(best_of(repeat, write), len(outputs))
+
+def get_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, check=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def print_results(results, previous=None):
+    if previous is None:
+        print('%-20s %10s %8s %12s' % ('stage', 'seconds', 'count', 'per sec'))
+    else:
+        print('%-20s %10s %10s %8s' % ('stage', 'seconds', 'previous', 'speedup'))
+
+    for stage in STAGES:
+        result = results['stages'][stage]
+        if previous is None:
+            print('%-20s %10.4f %8d %12.1f' % (
+                stage, result['seconds'], result['count'], result['per_sec'] or 0
+            ))
+            continue
+
+        old = previous['stages'].get(stage)
+        if old is None:
+            print('%-20s %10.4f %10s %8s' % (stage, result['seconds'], '-', '-'))
+        else:
+            print('%-20s %10.4f %10.4f %7.2fx' % (
+                stage, result['seconds'], old['seconds'],
+                old['seconds'] / result['seconds'] if result['seconds'] != 0 else 0
+            ))
+
+def main(args):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-d', '--dir',
+        action='store', metavar='DIR',
+        help='docfx api directory to benchmark instead of a generated corpus'
+    )
+    corpus.add_arguments(parser)
+    parser.add_argument('--repeat', action='store', type=int, default=3)
+    parser.add_argument('--json',
+        action='store', metavar='PATH',
+        help='write the results as json'
+    )
+    parser.add_argument('--compare',
+        action='store', metavar='PATH',
+        help='compare against the json results of an earlier run'
+    )
+    argspace = parser.parse_args(args[1:])
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        dname = argspace.dir
+        generator = None
+        if dname is None:
+            dname = os.path.join(tmpdir, 'api')
+            generator = corpus.from_arguments(argspace)
+            generator.write(dname)
+
+        size = 0
+        for root, _, files in os.walk(dname):
+            size += sum(os.path.getsize(os.path.join(root, fname)) for fname in files)
+
+        results = {
+            'meta': {
+                'commit': get_commit(),
+                'python': platform.python_version(),
+                'libyaml': getattr(yaml, '__with_libyaml__', False),
+                'corpus': None if generator is None else {
+                    key: getattr(generator, key) for key in corpus.CORPUS_OPTIONS
+                    if hasattr(generator, key)
+                },
+                'bytes': size,
+                'repeat': argspace.repeat,
+            },
+            'stages': run_stages(dname, argspace.repeat),
+        }
+
+    previous = None
+    if argspace.compare is not None:
+        with open(argspace.compare, 'r', encoding='utf-8') as file:
+            previous = json.load(file)
+    print_results(results, previous)
+
+    if argspace.json is not None:
+        with open(argspace.json, 'w', encoding='utf-8') as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == '__main__':
+    main(sys.argv)
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from benchmarks import corpus
+import docfxmd
+import writer
+
+
+OUTPUT_WRITER = writer.OutputWriter
+
+
+class SlowWriter(OUTPUT_WRITER):
+    # every changed file costs `latency` seconds, like a slow disk or a network filesystem
+    latency = 0.0
+
+    def write(self, path, fragments):
+        time.sleep(self.latency)
+        return super().write(path, fragments)
+
+
+def build(output_name, threads, queue_size, repeat):
+    best = None
+    for _ in range(repeat):
+        shutil.rmtree(output_name, ignore_errors=True)
+        start = time.perf_counter()
+        docfxmd.build_directory(
+            'api', output_name, write_threads=threads, write_queue=queue_size
+        )
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main(args):
+    parser = argparse.ArgumentParser()
+    corpus.add_arguments(parser)
+    parser.add_argument('--latencies',
+        action='store', default='0,0.001,0.005',
+        help='comma separated seconds added to each file write (default %(default)s)'
+    )
+    parser.add_argument('--threads',
+        action='store', default='0,2,4,8',
+        help='comma separated writer thread counts (default %(default)s)'
+    )
+    parser.add_argument('--write-queue', action='store', type=int, default=64)
+    parser.add_argument('--repeat', action='store', type=int, default=3)
+    parser.add_argument('-o', '--output',
+        action='store', metavar='DIR',
+        help='write the pages below DIR instead of a temporary directory, such as a network mount'
+    )
+    parser.add_argument('--json',
+        action='store', metavar='PATH',
+        help='write the results as json'
+    )
+    argspace = parser.parse_args(args[1:])
+
+    cwd = os.getcwd()
+    output_dir = None if argspace.output is None else os.path.abspath(argspace.output)
+    results = []
+    with tempfile.TemporaryDirectory() as tmpdir:
+        os.chdir(tmpdir)
+        try:
+            corpus.from_arguments(argspace).write('api')
+            pages = len(os.listdir('api'))
+            output_name = os.path.join(output_dir or tmpdir, 'bench_write_out')
+
+            # build_directory gets its writer from writer.open_output
+            writer.OutputWriter = SlowWriter
+            for latency in map(float, argspace.latencies.split(',')):
+                SlowWriter.latency = latency
+                for threads in map(int, argspace.threads.split(',')):
+                    seconds = build(output_name, threads, argspace.write_queue, argspace.repeat)
+                    results.append({
+                        'latency': latency,
+                        'threads': threads,
+                        'pages': pages,
+                        'seconds': seconds,
+                        'pages_per_sec': pages / seconds,
+                    })
+            shutil.rmtree(output_name, ignore_errors=True)
+        finally:
+            writer.OutputWriter = OUTPUT_WRITER
+            os.chdir(cwd)
+
+    print('%-10s %8s %8s %10s %10s' % ('latency', 'threads', 'pages', 'seconds', 'pages/sec'))
+    for result in results:
+        print('%-10g %8d %8d %10.3f %10.1f' % (
+            result['latency'], result['threads'], result['pages'],
+            result['seconds'], result['pages_per_sec']
+        ))
+
+    if argspace.json is not None:
+        with open(os.path.join(cwd, argspace.json), 'w', encoding='utf-8') as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == '__main__':
+    main(sys.argv)
@@ -0,0 +1,434 @@
+#!/usr/bin/env python3
+
+import argparse
+import os
+import random
+import re
+import sys
+
+import yaml
+
+import name_parser
+
+
+PRIMITIVES = [
+    'System.Int32',
+    'System.String',
+    'System.Boolean',
+    'System.Double',
+    'System.Object',
+    'System.Byte[]',
+    'System.Collections.Generic.List{System.Int32}',
+    'System.Collections.Generic.Dictionary{System.String,System.Object}',
+    'System.Collections.Generic.IEnumerable'
+        '{System.Collections.Generic.KeyValuePair{System.String,System.Int32}}',
+    'System.Func{System.Int32,System.String}',
+]
+
+GENERIC_WRAPPERS = [
+    'System.Collections.Generic.List{%s}',
+    'System.Collections.Generic.Dictionary{System.String,%s}',
+    'System.Func{%s,System.Threading.Tasks.Task{System.Boolean}}',
+    'System.Tuple{System.Int32,%s}',
+    '%s[]',
+]
+
+PRESETS = {
+    'small': {},
+    'medium': {
+        'namespaces': 8,
+        'classes': 40,
+        'members': 16,
+        'overloads': 6,
+        'enum_fields': 200,
+        'inheritance_depth': 6,
+        'generic_depth': 2,
+    },
+    'large': {
+        'namespaces': 40,
+        'classes': 100,
+        'members': 24,
+        'overloads': 8,
+        'enums': 4,
+        'enum_fields': 500,
+        'inheritance_depth': 8,
+        'generic_depth': 3,
+        'remarks_size': 6,
+    },
+}
+
+CORPUS_OPTIONS = (
+    'namespaces',
+    'classes',
+    'members',
+    'overloads',
+    'enums',
+    'enum_fields',
+    'inheritance_depth',
+    'generic_depth',
+    'remarks_size',
+    'seed',
+)
+
+DEFAULT_OPTIONS = {
+    'namespaces': 4,
+    'classes': 10,
+    'members': 12,
+    'overloads': 3,
+    'enums': 2,
+    'enum_fields': 40,
+    'inheritance_depth': 4,
+    'remarks_size': 2,
+    'generic_depth': 0,
+}
+
+MEMBER_KINDS = ['Constructor', 'Field', 'Property', 'Method']
+
+# {T} references to type parameters, which name_parser only reads inside {{T}}
+TYPE_PARAMETER_REGEX = re.compile(r'\{([A-Za-z_][A-Za-z0-9_]*)\}')
+
+WORDS = (
+    'value item thing widget handle buffer stream node tree index cache entry record '
+    'reader writer builder factory provider context session manager options result'
+).split()
+
+
+class CorpusGenerator:
+    def __init__(self, **kwargs):
+        self.options = {
+            name: kwargs.get(name, default) for name, default in DEFAULT_OPTIONS.items()
+        }
+
+        self.random = random.Random(kwargs.get('seed', 0))
+        self.files = {}
+
+        # uids of every type, the parameters and return values pick from them
+        self.all_types = []
+
+        # type uid -> uids of the methods and properties it declares
+        self.type_members = {}
+
+    def sentence(self, count=8):
+        return ' '.join(self.random.choice(WORDS) for _ in range(count))
+
+    def html(self, paragraphs=1):
+        parts = []
+        for _ in range(paragraphs):
+            kind = self.random.randrange(5)
+            if kind == 0:
+                parts.append('<p>%s <code>%s</code> %s</p>' % (
+                    self.sentence(6), self.random.choice(WORDS), self.sentence(4)
+                ))
+            elif kind == 1:
+                parts.append('%s (see %s_%s) *%s* #%d' % (
+                    self.sentence(10), self.random.choice(WORDS), self.random.choice(WORDS),
+                    self.random.choice(WORDS), self.random.randrange(100)
+                ))
+            elif kind == 2:
+                parts.append('<p>%s</p>\n<p>%s {braces} | pipe</p>' % (
+                    self.sentence(12), self.sentence(5)
+                ))
+            elif kind == 3:
+                parts.append('Returns <code>List&lt;T&gt;</code> or $%d ^ %s' % (
+                    self.random.randrange(100), self.sentence(3)
+                ))
+            else:
+                parts.append(self.sentence(20))
+        return '\n' + '\n'.join(parts) + '\n'
+
+    def type_name(self, ns_types, generic_params=()):
+        name = self._type_name(ns_types, generic_params)
+        if self.options['generic_depth'] != 0:
+            for _ in range(self.random.randrange(self.options['generic_depth'] + 1)):
+                wrapper = self.random.choice(GENERIC_WRAPPERS)
+                # name_parser reads one container per segment, so no arrays of generics
+                if wrapper.endswith('[]') and name.endswith(('}', ']')):
+                    continue
+                name = wrapper % name
+        return name
+
+    def _type_name(self, ns_types, generic_params):
+        choice = self.random.randrange(4)
+        if choice == 0 and len(generic_params) != 0:
+            return '{%s}' % self.random.choice(generic_params)
+        if choice == 1 and len(ns_types) != 0:
+            uid = self.random.choice(ns_types)
+            if '`' in uid:
+                base = uid[:uid.index('`')]
+                return '%s{%s}' % (base, self.random.choice(PRIMITIVES[:3]))
+            return uid
+        return self.random.choice(PRIMITIVES)
+
+    def generate(self):
+        plan = [self.namespace_plan(ns_idx) for ns_idx in range(self.options['namespaces'])]
+        self.all_types = [type_[0] for _, types, _ in plan for type_ in types]
+
+        for ns_name, types, enums in plan:
+            self.namespace_file(ns_name, types, enums)
+
+            prev = []
+            for type_ in types:
+                self.type_file(ns_name, type_, prev)
+                if type_[2] == 'Class':
+                    prev.append(type_[0])
+                    prev = prev[-self.options['inheritance_depth']:]
+
+            for uid, name in enums:
+                self.enum_file(ns_name, uid, name)
+
+        self.files['toc'] = [{'uid': p[0], 'name': p[0]} for p in plan]
+        return self.files
+
+    def namespace_plan(self, ns_idx):
+        # (namespace, [(uid, name, kind, generic) of its types], [(uid, name) of its enums])
+        depth = ns_idx % 3
+        ns_name = 'Corp.Product' + ''.join('.Sub%d' % (ns_idx - d) for d in range(depth))
+        if depth == 0:
+            ns_name += '.Core%d' % ns_idx
+
+        types = []
+        for cls_idx in range(self.options['classes']):
+            generic = cls_idx % 4 == 3
+            kind = ['Class', 'Class', 'Struct', 'Interface'][cls_idx % 4 if not generic else 0]
+            name = 'Type%d%s' % (cls_idx, self.random.choice(WORDS).capitalize())
+            uid = '%s.%s' % (ns_name, name)
+            if generic:
+                uid += '`1'
+            types.append((uid, name, kind, generic))
+
+        enums = []
+        for enum_idx in range(self.options['enums']):
+            name = 'Kind%d' % enum_idx
+            enums.append(('%s.%s' % (ns_name, name), name))
+        return ns_name, types, enums
+
+    def namespace_file(self, ns_name, types, enums):
+        references = []
+        for uid, name, _, _ in types:
+            references.append({
+                'uid': uid,
+                'commentId': 'T:' + uid,
+                'parent': ns_name,
+                'name': name,
+                'nameWithType': name,
+                'fullName': uid,
+            })
+        for uid, name in enums:
+            references.append({'uid': uid, 'commentId': 'T:' + uid, 'name': name})
+        references.append({'uid': 'External.Missing.Type', 'name': 'Type'})
+
+        item = {
+            'uid': ns_name,
+            'commentId': 'N:' + ns_name,
+            'id': ns_name,
+            'children': [t[0] for t in types] + [e[0] for e in enums],
+            'langs': ['csharp', 'vb'],
+            'name': ns_name,
+            'nameWithType': ns_name,
+            'fullName': ns_name,
+            'type': 'Namespace',
+            'assemblies': ['Corp.Product'],
+        }
+        if self.random.randrange(2) == 0:
+            item['summary'] = self.html(1)
+        self.files[ns_name] = {'items': [item], 'references': references}
+
+    def type_file(self, ns_name, type_, bases):
+        uid = type_[0]
+        type_item = self.type_item(ns_name, type_, bases)
+        items = [type_item]
+
+        for mem_idx in range(self.options['members']):
+            mkind = MEMBER_KINDS[mem_idx % 4]
+            overloads = self.options['overloads'] if mkind == 'Method' else 1
+            for over in range(overloads):
+                items.append(self.member_item(ns_name, type_, (mkind, mem_idx // 4, over)))
+
+        type_item['children'] = [item['uid'] for item in items[1:]]
+        self.type_members[uid] = [
+            item['uid'] for item in items if item['type'] in ('Method', 'Property')
+        ]
+        references = [{'uid': p, 'name': p.split('.')[-1]} for p in PRIMITIVES]
+        self.files[uid.replace('`', '-')] = {'items': items, 'references': references}
+
+    def type_item(self, ns_name, type_, bases):
+        uid, name, kind, generic = type_
+        display = name + ('<T>' if generic else '')
+
+        type_item = {
+            'uid': uid,
+            'commentId': 'T:' + uid,
+            'id': uid[len(ns_name) + 1:],
+            'parent': ns_name,
+            'langs': ['csharp', 'vb'],
+            'name': display,
+            'nameWithType': display,
+            'fullName': ns_name + '.' + display,
+            'type': kind,
+            'source': {
+                'remote': {'path': 'src/%s.cs' % name, 'branch': 'main', 'repo': 'x'},
+                'id': name,
+                'path': 'src/%s.cs' % name,
+                'startLine': self.random.randrange(500),
+            },
+            'assemblies': ['Corp.Product'],
+            'namespace': ns_name,
+            'summary': self.html(1),
+            'syntax': {
+                'content': 'public %s %s' % (kind.lower(), display),
+                'content.vb': 'Public %s %s' % (kind, name),
+            },
+        }
+        if self.random.randrange(3) == 0:
+            type_item['remarks'] = self.html(self.options['remarks_size'])
+
+        if kind == 'Class':
+            type_item['inheritance'] = ['System.Object'] + list(bases)
+            members = ['System.Object.ToString', 'System.Object.Equals(System.Object)',
+                'System.Object.GetHashCode']
+            for base in bases:
+                members.extend(self.type_members[base])
+            type_item['inheritedMembers'] = members
+            if self.random.randrange(3) == 0:
+                type_item['derivedClasses'] = [self.random.choice(self.all_types)]
+        return type_item
+
+    def member_item(self, ns_name, type_, member):
+        # member is (kind, number of the member of that kind, overload)
+        uid, name = type_[0], type_[1]
+        generic_params = ('T',) if type_[3] else ()
+        params = self.parameters(member[0], member[2], generic_params)
+        mname, mid = member_name(name, member[0], member[1], params)
+
+        item = {
+            'uid': '%s.%s' % (uid, mid),
+            'commentId': 'M:%s.%s' % (uid, mid),
+            'id': mid,
+            'parent': uid,
+            'langs': ['csharp', 'vb'],
+            'name': mname,
+            'nameWithType': '%s.%s' % (name, mname),
+            'fullName': '%s.%s' % (uid, mname),
+            'type': member[0],
+            'assemblies': ['Corp.Product'],
+            'namespace': ns_name,
+            'summary': self.html(1),
+            'syntax': {'content': 'public void %s' % mname},
+        }
+        if len(params) != 0:
+            item['syntax']['parameters'] = params
+        if member[0] != 'Constructor':
+            ret = {'type': self.type_name(self.all_types, generic_params)}
+            if self.random.randrange(2) == 0:
+                ret['description'] = self.html(1)
+            item['syntax']['return'] = ret
+        if self.random.randrange(4) == 0:
+            item['remarks'] = self.html(self.options['remarks_size'])
+        return item
+
+    def parameters(self, mkind, over, generic_params):
+        params = []
+        for pidx in range(over + (1 if mkind in ('Constructor', 'Method') else 0)):
+            param = {
+                'id': 'arg%d' % pidx,
+                'type': self.type_name(self.all_types, generic_params),
+            }
+            if self.random.randrange(2) == 0:
+                param['description'] = self.html(1)
+            params.append(param)
+        return params
+
+    def enum_file(self, ns_name, uid, name):
+        items = [{
+            'uid': uid,
+            'commentId': 'T:' + uid,
+            'id': name,
+            'parent': ns_name,
+            'name': name,
+            'type': 'Enum',
+            'assemblies': ['Corp.Product'],
+            'namespace': ns_name,
+            'summary': self.html(1),
+            'syntax': {'content': 'public enum ' + name},
+        }]
+        for idx in range(self.options['enum_fields']):
+            field = {
+                'uid': '%s.Value%d' % (uid, idx),
+                'id': 'Value%d' % idx,
+                'parent': uid,
+                'name': 'Value%d' % idx,
+                'type': 'Field',
+                'namespace': ns_name,
+                'syntax': {'content': 'Value%d = %d' % (idx, idx)},
+            }
+            if idx % 3 == 0:
+                field['description'] = self.sentence(6)
+            items.append(field)
+        self.files[uid] = {'items': items}
+
+    def write(self, dname):
+        os.makedirs(dname, exist_ok=True)
+        total = 0
+        for basename, data in self.generate().items():
+            path = os.path.join(dname, basename + '.yml')
+            with open(path, 'w', encoding='utf-8') as file:
+                if isinstance(data, dict):
+                    file.write('### YamlMime:ManagedReference\n')
+                yaml.safe_dump(data, file, default_flow_style=False, sort_keys=False)
+            total += 1
+        return total
+
+
+def display_name(type_uid):
+    # the type as docfx shows it in member names, without namespaces
+    return short_name(name_parser.parse(TYPE_PARAMETER_REGEX.sub(r'\1', type_uid))[0])
+
+def member_name(type_name, mkind, num, params):
+    # (name, id) of the num-th member of its kind, methods and constructors add their signature
+    if mkind == 'Constructor':
+        name = type_name
+        mid = '#ctor'
+    elif mkind == 'Method':
+        name = 'Method%d' % num
+        mid = name
+    else:
+        name = '%s%d' % ('Prop' if mkind == 'Property' else 'field', num)
+        mid = name
+
+    if mkind in ('Constructor', 'Method'):
+        mid += '(%s)' % ','.join(p['type'] for p in params)
+        name += '(%s)' % ', '.join(display_name(p['type']) for p in params)
+    return name, mid
+
+def short_name(ident):
+    return name_parser.tostring(
+        ident[-1:], prepare_sub_ident=lambda string, sub_ident: short_name(sub_ident)
+    )
+
+def add_arguments(parser):
+    parser.add_argument('--preset',
+        action='store', choices=sorted(PRESETS.keys()), default='small',
+        help='corpus size preset, the options below override it'
+    )
+    for name in CORPUS_OPTIONS:
+        parser.add_argument('--' + name.replace('_', '-'), action='store', metavar='N', type=int)
+
+def from_arguments(argspace):
+    kwargs = dict(PRESETS[argspace.preset])
+    for key, val in vars(argspace).items():
+        if key in CORPUS_OPTIONS and val is not None:
+            kwargs[key] = val
+    return CorpusGenerator(**kwargs)
+
+def main(args):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-o', '--output', action='store', metavar='DIR', required=True)
+    add_arguments(parser)
+    argspace = parser.parse_args(args[1:])
+
+    count = from_arguments(argspace).write(argspace.output)
+    print('wrote %d files to %s' % (count, argspace.output))
+
+
+if __name__ == '__main__':
+    main(sys.argv)
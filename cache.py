@@ -0,0 +1,114 @@
+import hashlib
+import marshal
+import os
+import tempfile
+
+
+CACHE_VERSION = 2
+CACHE_SUFFIX = '.marshal'
+
+DEFAULT_CACHE_SIZE = 512 * 1024 * 1024
+
+SCALAR_TYPES = (str, int, float, bool, type(None))
+
+
+def is_plain(data):
+    # marshal also loads code objects and other types, entries are only used when they
+    # hold what the yaml loader builds for docfx documents
+    if isinstance(data, SCALAR_TYPES):
+        return True
+    if isinstance(data, list):
+        return all(is_plain(value) for value in data)
+    if isinstance(data, dict):
+        return all(
+            isinstance(key, SCALAR_TYPES) and is_plain(value) for key, value in data.items()
+        )
+    return False
+
+
+class DocumentCache:
+    def __init__(self, dname, max_size=DEFAULT_CACHE_SIZE):
+        self.dname = dname
+        self.max_size = max_size
+
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, fname, data, compact=False):
+        digest = hashlib.sha1()
+        digest.update(('%d\0%s\0%d\0' % (
+            CACHE_VERSION, os.path.abspath(fname), compact
+        )).encode('utf-8'))
+        digest.update(data)
+        return digest.hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.dname, key[:2], key + CACHE_SUFFIX)
+
+    def get(self, key):
+        path = self.path(key)
+        try:
+            with open(path, 'rb') as file:
+                data = marshal.load(file)
+        except (OSError, EOFError, ValueError, TypeError):
+            data = None
+        if data is None or not is_plain(data):
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        try:
+            # eviction removes the least recently used entries first
+            os.utime(path)
+        except OSError:
+            pass
+        return data
+
+    def put(self, key, data):
+        # documents with values yaml builds objects for, like timestamps, are not cached
+        if not is_plain(data):
+            return False
+        data = marshal.dumps(data)
+
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # written to a temporary file first so concurrent readers never see a partial entry
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as file:
+                file.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        return True
+
+    def evict(self):
+        entries = []
+        total = 0
+
+        for root, _, files in os.walk(self.dname):
+            for fname in files:
+                if not fname.endswith(CACHE_SUFFIX):
+                    continue
+                path = os.path.join(root, fname)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime_ns, stat.st_size, path))
+                total += stat.st_size
+
+        removed = 0
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_size:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        return removed
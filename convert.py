@@ -2,8 +2,39 @@ import re
 
 
 TAG_CODE = 'code'
+TAG_C = 'c'
+TAG_PRE = 'pre'
+TAG_BR = 'br'
+TAG_A = 'a'
+TAG_XREF = 'xref'
+TAG_SEE = 'see'
+TAG_SEEALSO = 'seealso'
+TAG_PARAMREF = 'paramref'
+TAG_TYPEPARAMREF = 'typeparamref'
 
-TAG_REGEX = re.compile(r'<(/?)([A-Za-z]+)>')
+# opening and closing markdown of tags that only change the style of their content
+STYLE_TAGS = {
+    'b': ('**', '**'),
+    'strong': ('**', '**'),
+    'i': ('*', '*'),
+    'em': ('*', '*'),
+}
+
+# tags whose content is copied without escaping and without looking at nested tags
+RAW_TAGS = {
+    TAG_CODE: ('`', '`'),
+    TAG_C: ('`', '`'),
+    TAG_PRE: ('\n```\n', '\n```\n'),
+}
+
+# table cells are one line, code blocks in them stay inline html
+CELL_RAW_TAGS = {**RAW_TAGS, TAG_PRE: ('<code>', '</code>')}
+
+REFERENCE_TAGS = frozenset([TAG_XREF, TAG_SEE, TAG_SEEALSO])
+
+TAG_REGEX = re.compile(r'<(/?)([A-Za-z][A-Za-z0-9]*)(\s[^<>]*?)?(/?)>')
+ATTR_REGEX = re.compile(r'''([A-Za-z_:][-\w:.]*)\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s"'=<>`]+))''')
+CREF_PREFIX_REGEX = re.compile(r'^[A-Za-z]:')
 
 
 def replace_strings(string, strings):
@@ -11,57 +42,222 @@ def replace_strings(string, strings):
         string = string.replace(key, val)
     return string
 
+
+class Escaper:
+    def __init__(self, strings):
+        if '' in strings:
+            raise ValueError('cannot escape the empty string')
+
+        self.strings = dict(strings)
+        self.items = tuple(self.strings.items())
+
+        keys = sorted(self.strings, key=len, reverse=True)
+        self.regex = re.compile('|'.join(map(re.escape, keys)))
+        self.table = None
+        if all(len(key) == 1 for key in keys):
+            self.table = str.maketrans(self.strings)
+
+        # replacing one character after the other only matches a single pass
+        # when no replacement contains a character that is replaced later
+        self.chain = self.table is not None and not any(
+            later in val
+            for idx, (_, val) in enumerate(self.items)
+            for later, _ in self.items[idx + 1:]
+        )
+
+    def __call__(self, string):
+        if self.regex.search(string) is None:
+            return string
+
+        # str.replace runs in C and leaves absent keys at the cost of a scan,
+        # which beats translate and sub once the replacements are multi-character
+        if self.chain:
+            for key, val in self.items:
+                string = string.replace(key, val)
+            return string
+
+        if self.table is not None:
+            return string.translate(self.table)
+        return self.regex.sub(self._replace, string)
+
+    def _replace(self, match):
+        return self.strings[match[0]]
+
+
+TEXT_ESCAPES = {
+    '#': r'\#',
+    '$': r'\$',
+    '(': r'\(',
+    ')': r'\)',
+    '*': r'\*',
+    '<': '&lt;',
+    '>': '&gt;',
+    '^': r'\^',
+    '_': r'\_',
+    '{': r'\{',
+    '|': r'\|',
+    '}': r'\}',
+}
+
+escape_text = Escaper(TEXT_ESCAPES)
+escape_cell = Escaper({'|': r'\|'})
+
 def text_to_md(data):
     # TODO: better escapes
-    result = replace_strings(data, {
-        '#': r'\#',
-        '$': r'\$',
-        '(': r'\(',
-        ')': r'\)',
-        '*': r'\*',
-        '<': '&lt;',
-        '>': '&gt;',
-        '^': r'\^',
-        '_': r'\_',
-        '{': r'\{',
-        '|': r'\|',
-        '}': r'\}',
-    })
-    return result
+    return escape_text(data)
 
 def newline_to_br(data):
     return data.strip().replace('\n', '<br/>')
 
-def html_to_md(data):
-    result = ''
-    open_tags = []
+def parse_attributes(string):
+    if string is None:
+        return {}
+    return {
+        match[1].lower(): match[2] or match[3] or match[4] or ''
+        for match in ATTR_REGEX.finditer(string)
+    }
+
+def short_name(uid):
+    return uid.split('(', 1)[0].rsplit('.', 1)[-1]
+
+
+class TagStack:
+    # the open tags with the markdown that closes each of them
+    def __init__(self):
+        self.stack = []
+        self.open_counts = {}
+
+    def push(self, tag, closer):
+        self.stack.append((tag, closer))
+        self.open_counts[tag] = self.open_counts.get(tag, 0) + 1
+
+    def pop(self):
+        tag, closer = self.stack.pop()
+        self.open_counts[tag] -= 1
+        return closer
+
+    def close(self, tag):
+        # the closers of the tag and the tags opened inside it
+        if self.open_counts.get(tag, 0) == 0:
+            return
+        while True:
+            open_tag = self.stack[-1][0]
+            yield self.pop()
+            if open_tag == tag:
+                break
+
+    def close_all(self):
+        while len(self.stack) != 0:
+            yield self.pop()
+
+
+def html_to_md(data, resolve_xref=None, cell=False):
+    return ''.join(html_fragments(data, resolve_xref, cell))
+
+def html_fragments(data, resolve_xref=None, cell=False):
+    # unknown tags are dropped and their content kept, closing tags that were
+    # never opened are dropped and closing an outer tag closes the inner ones.
+    # cell renders the content of a table cell, where | in raw text would end the cell
+    raw_tags = CELL_RAW_TAGS if cell else RAW_TAGS
+    escape_raw = escape_cell if cell else str
+    tags = TagStack()
+    raw = None
+    skip_next = False
     last = 0
 
     for match in TAG_REGEX.finditer(data):
-        if match[1] == '':
-            prev_tag = open_tags[-1].lower() if len(open_tags) != 0 else None
-            tag = match[2].lower()
-
-            if prev_tag == TAG_CODE:
-                result += '`%s`' % data[last:match.start()]
-            else:
-                result += text_to_md(data[last:match.start()])
-            last = match.end()
-            open_tags.append(match[2])
-        else:
-            prev_tag = open_tags.pop().lower()
-            tag = match[2].lower()
-            if prev_tag != tag:
-                raise ValueError()
-
-            prev_tag = open_tags[-1].lower() if len(open_tags) != 0 else None
-            tag = match[2].lower()
-
-            if tag == TAG_CODE:
-                result += '`%s`' % data[last:match.start()]
-            else:
-                result += text_to_md(data[last:match.start()])
-            last = match.end()
-
-    result += text_to_md(data[last:])
-    return result
+        closing = match[1]
+        tag = match[2].lower()
+
+        if raw is not None:
+            if closing and tag == raw:
+                yield escape_raw(data[last:match.start()])
+                last = match.end()
+                raw = None
+                yield tags.pop()
+            elif raw == TAG_PRE and tag == TAG_CODE:
+                # docfx wraps code blocks in <pre><code>
+                yield escape_raw(data[last:match.start()])
+                last = match.end()
+            continue
+
+        if last != match.start():
+            yield escape_text(data[last:match.start()])
+        last = match.end()
+
+        if skip_next:
+            skip_next = False
+        elif closing:
+            yield from tags.close(tag)
+        elif tag == TAG_BR:
+            yield '<br/>'
+        elif tag in REFERENCE_TAGS or tag in (TAG_PARAMREF, TAG_TYPEPARAMREF):
+            fragment, skip_next = _open_reference(tags, tag, match, data, resolve_xref)
+            yield fragment
+        elif not match[4]:
+            yield _open_tag(tags, tag, parse_attributes(match[3]), raw_tags)
+            if tag in raw_tags:
+                raw = tag
+
+    yield escape_raw(data[last:]) if raw is not None else escape_text(data[last:])
+
+    yield from tags.close_all()
+
+def _open_reference(tags, tag, match, data, resolve_xref):
+    # returns the fragment of the reference and whether the next tag closes it
+    self_closing = match[4]
+
+    # <xref href="..."></xref> is how docfx writes references without text
+    following = TAG_REGEX.match(data, match.end())
+    empty = self_closing or (
+        following is not None and following[1] and following[2].lower() == tag
+    )
+
+    fragment, closer = _reference(tag, parse_attributes(match[3]), empty, resolve_xref)
+    if not empty:
+        tags.push(tag, closer)
+    return fragment, not self_closing and empty
+
+def _open_tag(tags, tag, attributes, raw_tags):
+    opener, closer = '', ''
+    if tag in raw_tags:
+        opener, closer = raw_tags[tag]
+    elif tag in STYLE_TAGS:
+        opener, closer = STYLE_TAGS[tag]
+    elif tag == TAG_A and attributes.get('href'):
+        opener, closer = '[', '](%s)' % attributes['href']
+    tags.push(tag, closer)
+    return opener
+
+def _reference(tag, attributes, empty, resolve_xref):
+    if tag in (TAG_PARAMREF, TAG_TYPEPARAMREF):
+        name = attributes.get('name')
+        return ('`%s`' % name if name else ''), ''
+
+    if 'langword' in attributes:
+        return '`%s`' % attributes['langword'], ''
+
+    uid = attributes.get('cref')
+    if uid is not None:
+        uid = CREF_PREFIX_REGEX.sub('', uid)
+    elif tag == TAG_XREF:
+        uid = attributes.get('href')
+    elif attributes.get('href'):
+        # <see href="..."> links to a url
+        return _link(escape_text(attributes['href']), attributes['href'], empty)
+
+    if not uid:
+        return '', ''
+
+    name, link = None, None
+    if resolve_xref is not None:
+        name, link = resolve_xref(uid)
+    return _link(escape_text(name if name is not None else short_name(uid)), link, empty)
+
+def _link(text, link, empty):
+    # the whole link of empty tags, otherwise what goes around the content of the tag
+    if link is None:
+        return (text if empty else ''), ''
+    if empty:
+        return '[%s](%s)' % (text, link), ''
+    return '[', '](%s)' % link
@@ -1,58 +1,421 @@
 #!/usr/bin/env python3
 
 import argparse
+import contextlib
+import gc
+import multiprocessing
 import os
 import pathlib
 import sys
+import time
 
+from cache import DocumentCache, DEFAULT_CACHE_SIZE
 from docfxmd_class import DocfxMd
+from documents import is_page
+from manifest import Manifest, MANIFEST_NAME, hash_fragments, stat_file
+from memo import DEFAULT_MEMO_SIZE
+from namespaces import namespace_index_pages, write_namespace_index_md
+from stats import BuildStats, STAGE_RENDER, STAGE_WRITE, STAGE_TOTAL
+from writer import FragmentWriter, OutputWriter, PageCollector, ThreadedWriter, DEFAULT_MAX_PENDING
+from writer import WRITTEN, UNCHANGED, DELETED, FORMAT_DIRECTORY, OUTPUT_FORMATS
+from writer import open_output, output_format
+from watch import Watcher, DEFAULT_WATCH_INTERVAL
+
+
+# set in each worker process, either inherited through fork or sent once per worker
+_worker_doc_md = None #pylint: disable=invalid-name
+_worker_writer = None #pylint: disable=invalid-name
 
 
 def build_directory(dname, output_name, **kwargs):
+    format_name = kwargs.get('output_format') or output_format(output_name)
+    if format_name != FORMAT_DIRECTORY and kwargs.get('incremental', False):
+        raise ValueError('incremental builds need a directory output')
+
+    writer = open_output(output_name, format_name)
+    try:
+        if writer.stdout:
+            # progress messages would end up between the pages otherwise
+            with contextlib.redirect_stdout(sys.stderr):
+                _build(dname, output_name, writer, **kwargs)
+        else:
+            _build(dname, output_name, writer, **kwargs)
+    finally:
+        writer.close()
+
+def _build(dname, output_name, writer, **kwargs):
+    start = time.perf_counter()
+    if kwargs.get('jobs') == 0:
+        kwargs['jobs'] = os.cpu_count() or 1
+
+    stats = None
+    if kwargs.get('stats') or kwargs.get('stats_json') is not None:
+        stats = BuildStats()
+
+    cache = _open_cache(kwargs)
+    doc_md = DocfxMd(dname, **dict(kwargs, cache=cache, stats=stats))
+    tasks = _index_tasks(doc_md, output_name)
+
+    manifest, dirty = _load_build(doc_md, writer, output_name, tasks, kwargs)
+    if kwargs.get('jobs', 1) > 1 and len(dirty) > 1:
+        _render_parallel(doc_md, writer, dirty, manifest, kwargs)
+    else:
+        _render_serial(doc_md, writer, dirty, manifest, kwargs)
+    paths = _write_build_index(doc_md, writer, output_name, manifest, kwargs)
+
+    if kwargs.get('prune', False):
+        outputs = [str(task[2].with_suffix('.md')) for task in tasks.values()]
+        writer.count(DELETED, len(writer.prune(output_name, outputs + paths)))
+
+    if manifest is not None:
+        manifest.save()
+    if cache is not None:
+        cache.evict()
+    _report_build(doc_md, writer, start, kwargs)
+
+def _open_cache(kwargs):
+    if kwargs.get('cache_dir') is None:
+        return None
+    return DocumentCache(kwargs['cache_dir'], kwargs.get('cache_size', DEFAULT_CACHE_SIZE))
+
+def _index_tasks(doc_md, output_name):
+    tasks = {}
+    for path in doc_md.link_index.index_directory():
+        basename = os.path.basename(path)[:-4]
+        tasks[basename] = (basename, path, _output_path(output_name, path))
+    return tasks
+
+def _load_build(doc_md, writer, output_name, tasks, kwargs):
+    # returns the manifest of an incremental build and the tasks of the pages to render
+    fnames = {basename: task[1] for basename, task in tasks.items()}
+    if not kwargs.get('incremental', False):
+        _load_files(doc_md, list(fnames.values()), kwargs.get('jobs', 1), kwargs.get('verbose', 0))
+        return None, list(tasks.values())
+
+    manifest = Manifest.load(os.path.join(output_name, MANIFEST_NAME), {
+        'absolute_link_path': doc_md.link_index.absolute_link_path,
+        'link_extensions': doc_md.link_index.link_extensions,
+    })
+    for path in manifest.prune(fnames):
+        writer.count(writer.remove(path))
+
+    dirty = _load_changed(doc_md, manifest, fnames, kwargs)
+    return manifest, [task for basename, task in tasks.items() if basename in dirty]
+
+def _load_changed(doc_md, manifest, fnames, kwargs):
+    changed = manifest.changed_pages(fnames)
+    for uid, basename in manifest.unchanged_uids(changed):
+        doc_md.uids.add_source(uid, basename)
+    for basename, namespace, type_ in manifest.unchanged_types(changed):
+        doc_md.namespace_registry.add_page_type(basename, namespace, type_)
+
+    _load_files(
+        doc_md, [fnames[basename] for basename in changed],
+        kwargs.get('jobs', 1), kwargs.get('verbose', 0)
+    )
+    return manifest.dirty_pages(doc_md, fnames, changed)
+
+def _render_parallel(doc_md, writer, tasks, manifest, kwargs):
+    jobs = kwargs['jobs']
+    track = manifest is not None
+
+    # keep the shared state out of the collector so forked workers do not copy it on write
+    gc.freeze()
+    try:
+        # only files can be written from the workers, archives and streams get the pages back
+        # and write them in task order so they match the serial build byte for byte
+        worker_writer = writer if isinstance(writer, OutputWriter) else None
+        with _worker_pool(jobs, doc_md, worker_writer) as pool:
+            imap = pool.imap_unordered if worker_writer is not None else pool.imap
+            built = imap(
+                _render_worker,
+                [(task, track) for task in tasks],
+                chunksize=_chunksize(tasks, jobs)
+            )
+            for result in built:
+                _add_rendered(doc_md, writer, manifest, result, kwargs.get('verbose', 0))
+    finally:
+        gc.unfreeze()
+
+def _add_rendered(doc_md, writer, manifest, result, verbose):
+    task, (status, record), pages, worker_stats, broken = result
+    if worker_stats is not None:
+        doc_md.stats.merge(worker_stats)
+    doc_md.uids.broken_anchors.update(broken)
+    if verbose >= 1:
+        print('building %s' % task[0])
+    writer.count(status)
+    for path, data in pages:
+        writer.count(writer.write(path, [data]))
+    if manifest is not None:
+        _update_manifest(manifest, task, record)
+
+def _render_serial(doc_md, writer, tasks, manifest, kwargs):
+    write_threads = kwargs.get('write_threads', 0)
+    page_writer = writer
+    if write_threads > 0 and len(tasks) > 1:
+        page_writer = ThreadedWriter(
+            writer, write_threads, kwargs.get('write_queue', DEFAULT_MAX_PENDING)
+        )
+
+    records = []
+    try:
+        for task in tasks:
+            if kwargs.get('verbose', 0) >= 1:
+                print('building %s' % task[0])
+            status, record = _render_page(doc_md, page_writer, task, manifest is not None)
+            writer.count(status)
+            if manifest is not None:
+                records.append((task, record))
+    finally:
+        if page_writer is not writer:
+            page_writer.close()
+
+    # outputs are only complete once the writer threads are done
+    for task, record in records:
+        _update_manifest(manifest, task, record)
+
+def _write_build_index(doc_md, writer, output_name, manifest, kwargs):
     namespace_index = kwargs.get('namespace_index')
-    verbose = kwargs.get('verbose', 0)
+    if namespace_index is None:
+        return []
 
-    doc_md = DocfxMd(dname, **kwargs)
-    paths = {}
+    if manifest is not None:
+        for basename in manifest.namespace_pages():
+            if basename not in doc_md.uids.items_by_file:
+                doc_md.load_index(doc_md.link_index.file_names[basename])
 
-    for root, dirs, files in os.walk(dname):
-        for fname in files:
-            if not fname.endswith('.yml'):
-                continue
+    return _write_namespace_index(
+        doc_md, writer, output_name, namespace_index, kwargs.get('namespace_pages', False)
+    )
 
-            path = os.path.join(root, fname)
+def _report_build(doc_md, writer, start, kwargs):
+    if kwargs.get('verbose', 0) >= 1:
+        for uid, link in sorted(doc_md.uids.broken_anchors.items()):
+            sys.stderr.write('no header for %s on %s\n' % (uid, link))
+        print('%d written, %d unchanged, %d deleted' % (
+            writer.counts[WRITTEN], writer.counts[UNCHANGED], writer.counts[DELETED]
+        ))
 
-            if verbose >= 2:
-                print('loading %s ...' % fname)
+    stats = doc_md.stats
+    if stats is None:
+        return
+
+    for status in (WRITTEN, UNCHANGED, DELETED):
+        stats.count('pages_%s' % status, writer.counts[status])
+    stats.count('broken_anchors', len(doc_md.uids.broken_anchors))
 
-            data = doc_md.load_file(path)
+    stats.add_time(STAGE_TOTAL, time.perf_counter() - start)
+    stats_top = kwargs.get('stats_top', 10)
+    if kwargs.get('stats'):
+        sys.stderr.write(stats.format(stats_top))
+    if kwargs.get('stats_json') is not None:
+        with open(kwargs['stats_json'], 'w', encoding='utf-8') as file:
+            file.write(stats.to_json(stats_top))
 
-            path = pathlib.Path(path)
-            paths[id(data)] = pathlib.Path(output_name) / path.relative_to(*path.parts[:1])
+def watch_directory(dname, output_name, **kwargs):
+    interval = kwargs.get('watch_interval', DEFAULT_WATCH_INTERVAL)
+    # stops after this many polls, None keeps watching until interrupted
+    polls = kwargs.get('watch_polls')
 
-    for basename, data in doc_md.files.items():
+    format_name = kwargs.get('output_format') or output_format(output_name)
+    if format_name != FORMAT_DIRECTORY:
+        raise ValueError('watching needs a directory output')
+
+    doc_md = DocfxMd(dname, **dict(kwargs, cache=_open_cache(kwargs), stats=None))
+    watcher = Watcher(doc_md)
+    writer = OutputWriter()
+
+    while polls is None or polls > 0:
+        _watch_poll(doc_md, watcher, writer, output_name, kwargs)
+
+        if polls is not None:
+            polls -= 1
+            if polls == 0:
+                break
+        time.sleep(interval)
+
+def _watch_poll(doc_md, watcher, writer, output_name, kwargs):
+    verbose = kwargs.get('verbose', 0)
+    start = time.perf_counter()
+    pages, removed = watcher.poll()
+
+    for path in removed.values():
+        writer.count(writer.remove(str(_output_path(output_name, path).with_suffix('.md'))))
+
+    for basename in sorted(pages):
         if verbose >= 1:
             print('building %s' % basename)
+        path = doc_md.link_index.file_names[basename]
+        status, record = _render_page(
+            doc_md, writer, (basename, path, _output_path(output_name, path)), True
+        )
+        writer.count(status)
+        watcher.update_page(basename, record['links'], record['items'])
+
+    if len(pages) == 0 and len(removed) == 0:
+        return
+
+    if kwargs.get('namespace_index') is not None:
+        _write_namespace_index(
+            doc_md, writer, output_name, kwargs['namespace_index'],
+            kwargs.get('namespace_pages', False)
+        )
+    if verbose >= 1:
+        print('%d written, %d unchanged, %d deleted in %.3fs' % (
+            writer.counts[WRITTEN], writer.counts[UNCHANGED], writer.counts[DELETED],
+            time.perf_counter() - start
+        ))
+    for status in writer.counts:
+        writer.counts[status] = 0
+
+def _output_path(output_name, path):
+    path = pathlib.Path(path)
+    return pathlib.Path(output_name) / path.relative_to(*path.parts[:1])
+
+def _write_namespace_index(doc_md, writer, output_name, namespace_index, namespace_pages):
+    if namespace_index[0] == os.path.sep:
+        namespace_index = namespace_index[1:]
+
+    if namespace_pages:
+        pages = namespace_index_pages(doc_md, namespace_index)
+    else:
+        out = FragmentWriter()
+        write_namespace_index_md(doc_md, out)
+        pages = [(namespace_index, out.fragments)]
+
+    paths = []
+    for name, fragments in pages:
+        path = os.path.join(output_name, name + '.md')
+        writer.count(writer.write(path, fragments))
+        paths.append(path)
+    return paths
+
+def _load_files(doc_md, fnames, jobs, verbose):
+    # streaming builds only keep the uid table, pages are parsed again when rendered
+    parse = _parse_index_worker if doc_md.documents.streaming else _parse_worker
+
+    if jobs > 1 and len(fnames) > 1:
+        with _worker_pool(jobs, doc_md) as pool:
+            loaded = pool.imap(parse, fnames, chunksize=_chunksize(fnames, jobs))
+            for path, (data, worker_stats) in zip(fnames, loaded):
+                if worker_stats is not None:
+                    doc_md.stats.merge(worker_stats)
+                if verbose >= 2:
+                    print('loading %s ...' % os.path.basename(path))
+                doc_md.add_file(path, data)
+    else:
+        for path in fnames:
+            if verbose >= 2:
+                print('loading %s ...' % os.path.basename(path))
+            doc_md.add_file(path, doc_md.documents.parse_file(path))
+
+def _render_page(doc_md, writer, task, track=False):
+    basename, fname, out_path = task
+    out_path = out_path.with_suffix('.md')
+
+    stats = doc_md.stats
+    start = time.perf_counter()
+
+    refs = None
+    if track:
+        doc_md.refs.start()
+    try:
+        out = _page_fragments(doc_md, fname)
+    finally:
+        if track:
+            refs = doc_md.refs.end()
+
+    if stats is not None:
+        elapsed = time.perf_counter() - start
+        stats.add_time(STAGE_RENDER, elapsed)
+        stats.add_page(basename, elapsed)
+        start = time.perf_counter()
+
+    status = None
+    if out is not None:
+        status = writer.write(str(out_path), out.fragments)
+        if stats is not None:
+            stats.add_time(STAGE_WRITE, time.perf_counter() - start)
+
+    if not track:
+        return status, None
+    return status, _page_record(doc_md, basename, out_path, out, refs)
+
+def _page_fragments(doc_md, fname):
+    data, items = doc_md.load_page(fname)
+    if not is_page(data):
+        return None
+
+    out = FragmentWriter()
+    doc_md.write_docfx_md(data, out, items)
+    return out
+
+def _page_record(doc_md, basename, out_path, out, refs):
+    links, items = refs
+    file_items = doc_md.uids.items_by_file.get(basename, [])
+    output = None
+    if out is not None:
+        output = {
+            'path': str(out_path),
+            'hash': hash_fragments(out.fragments),
+        }
+
+    return {
+        'output': output,
+        'uids': [itm.uid for itm in file_items],
+        'type': file_items[0].type if len(file_items) != 0 else None,
+        'namespace': file_items[0].namespace_name if len(file_items) != 0 else None,
+        'links': links,
+        'items': items,
+    }
 
-        result = doc_md.docfx_to_md(data)
-        if result is None:
-            continue
+def _update_manifest(manifest, task, record):
+    if record['output'] is not None:
+        record['output'].update(stat_file(record['output']['path']))
+    manifest.update_page(task[0], task[1], record)
 
-        out_path = paths[id(data)]
-        os.makedirs(out_path.parent, exist_ok=True)
+def _worker_pool(jobs, doc_md, writer=None):
+    if 'fork' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('fork')
+    else:
+        context = multiprocessing.get_context()
+    return context.Pool(jobs, initializer=_init_worker, initargs=(doc_md, writer))
 
-        with open(out_path.with_suffix('.md'), 'w', encoding='utf-8') as file:
-            file.write(result)
+def _init_worker(doc_md, writer):
+    global _worker_doc_md, _worker_writer #pylint: disable=global-statement
+    _worker_doc_md = doc_md
+    _worker_writer = writer
 
-    if namespace_index is not None:
-        if namespace_index[0] == os.path.sep:
-            namespace_index = namespace_index[1:]
+    # forked workers start with a copy of the numbers the parent already counted
+    if doc_md.stats is not None:
+        doc_md.stats.take()
 
-        path = os.path.join(output_name, namespace_index + '.md')
-        os.makedirs(os.path.dirname(path), exist_ok=True)
+def _take_stats():
+    stats = _worker_doc_md.stats
+    return stats.take() if stats is not None else None
 
-        with open(path, 'w', encoding='utf-8') as file:
-            file.write(doc_md.namespace_index_md())
+def _take_broken_anchors():
+    return _worker_doc_md.uids.take_broken_anchors()
+
+def _parse_worker(path):
+    return _worker_doc_md.documents.parse_file(path), _take_stats()
+
+def _parse_index_worker(path):
+    return _worker_doc_md.documents.parse_index(path), _take_stats()
+
+def _render_worker(args):
+    task, track = args
+    writer = _worker_writer
+    pages = []
+    if writer is None:
+        writer = PageCollector()
+        pages = writer.pages
+    result = _render_page(_worker_doc_md, writer, task, track)
+    return task, result, pages, _take_stats(), _take_broken_anchors()
+
+def _chunksize(tasks, jobs):
+    return max(1, min(64, len(tasks) // (jobs * 4)))
 
 def main(args):
     parser = argparse.ArgumentParser()
@@ -62,12 +425,22 @@ def main(args):
     )
     parser.add_argument('-o', '--output',
         action='store', metavar='DIR', required=True,
-        help='output markdown directory'
+        help='output markdown directory, a .zip, .tar[.gz|.bz2|.xz] or .jsonl file,'
+        ' or - for jsonl on stdout'
+    )
+    parser.add_argument('--format',
+        action='store', choices=OUTPUT_FORMATS,
+        help='output format, guessed from the output name by default'
     )
     parser.add_argument('--namespace',
         action='store', metavar='PATH', nargs='?', default=False,
         help='create an index of namespaces and store it in {OUTPUT}/{PATH}.md'
     )
+    parser.add_argument('--namespace-pages',
+        action='store_true', default=False,
+        help='list only the top level namespaces in the index and write the namespaces'
+        ' below each namespace to {OUTPUT}/{PATH}.{NAMESPACE}.md'
+    )
     parser.add_argument('--link-extensions',
         action='store_true', default=False,
         help='append file extensions to links'
@@ -80,25 +453,122 @@ def main(args):
         action='store', metavar='PATH',
         help='set the absolute path prefix for links'
     )
+    parser.add_argument('--compact',
+        action='store_true', default=False,
+        help='skip yml keys that are never rendered while loading'
+    )
+    parser.add_argument('--cache-dir',
+        action='store', metavar='DIR',
+        help='cache parsed yml files in DIR to skip parsing on later builds'
+    )
+    parser.add_argument('--cache-size',
+        action='store', metavar='MB', type=int, default=DEFAULT_CACHE_SIZE // (1024 * 1024),
+        help='evict the least recently used cache entries above this size (default %(default)s)'
+    )
+    parser.add_argument('--streaming',
+        action='store_true', default=False,
+        help='only keep the uid table in memory and parse each page again when rendering it'
+    )
+    parser.add_argument('--memo-size',
+        action='store', metavar='N', type=int, default=DEFAULT_MEMO_SIZE,
+        help='entries kept in the parsed and rendered identifier caches, 0 disables them'
+        ' (default %(default)s)'
+    )
+    parser.add_argument('--incremental',
+        action='store_true', default=False,
+        help='only rebuild pages whose input or referenced pages changed since the last build'
+    )
+    parser.add_argument('--watch',
+        action='store_true', default=False,
+        help='keep running and rebuild the pages affected by each change to the yml files'
+    )
+    parser.add_argument('--watch-interval',
+        action='store', metavar='SECONDS', type=float, default=DEFAULT_WATCH_INTERVAL,
+        help='seconds between checks for changed yml files (default %(default)s)'
+    )
+    parser.add_argument('--prune',
+        action='store_true', default=False,
+        help='delete pages an earlier --prune build wrote that no input yml produces anymore'
+    )
+    parser.add_argument('--write-threads',
+        action='store', metavar='N', type=int, default=0,
+        help='write pages from N threads while rendering goes on, 0 writes each page after'
+        ' rendering it (default %(default)s)'
+    )
+    parser.add_argument('--write-queue',
+        action='store', metavar='N', type=int, default=DEFAULT_MAX_PENDING,
+        help='rendered pages waiting for the writer threads before rendering pauses'
+        ' (default %(default)s)'
+    )
+    parser.add_argument('-j', '--jobs',
+        action='store', metavar='N', type=int, default=1,
+        help='number of worker processes to load and render with, 0 uses every cpu (default 1)'
+    )
+    parser.add_argument('--stats', '--profile',
+        action='store_true', default=False,
+        help='print the time spent in each build stage and the slowest pages to stderr'
+    )
+    parser.add_argument('--stats-json',
+        action='store', metavar='PATH',
+        help='write the build stage statistics as json to PATH'
+    )
+    parser.add_argument('--stats-top',
+        action='store', metavar='N', type=int, default=10,
+        help='number of slowest pages to report (default %(default)s)'
+    )
     parser.add_argument('-v', '--verbose',
-        action='count',
+        action='count', default=0,
         help='verbose mode'
     )
     argspace = parser.parse_args(args[1:])
 
+    format_name = argspace.format or output_format(argspace.output)
+    if argspace.incremental and format_name != FORMAT_DIRECTORY:
+        parser.error('--incremental needs a directory output')
+    if argspace.watch and format_name != FORMAT_DIRECTORY:
+        parser.error('--watch needs a directory output')
+
+    if argspace.namespace_pages and argspace.namespace is False:
+        parser.error('--namespace-pages needs --namespace')
+
     if argspace.namespace is not False:
         if argspace.namespace is None:
             argspace.namespace = '!Namespaces'
+    else:
+        argspace.namespace = None
 
-    build_directory(
-        argspace.dir,
-        argspace.output,
+    options = dict(
         absolute_link_path=argspace.abpath,
         namespace_index=argspace.namespace,
+        namespace_pages=argspace.namespace_pages,
         link_extensions=argspace.link_extensions,
         verbose=argspace.verbose,
+        jobs=argspace.jobs,
+        incremental=argspace.incremental,
+        prune=argspace.prune,
+        output_format=format_name,
+        write_threads=argspace.write_threads,
+        write_queue=argspace.write_queue,
+        compact=argspace.compact,
+        streaming=argspace.streaming,
+        memo_size=argspace.memo_size,
+        stats=argspace.stats,
+        stats_json=argspace.stats_json,
+        stats_top=argspace.stats_top,
+        cache_dir=argspace.cache_dir,
+        cache_size=argspace.cache_size * 1024 * 1024,
     )
 
+    if argspace.watch:
+        try:
+            watch_directory(
+                argspace.dir, argspace.output, watch_interval=argspace.watch_interval, **options
+            )
+        except KeyboardInterrupt:
+            pass
+    else:
+        build_directory(argspace.dir, argspace.output, **options)
+
 
 if __name__ == '__main__':
     main(sys.argv)
@@ -1,10 +1,14 @@
-import glob
 import os
 
-import yaml
-
-from item_md import ItemMd
-from convert import replace_strings, html_to_md, text_to_md, newline_to_br
+from item_md import ItemMd, ItemRef, sort_items
+from convert import html_to_md, text_to_md, newline_to_br
+from documents import DocumentStore, file_basename, index_data, is_page, sort_page
+from links import LinkIndex, escape_file_name, escape_link
+from memo import NameMemo, References
+from namespaces import NamespaceRegistry, namespace_index_md
+from stats import STAGE_ITEMS, STAGE_LINK, STAGE_HTML
+from uids import UidTable
+from writer import FragmentWriter
 
 
 TYPE_NAMESPACE = 'namespace'
@@ -29,139 +33,355 @@ ITEM_HEADERS = {
 }
 
 
-class DocfxMd:
-    def __init__(self, root, **kwargs):
-        self.root = root
+def item_header(item, header_set=None, class_view=True):
+    if header_set is not None:
+        if item.type in header_set:
+            return None
+        header_set.add(item.type)
 
-        self.absolute_link_path = kwargs.get('absolute_link_path', '')
-        self.link_extensions = kwargs.get('link_extensions', True)
+    if class_view:
+        return {
+            TYPE_NAMESPACE: '# Namespace %s\n\n' % text_to_md(item.name),
+            TYPE_CLASS: '# Class %s\n\n' % text_to_md(item.name),
+            TYPE_STRUCT: '# Struct %s\n\n' % text_to_md(item.name),
+            TYPE_INTERFACE: '# Interface %s\n\n' % text_to_md(item.name),
+            TYPE_ENUM: '# Enum %s\n\n' % text_to_md(item.name),
+            TYPE_CONSTRUCTOR: '## Constructors\n\n',
+            TYPE_FIELD: '## **Fields**\n\n',
+            TYPE_PROPERTY: '## **Properties**\n\n',
+            TYPE_METHOD: '## **Methods**\n\n',
+        }.get(item.type)
 
-        self.files = {}
-        self.items_by_file = {}
-        self.items = {}
+    return ITEM_HEADERS.get(item.type)
 
-        self.namespaces = {}
 
-    def load_file(self, fname):
-        with open(fname, 'r', encoding='utf-8') as file:
-            data = yaml.load(file, Loader=yaml.Loader)
+class DocfxMdCompatMixin:
+    # the attributes and methods DocfxMd had before its state moved to the link index,
+    # the document store, the uid table and the namespace registry
 
-        basename = os.path.basename(fname)
-        if basename.endswith('.yml'):
-            basename = basename[:-4]
-        self.files[basename] = data
+    @property
+    def root(self):
+        return self.link_index.root
 
-        if isinstance(data, dict):
-            items = sorted(map(lambda x: ItemMd(self, x), data.get('items')))
-            self.items_by_file[basename] = items
+    @property
+    def absolute_link_path(self):
+        return self.link_index.absolute_link_path
 
-            for itm in items:
-                self.items[itm.uid] = itm
+    @property
+    def link_extensions(self):
+        return self.link_index.link_extensions
 
-        return data
+    @property
+    def files(self):
+        return self.documents.files
+
+    @property
+    def items_by_file(self):
+        return self.uids.items_by_file
+
+    @property
+    def items(self):
+        return self.uids.items
+
+    @property
+    def namespaces(self):
+        # namespace name -> ItemRef of its namespace page
+        return self.namespace_registry.namespaces
 
     def docfx_file_to_md(self, fname):
-        basename = os.path.basename(fname)
-        if basename.endswith('.yml'):
-            basename = basename[:-4]
+        return self.docfx_to_md(*self.load_page(fname))
+
+    def namespace_md(self, namespace):
+        out = FragmentWriter()
+        self._write_namespace_md(namespace, out)
+        return out.getvalue()
+
+    def enum_md(self, items):
+        out = FragmentWriter()
+        self._write_enum_md(items, out)
+        return out.getvalue()
+
+    def namespace_index_md(self):
+        return namespace_index_md(self)
+
+    def item_header(self, item, header_set=None, class_view=True): #pylint: disable=no-self-use
+        return item_header(item, header_set, class_view)
+
+    def _sanitize_link(self, link): #pylint: disable=no-self-use
+        return escape_file_name(link)
+
+    def sanitize_link(self, link): #pylint: disable=no-self-use
+        return escape_link(link)
+
+
+class DocfxMd(DocfxMdCompatMixin):
+    def __init__(self, root, **kwargs):
+        self.stats = kwargs.get('stats')
+
+        self.link_index = LinkIndex(root, **kwargs)
+        self.documents = DocumentStore(**kwargs)
+        self.uids = UidTable()
+        self.namespace_registry = NamespaceRegistry()
+
+        self.refs = References(self.stats)
+        self.names = NameMemo(self.refs, **kwargs)
+
+    @staticmethod
+    def from_documents(documents, **kwargs):
+        # documents maps the yml path relative to the api directory, with or without the
+        # extension, to the parsed document or its yml text, nothing is read from disk
+        doc_md = DocfxMd('', **dict(kwargs, streaming=False, cache=None))
+        doc_md.link_index.links = {}
+        for name, data in documents.items():
+            doc_md.add_document(name, data)
+        return doc_md
+
+    def add_document(self, name, data):
+        if name.endswith('.yml'):
+            name = name[:-4]
+        if isinstance(data, (bytes, str)):
+            data = self.documents.load_yaml(data)
+        elif is_page(data):
+            # the items are sorted in place, the caller's list is left alone
+            data = dict(data, items=list(data['items']))
+
+        if self.link_index.add_link_name(name):
+            # identifiers rendered before may now link to the new page
+            self.names.clear()
+        self.add_file(name, data)
+        return data
+
+    def _document(self, name):
+        return self.documents.files.get(file_basename(name))
+
+    def page_md(self, name):
+        return self.docfx_to_md(self._document(name))
 
-        if basename not in self.files:
-            self.load_file(fname)
-        return self.docfx_to_md(self.files[basename])
+    def write_page_md(self, name, sink):
+        data = self._document(name)
+        if not is_page(data):
+            return False
 
-    def docfx_to_md(self, data):
-        if not isinstance(data, dict) or 'items' not in data:
+        self.write_docfx_md(data, FragmentWriter(sink))
+        return True
+
+    def pages_md(self, names=None):
+        for name in self.documents.files.keys() if names is None else names:
+            markdown = self.page_md(name)
+            if markdown is not None:
+                yield name, markdown
+
+    def load_file(self, fname):
+        data = self.documents.parse_file(fname)
+        self.add_file(fname, data)
+        return data
+
+    def add_file(self, fname, data):
+        # streaming builds only add the items to the uid table
+        basename = file_basename(fname)
+        if self.documents.streaming:
+            data = index_data(data)
+        else:
+            self.documents.files[basename] = data
+
+        # lazy tables load uids on demand, so renders never saw them missing
+        if isinstance(data, dict) and self._add_items(basename, data) and \
+                not self.documents.lazy:
+            self.names.clear()
+
+    def load_index(self, fname):
+        data = self.documents.parse_index(fname)
+        if isinstance(data, dict):
+            self._add_items(file_basename(fname), data)
+        return data
+
+    def remove_file(self, basename):
+        self.documents.files.pop(basename, None)
+        self.names.member_links.pop(basename, None)
+        self.namespace_registry.remove_page(basename, self.uids.remove_items(basename))
+
+    def _add_items(self, basename, data):
+        sort_page(data)
+        if self.stats is None:
+            items = [ItemRef(self, item) for item in data['items']]
+        else:
+            with self.stats.timer(STAGE_ITEMS):
+                items = [ItemRef(self, item) for item in data['items']]
+        added = any(itm.uid not in self.uids.sources for itm in items)
+        self.uids.add_items(basename, items)
+        self.names.member_links.pop(basename, None)
+
+        # registered while loading so the index does not depend on which pages get rendered
+        self.namespace_registry.add_page(basename, items)
+        return added
+
+    def _build_items(self, data):
+        # the items of loaded and parsed pages are already sorted
+        if self.stats is None:
+            return [ItemMd(self, item) for item in data['items']]
+
+        with self.stats.timer(STAGE_ITEMS):
+            return [ItemMd(self, item) for item in data['items']]
+
+    def get_item_data(self, uid):
+        source = self.uids.sources.get(uid)
+        if source is None:
+            return {}
+
+        data = self.documents.files.get(source)
+        if data is None:
+            data = self.documents.parse_file(self.link_index.file_names[source])
+        for item in data.get('items', []):
+            if item['uid'] == uid:
+                return item
+        return {}
+
+    def get_item_source(self, uid):
+        source = self.uids.sources.get(uid)
+        if source is None and self.documents.lazy:
+            source = self._load_source(uid)
+        return source
+
+    def _load_source(self, uid):
+        # types are declared in the file named after them, members in the file of their type
+        links = self.link_index.links
+        name = escape_file_name(uid.split('(', 1)[0])
+        while links is not None and name not in links and '.' in name:
+            name = name[:name.rindex('.')]
+
+        target = links.get(name) if links is not None else None
+        if target is None:
+            return None
+        basename = os.path.basename(target)
+        fname = self.link_index.file_names.get(basename)
+        if basename in self.uids.items_by_file or fname is None:
             return None
+        self.load_index(fname)
+        return self.uids.sources.get(uid)
+
+    def get_item(self, uid):
+        itm = self.uids.items.get(uid)
+        source = self.get_item_source(uid) if itm is None else self.uids.sources.get(uid)
+        self.refs.item(uid, source)
+
+        if itm is None and source is not None:
+            if source not in self.uids.items_by_file:
+                self.load_index(self.link_index.file_names[source])
+            itm = self.uids.items.get(uid)
+        return itm
+
+    def load_page(self, fname):
+        basename = file_basename(fname)
+        if basename in self.documents.files:
+            data = self.documents.files[basename]
+        elif self.documents.streaming:
+            # rendered without keeping the document, other pages only need the index
+            data = self.documents.parse_file(fname)
+            self.add_file(fname, data)
+        else:
+            data = self.load_file(fname)
+
+        # the uid table only holds ItemRef entries, the page gets full items
+        return data, self._build_items(data) if is_page(data) else None
+
+    def docfx_to_md(self, data, items=None):
+        if not is_page(data):
+            return None
+
+        out = FragmentWriter()
+        self.write_docfx_md(data, out, items)
+        return out.getvalue()
 
-        markdown = ''
-        items = sorted(map(lambda x: ItemMd(self, x), data.get('items')))
+    def write_docfx_md(self, data, out, items=None):
+        if items is None:
+            items = self._build_items(sort_page(dict(data, items=list(data['items']))))
 
         type_headers = set()
 
         first_item = items[0]
         if first_item.type == TYPE_NAMESPACE:
-            self.namespaces[first_item.name] = first_item
-            return self.namespace_md(data)
+            self._write_namespace_md(data, out, first_item)
+            return
         if first_item.type == TYPE_ENUM:
-            return self.enum_md(items)
+            self._write_enum_md(items, out)
+            return
 
         for item in items:
-            header = self.item_header(item, type_headers)
+            header = item_header(item, type_headers)
             if header is not None:
-                markdown += header
+                out.write(header)
                 type_headers.add(item.type)
 
-            markdown += item.markdown()
-
-        return markdown
+            item.write_markdown(out)
 
-    def namespace_md(self, namespace):
-        item = ItemMd(self, namespace['items'][0])
-        result = self.item_header(item)
+    def _write_namespace_md(self, namespace, out, item=None):
+        if item is None:
+            item = ItemMd(self, namespace['items'][0])
+        out.write(item_header(item))
 
         references = []
         ref_str = []
 
         for ref in namespace['references']:
-            if ref['uid'] in self.items:
-                references.append(self.items[ref['uid']])
+            itm = self.get_item(ref['uid'])
+            if itm is not None:
+                references.append(itm)
             else:
                 ref_str.append(ref['uid'])
 
         type_headers = set()
-        references.sort()
+        references = sort_items(references)
 
         for ref in references:
             if ref.type == TYPE_NAMESPACE:
                 continue
 
-            header = self.item_header(ref, type_headers, class_view=False)
+            header = item_header(ref, type_headers, class_view=False)
             if header is not None:
-                result += header
+                out.write(header)
 
-            link = ref.uid + '.md' if self.link_extensions else ref.uid
+            link = ref.uid + '.md' if self.link_index.link_extensions else ref.uid
 
-            result += '### [%s](%s)\n\n' % (
+            out.write('### [%s](%s)\n\n' % (
                 text_to_md(ref.get_ident_name(ref.name)),
-                self.sanitize_link(link)
-            )
+                escape_link(link)
+            ))
             summary = ref.summary()
             if summary is not None:
-                result += summary
+                out.write(summary)
 
         if len(ref_str) != 0:
-            result += '\n---\n'
+            out.write('\n---\n')
 
         for ref in ref_str:
-            result += '### %s\n\n' % ref
-
-        return result
+            out.write('### %s\n\n' % ref)
 
-    def enum_md(self, items):
+    def _write_enum_md(self, items, out):
         enum_item = items[0]
 
-        md_list = [
-            self.item_header(enum_item),
-            enum_item.summary(),
-            enum_item.inheritance(),
-            enum_item.inherited_members(),
-            enum_item.namespace(),
-            enum_item.assemblies(),
-            enum_item.syntax(),
-        ]
-
-        result = ''
+        sections = out.sections()
+        sections.write(item_header(enum_item))
+        sections.write(enum_item.summary())
+        sections.write(enum_item.inheritance())
+        sections.write(enum_item.inherited_members())
+        sections.write(enum_item.namespace())
+        sections.write(enum_item.assemblies())
+        sections.write(enum_item.syntax())
+
+        # the members are one section even when there are none
+        sections.start()
         idx = 1
 
         while idx < len(items):
             item = items[idx]
             if item.type != TYPE_FIELD:
-                result += item.markdown() + '\n'
+                item.write_markdown(out)
+                out.write('\n')
                 idx += 1
                 continue
 
-            result += '| Name | Description |\n'
-            result += '|---|---|\n'
+            out.write('| Name | Description |\n')
+            out.write('|---|---|\n')
 
             while idx < len(items):
                 item = items[idx]
@@ -169,86 +389,83 @@ class DocfxMd:
                     idx -= 1
                     break
 
-                result += '| %s | %s |\n' % (
+                out.write('| %s | %s |\n' % (
                     text_to_md(item.name),
-                    newline_to_br(html_to_md(item.item.get('description', '&nbsp;')))
-                )
+                    newline_to_br(
+                        self.html_to_md(item.item.get('description', '&nbsp;'), cell=True)
+                    )
+                ))
                 idx += 1
 
-            result += '\n'
+            out.write('\n')
             idx += 1
 
-        md_list.append(result)
-        md_list.append(enum_item.remarks())
-
-        return '\n'.join(filter(lambda x: x is not None, md_list))
+        sections.write(enum_item.remarks())
+
+    def html_to_md(self, data, cell=False):
+        if self.stats is None:
+            return html_to_md(data, self._resolve_xref, cell)
+
+        with self.stats.timer(STAGE_HTML):
+            return html_to_md(data, self._resolve_xref, cell)
+
+    def _resolve_xref(self, uid):
+        itm = self.get_item(uid)
+        link = self.get_link(uid)
+        if link is None:
+            # members are documented on the page of the file that declares them
+            source = self.get_item_source(uid)
+            if source is not None:
+                link = self.get_link(source)
+                anchor = self.member_anchor(uid)
+                if link is not None and anchor is not None:
+                    link += '#' + anchor
+        return (itm.name if itm is not None else None), link
+
+    def member_link(self, uid, namespace, render):
+        # inherited members are rendered once per page that declares them
+        if self.names.ident_cache is None:
+            return render()
+
+        return self.names.member_link(self.get_item_source(uid), (uid, namespace), render)
+
+    def member_anchor(self, uid):
+        # the anchor of the member's header on the page that declares it
+        if self.get_item(uid) is None:
+            return None
 
-    def namespace_index_md(self):
-        markdown = '# Namespaces\n\n'
+        return self.uids.page_anchors(self.uids.sources[uid]).get(uid)
 
-        for name in sorted(self.namespaces.keys()):
-            namespace = self.namespaces[name]
-            markdown += '## [%s](%s)\n\n' % (text_to_md(name), self.get_link(namespace.uid))
+    def has_anchor(self, name, anchor):
+        # whether the page a link name resolves to has a member header with the anchor
+        if self.link_index.links is None:
+            return False
+        target = self.link_index.links.get(escape_file_name(name))
+        if target is None:
+            return False
 
-            summary = self.namespaces[name].summary()
-            if summary is not None:
-                markdown += summary
-        return markdown
-
-    def item_header(self, item, header_set=None, class_view=True):
-        if header_set is not None:
-            if item.type in header_set:
-                return None
-            header_set.add(item.type)
-
-        if class_view:
-            return {
-                TYPE_NAMESPACE: '# Namespace %s\n\n' % text_to_md(item.name),
-                TYPE_CLASS: '# Class %s\n\n' % text_to_md(item.name),
-                TYPE_STRUCT: '# Struct %s\n\n' % text_to_md(item.name),
-                TYPE_INTERFACE: '# Interface %s\n\n' % text_to_md(item.name),
-                TYPE_ENUM: '# Enum %s\n\n' % text_to_md(item.name),
-                TYPE_CONSTRUCTOR: '## Constructors\n\n',
-                TYPE_FIELD: '## **Fields**\n\n',
-                TYPE_PROPERTY: '## **Properties**\n\n',
-                TYPE_METHOD: '## **Methods**\n\n',
-            }.get(item.type)
-
-        return ITEM_HEADERS.get(item.type)
+        basename = os.path.basename(target)
+        if basename not in self.uids.items_by_file:
+            if self.link_index.file_names.get(basename) is None:
+                return False
+            self.load_index(self.link_index.file_names[basename])
+        return anchor in self.uids.page_anchors(basename).values()
 
     def get_link(self, fname):
-        fname = self._sanitize_link(fname)
-        path = os.path.join(self.root, fname + '.yml')
-        if not os.path.isfile(path):
-            subname = glob.glob(os.path.join(self.root, fname + '-[0-9].yml'))
-            if len(subname) == 0:
-                return None
-
-            if len(self.root) != 0:
-                prefix = len(self.root)
-                if self.root[-1] != os.path.sep:
-                    prefix += 1
-            else:
-                prefix = 0
-
-            fname = subname[0][prefix:-4]
-
-        if self.absolute_link_path is not None and len(self.absolute_link_path) != 0:
-            if self.absolute_link_path[-1] == '/':
-                fname = self.absolute_link_path + fname
-            else:
-                fname = '%s/%s' % (self.absolute_link_path, fname)
-        if self.link_extensions:
-            fname += '.md'
-        return fname
-
-    def _sanitize_link(self, link):
-        return replace_strings(link, {
-            '`': '-',
-        })
-
-    def sanitize_link(self, link):
-        return replace_strings(link, {
-            ' ': '-',
-            '`': '-',
-        })
+        if self.stats is None:
+            return self._get_link(fname)
+
+        with self.stats.timer(STAGE_LINK):
+            link = self._get_link(fname)
+        self.stats.count('link_lookups')
+        if link is None:
+            self.stats.count('link_misses')
+        return link
+
+    def _get_link(self, fname):
+        name = escape_file_name(fname)
+        target = self.link_index.target(name)
+        self.refs.link(name, target)
+        if target is None:
+            return None
+        return self.link_index.page_link(target)
@@ -0,0 +1,132 @@
+import os
+
+import yaml
+
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
+
+from item_md import item_sort_key
+from stats import STAGE_LOAD
+
+
+# item keys other pages read through the uid table
+INDEX_KEYS = ('uid', 'id', 'name', 'type', 'namespace', 'summary')
+
+# keys docfx writes that are never read when rendering
+COMPACT_SKIP_KEYS = frozenset([
+    'attributes',
+    'children',
+    'commentId',
+    'documentation',
+    'example',
+    'exceptions',
+    'extensionMethods',
+    'fullName',
+    'fullName.vb',
+    'href',
+    'implements',
+    'isExternal',
+    'langs',
+    'modifiers.csharp',
+    'modifiers.vb',
+    'name.vb',
+    'nameWithType',
+    'nameWithType.vb',
+    'overload',
+    'parent',
+    'seealso',
+    'source',
+    'spec.csharp',
+    'spec.vb',
+    'typeParameters',
+])
+
+
+class CompactLoader(SafeLoader): #pylint: disable=too-many-ancestors
+    def construct_mapping(self, node, deep=False):
+        if isinstance(node, yaml.MappingNode):
+            self.flatten_mapping(node)
+            node.value = [
+                (key, value) for key, value in node.value
+                if not isinstance(key, yaml.ScalarNode) or key.value not in COMPACT_SKIP_KEYS
+            ]
+        return super().construct_mapping(node, deep=deep)
+
+
+def load_yaml(data, compact=False):
+    return yaml.load(data, Loader=CompactLoader if compact else SafeLoader)
+
+def is_page(data):
+    return isinstance(data, dict) and 'items' in data
+
+def sort_page(data):
+    # pages keep their items in render order, so the uid table and the rendered items
+    # share one sort, and sorting them again only compares neighbours
+    if is_page(data):
+        data['items'].sort(key=item_sort_key)
+    return data
+
+def index_data(data):
+    if not isinstance(data, dict) or 'items' not in data:
+        return data
+
+    return {
+        'items': [
+            {key: item[key] for key in INDEX_KEYS if key in item} for item in data['items']
+        ],
+    }
+
+def file_basename(fname):
+    basename = os.path.basename(fname)
+    if basename.endswith('.yml'):
+        basename = basename[:-4]
+    return basename
+
+
+class DocumentStore:
+    def __init__(self, **kwargs):
+        self.compact = kwargs.get('compact', False)
+        self.cache = kwargs.get('cache')
+        self.stats = kwargs.get('stats')
+
+        # streaming builds only keep the uid table, pages are parsed again when rendered
+        self.streaming = kwargs.get('streaming', False)
+        # the uid table is filled on demand from the files uids are named after
+        self.lazy = kwargs.get('lazy', False)
+
+        # basename -> parsed document
+        self.files = {}
+
+    def load_yaml(self, data):
+        return sort_page(load_yaml(data, self.compact))
+
+    def parse_file(self, fname):
+        if self.stats is None:
+            return self._parse_file(fname)
+
+        self.stats.count('files_parsed')
+        with self.stats.timer(STAGE_LOAD):
+            return self._parse_file(fname)
+
+    def _parse_file(self, fname):
+        with open(fname, 'rb') as file:
+            data = file.read()
+
+        if self.cache is None:
+            return self.load_yaml(data)
+
+        key = self.cache.key(fname, data, self.compact)
+        result = self.cache.get(key)
+        if result is None:
+            if self.stats is not None:
+                self.stats.count('cache_misses')
+            result = self.load_yaml(data)
+            self.cache.put(key, result)
+        elif self.stats is not None:
+            self.stats.count('cache_hits')
+        return result
+
+    def parse_index(self, fname):
+        return index_data(self.parse_file(fname))
@@ -1,5 +1,10 @@
-from convert import replace_strings, html_to_md, text_to_md, newline_to_br
+import functools
+import re
+import sys
+
+from convert import Escaper, text_to_md, newline_to_br
 import name_parser
+from writer import FragmentWriter
 
 
 TYPE_NAMESPACE = 'namespace'
@@ -30,10 +35,117 @@ TYPE_ORDER = build_index([
     TYPE_METHOD,
 ])
 
+MEMBER_TYPES = frozenset([
+    TYPE_CONSTRUCTOR,
+    TYPE_FIELD,
+    TYPE_PROPERTY,
+    TYPE_METHOD,
+])
+
 LANG_CS = 'cs'
 LANG_VB = 'vb'
 LANG = LANG_CS
 
+escape_angles = Escaper({'<': '&lt;', '>': '&gt;'})
+strip_braces = Escaper({'{': '', '}': ''})
+
+# header anchors follow the wiki: lowercased, spaces become - and punctuation
+# other than - and _ is dropped
+ANCHOR_REGEX = re.compile(r'[^\w\- ]')
+
+# summary of an ItemRef that is read from its document when needed
+NOT_LOADED = object()
+
+
+def escape_anchor(string):
+    return ANCHOR_REGEX.sub('', string.lower()).replace(' ', '-')
+
+def sort_items(items):
+    return sorted(items, key=lambda x: x.sort_key)
+
+def item_sort_key(item):
+    # the order sort_items puts the items of a yml document in
+    return (TYPE_ORDER.get(item['type'].lower(), 9999), item['id'])
+
+def split_namespace(namespace):
+    return tuple(namespace.split('.')) if namespace is not None else None
+
+def ident_name(ns_parts, string):
+    string = escape_angles(string)
+
+    if string.startswith('Global.'):
+        return string[7:]
+
+    # names outside the namespace are left alone without splitting them
+    if ns_parts is None or not string.startswith(ns_parts[0]):
+        return string
+
+    string_parts = string.split('.')
+
+    idx = 0
+    for ns_part, part in zip(ns_parts, string_parts):
+        if part != ns_part:
+            break
+        idx += 1
+    if idx != 0:
+        if idx == len(string_parts):
+            idx -= 1
+        string = '.'.join(string_parts[idx:])
+
+    return string
+
+def _intern(string):
+    return sys.intern(string) if string is not None else None
+
+
+class ItemRef:
+    # what other pages need of an item, kept for every uid of the project
+    __slots__ = (
+        'docfx_md',
+        'uid',
+        'id',
+        'name',
+        'type',
+        'namespace_name',
+        'summary_html',
+    )
+
+    def __init__(self, docfx_md, item):
+        self.docfx_md = docfx_md
+
+        self.uid = _intern(item['uid'])
+        self.id = _intern(item['id']) #pylint: disable=invalid-name
+        self.name = _intern(item['name'])
+        self.type = sys.intern(item['type'].lower())
+        self.namespace_name = _intern(item.get('namespace'))
+
+        # only namespace pages and the namespace index show summaries, and they
+        # only list namespaces and types
+        if self.is_member():
+            self.summary_html = NOT_LOADED
+        else:
+            self.summary_html = item.get('summary')
+
+    @property
+    def sort_key(self):
+        return (TYPE_ORDER.get(self.type, 9999), self.id)
+
+    def is_member(self):
+        return self.type in MEMBER_TYPES
+
+    def get_ident_name(self, string, **kwargs):
+        namespace = self.namespace_name if kwargs.get('truncate_name', True) else None
+        return self.docfx_md.names.ident_name(namespace, string)
+
+    def summary(self):
+        summary = self.summary_html
+        if summary is NOT_LOADED:
+            summary = self.docfx_md.get_item_data(self.uid).get('summary')
+        if summary is None:
+            return None
+
+        return self.docfx_md.html_to_md(summary) + '\n'
+
 
 class ItemMd:
     def __init__(self, docfx_md, item):
@@ -45,8 +157,6 @@ class ItemMd:
         self.name = item['name']
         self.type = item['type'].lower()
 
-        self.type_order = TYPE_ORDER.get(self.type, 9999)
-
     def _ident_str(self, ident, **kwargs):
         is_member = kwargs.get('is_member', False)
         make_links = kwargs.get('make_links', True)
@@ -64,8 +174,8 @@ class ItemMd:
                 result += '.' + self.get_ident_name(member, **kwargs)
             return result
 
-        result = name_parser.tostring(ident, include_containers=False)
-        link = self.docfx_md.get_link(result)
+        name = name_parser.tostring(ident, include_containers=False, generic_arity=True)
+        link = self.docfx_md.get_link(name)
         if link is not None:
             result = name_parser.tostring(
                 ident,
@@ -74,7 +184,15 @@ class ItemMd:
             if is_member:
                 member_str = self._ident_str([member], make_links=False)
                 result += '.' + member_str
-                link += '#' + self.escape_fragment(member_str)
+
+                anchor = None
+                if kwargs.get('uid') is not None:
+                    anchor = self.docfx_md.member_anchor(kwargs['uid'])
+                if anchor is None:
+                    anchor = self.escape_fragment(member_str)
+                    if kwargs.get('uid') is not None and not self.docfx_md.has_anchor(name, anchor):
+                        self.docfx_md.uids.broken_anchor(kwargs['uid'], link)
+                link += '#' + anchor
             return '[%s](%s)' % (text_to_md(self.get_ident_name(result, **kwargs)), link)
 
         args = kwargs.copy()
@@ -90,81 +208,58 @@ class ItemMd:
         return self.get_ident_name(result, **kwargs)
 
     def get_ident_name(self, string, **kwargs):
-        truncate_name = kwargs.get('truncate_name', True)
-
-        string = string.replace('<', '&lt;').replace('>', '&gt;')
-
-        if string.startswith('Global.'):
-            return string[7:]
-
-        if truncate_name:
-            ns_parts = self.item['namespace'].split('.')
-            string_parts = string.split('.')
-
-            idx = 0
-            while idx < min(len(string_parts), len(ns_parts)):
-                if string_parts[idx] != ns_parts[idx]:
-                    break
-                idx += 1
-            if idx != 0:
-                if idx == len(string_parts):
-                    idx -= 1
-                string = '.'.join(string_parts[idx:])
-
-        return string
+        namespace = self.item['namespace'] if kwargs.get('truncate_name', True) else None
+        return self.docfx_md.names.ident_name(namespace, string)
 
     def escape_fragment(self, frag):
-        return replace_strings(frag.lower(), {
-            ' ': '-',
-            '(': '',
-            ')': '',
-            '.': '',
-            ',': '',
-            '`': '-',
-        })
+        return escape_anchor(frag)
 
     def ident_str(self, string, **kwargs):
+        key = (
+            string,
+            self.item.get('namespace'),
+            kwargs.get('is_member', False),
+            kwargs.get('truncate_name', True),
+        )
+        return self.docfx_md.names.cached_ident(key, lambda: self._render_ident(string, **kwargs))
+
+    def _render_ident(self, string, **kwargs):
         try:
-            identifier = name_parser.parse(string)
+            identifier = self.docfx_md.names.parse_name(string)
             if identifier is not None:
-                return self._ident_str(identifier[0], **kwargs)
+                return self._ident_str(identifier[0], uid=string, **kwargs)
         except ValueError:
             pass
 
-        name = replace_strings(string, {
-            '{': '',
-            '}': '',
-        })
+        name = strip_braces(string)
         return text_to_md(self.get_ident_name(name, **kwargs))
 
     def markdown(self):
-        md_list = []
+        out = FragmentWriter()
+        self.write_markdown(out)
+        return out.getvalue()
+
+    def write_markdown(self, out):
+        sections = out.sections()
 
         if self.is_member():
-            md_list.append('### %s\n' % text_to_md(self.name))
+            sections.write('### %s\n' % text_to_md(self.name))
 
-        md_list.append(self.summary())
+        sections.write(self.summary())
 
         if self.is_page_view():
-            md_list.append(self.inheritance())
-            md_list.append(self.inherited_members())
-            md_list.append(self.namespace())
-            md_list.append(self.assemblies())
-
-        md_list.append(self.syntax())
-        md_list.append(self.parameters())
-        md_list.append(self.return_())
-        md_list.append(self.remarks())
+            sections.write(self.inheritance())
+            sections.write(self.inherited_members())
+            sections.write(self.namespace())
+            sections.write(self.assemblies())
 
-        return '\n'.join(filter(lambda x: x is not None, md_list))
+        sections.write(self.syntax())
+        sections.write(self.parameters())
+        sections.write(self.return_())
+        sections.write(self.remarks())
 
     def is_member(self):
-        return self.type in (
-            TYPE_CONSTRUCTOR,
-            TYPE_FIELD,
-            TYPE_PROPERTY,
-            TYPE_METHOD
-        )
+        return self.type in MEMBER_TYPES
 
     def is_page_view(self):
         return self.type in (
@@ -174,24 +269,6 @@ class ItemMd:
             TYPE_ENUM,
         )
 
-    def __gt__(self, other):
-        return self._cmp(other) > 0
-
-    def __le__(self, other):
-        return self._cmp(other) < 0
-
-    def __eq__(self, other):
-        return self._cmp(other) == 0
-
-    def _cmp(self, other):
-        if self.type_order != other.type_order:
-            return self.type_order - other.type_order
-        if self.id > other.id:
-            return 1
-        if self.id < other.id:
-            return -1
-        return 0
-
     # --------
 
     def assemblies(self):
@@ -201,36 +278,40 @@ class ItemMd:
         return '**Assembly**: %s\n' % text_to_md(','.join(assemblies))
 
     def inheritance(self):
-        result = ''
+        result = []
         inherit_depth = 0
 
         inheritance = self.item.get('inheritance')
         if inheritance is not None:
-            result += 'Inheritance\n'
+            result.append('Inheritance\n')
             for inherit in inheritance:
-                result += '%s- %s\n' % ('  ' * inherit_depth, self.ident_str(inherit))
+                result.append('%s- %s\n' % ('  ' * inherit_depth, self.ident_str(inherit)))
                 inherit_depth += 2
-            result += '%s- %s\n' % ('  ' * inherit_depth, text_to_md(self.item['name']))
+            result.append('%s- %s\n' % ('  ' * inherit_depth, text_to_md(self.item['name'])))
 
         derived_classes = self.item.get('derivedClasses')
         if derived_classes is not None:
             if inherit_depth != 0:
                 inherit_depth += 2
             for classname in derived_classes:
-                result += '%s- %s\n' % ('  ' * inherit_depth, self.ident_str(classname))
-            result += '\n'
+                result.append('%s- %s\n' % ('  ' * inherit_depth, self.ident_str(classname)))
+            result.append('\n')
 
-        return result if len(result) != 0 else None
+        return ''.join(result) if len(result) != 0 else None
 
     def inherited_members(self):
         inherited_members = self.item.get('inheritedMembers')
         if inherited_members is None:
             return None
 
-        result = 'Inherited Members\n'
+        namespace = self.item.get('namespace')
+        result = ['Inherited Members\n']
         for member in inherited_members:
-            result += '- ' + self.ident_str(member, is_member=True) + '\n'
-        return result + '\n'
+            result.append('- %s\n' % self.docfx_md.member_link(
+                member, namespace, functools.partial(self._render_ident, member, is_member=True)
+            ))
+        result.append('\n')
+        return ''.join(result)
 
     def namespace(self):
         namespace = self.item.get('namespace')
@@ -247,34 +328,37 @@ class ItemMd:
         if parameters is None or len(parameters) == 0:
             return None
 
-        result = 'Parameters\n'
+        result = ['Parameters\n']
         has_description = any(map(lambda x: 'description' in x, parameters))
 
         if has_description:
-            result += '\n| Type | Name | Description |\n'
-            result += '|---|---|---|\n'
+            result.append('\n| Type | Name | Description |\n')
+            result.append('|---|---|---|\n')
             for param in parameters:
-                result += '| %s | *%s* | %s |\n' % (
+                result.append('| %s | *%s* | %s |\n' % (
                     self.ident_str(param['type']),
                     text_to_md(param['id']),
-                    newline_to_br(html_to_md(param.get('description', '&nbsp;'))),
-                )
+                    newline_to_br(
+                        self.docfx_md.html_to_md(param.get('description', '&nbsp;'), cell=True)
+                    ),
+                ))
         else:
-            result += '\n| Type | Name |\n'
-            result += '|---|---|\n'
+            result.append('\n| Type | Name |\n')
+            result.append('|---|---|\n')
             for param in parameters:
-                result += '| %s | *%s* |\n' % (
+                result.append('| %s | *%s* |\n' % (
                     self.ident_str(param['type']),
                     text_to_md(param['id']),
-                )
+                ))
 
-        return result + '\n'
+        result.append('\n')
+        return ''.join(result)
 
     def remarks(self):
         remarks = self.item.get('remarks')
         if remarks is None:
             return None
-        return 'Remarks\n\n%s\n' % html_to_md(remarks)
+        return 'Remarks\n\n%s\n' % self.docfx_md.html_to_md(remarks)
 
     def return_(self):
         if 'syntax' not in self.item:
@@ -284,42 +368,40 @@ class ItemMd:
         if return_result is None:
             return None
 
-        result = ''
         if self.type == TYPE_FIELD:
-            result += 'Field Value\n'
+            result = ['Field Value\n']
         elif self.type == TYPE_PROPERTY:
-            result += 'Property Value\n'
+            result = ['Property Value\n']
         else:
-            result += 'Returns\n'
+            result = ['Returns\n']
 
         if 'description' in return_result:
-            result += '\n| Type | Description |\n'
-            result += '|---|---|\n'
-            result += '| %s | %s |\n' % (
+            result.append('\n| Type | Description |\n')
+            result.append('|---|---|\n')
+            result.append('| %s | %s |\n' % (
                 self.ident_str(return_result['type']),
-                newline_to_br(html_to_md(return_result['description'])),
-            )
+                newline_to_br(self.docfx_md.html_to_md(return_result['description'], cell=True)),
+            ))
         else:
-            result += '\n| Type |\n'
-            result += '|---|\n'
-            result += '| %s |\n' % self.ident_str(return_result['type'])
+            result.append('\n| Type |\n')
+            result.append('|---|\n')
+            result.append('| %s |\n' % self.ident_str(return_result['type']))
 
-        return result + '\n'
+        result.append('\n')
+        return ''.join(result)
 
     def summary(self):
         summary = self.item.get('summary')
         if summary is None:
             return None
 
-        return html_to_md(summary) + '\n'
+        return self.docfx_md.html_to_md(summary) + '\n'
 
     def syntax(self):
         syntax = self.item.get('syntax')
         if syntax is None:
             return None
 
-        result = ''
-
         if LANG == LANG_CS:
             content_key = 'content'
             lang = 'csharp'
@@ -327,12 +409,8 @@ class ItemMd:
             content_key = 'content.vb'
             lang = ''
 
-        if self.type == TYPE_CLASS:
-            result += 'Syntax\n'
-        else:
-            result += 'Declaration\n'
-
-        result += '\n```%s\n' % lang
-        result += syntax[content_key]
-        result += '\n```\n\n'
-        return result
+        return '%s\n```%s\n%s\n```\n\n' % (
+            'Syntax\n' if self.type == TYPE_CLASS else 'Declaration\n',
+            lang,
+            syntax[content_key],
+        )
@@ -0,0 +1,104 @@
+import os
+import re
+
+from convert import Escaper
+
+
+SUFFIX_REGEX = re.compile(r'-([0-9]+)$')
+
+escape_file_name = Escaper({'`': '-'})
+escape_link = Escaper({' ': '-', '`': '-'})
+
+
+def directory_mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+class LinkIndex:
+    def __init__(self, root, **kwargs):
+        self.root = root
+
+        self.absolute_link_path = kwargs.get('absolute_link_path', '')
+        self.link_extensions = kwargs.get('link_extensions', True)
+
+        # link name -> the page it resolves to, None until the directory is indexed
+        self.links = None
+
+        # name without the -N suffix -> its suffixed variants ordered by generic arity
+        self.variants = {}
+
+        # basename -> path of its yml, None for documents that were not read from disk
+        self.file_names = {}
+
+        # directory -> its mtime when it was last walked
+        self.directories = {}
+
+    def index_directory(self):
+        self.links = {}
+        self.variants = {}
+        self.directories = {}
+        paths = []
+
+        for root, _, files in os.walk(self.root):
+            self.directories[root] = directory_mtime(root)
+            for fname in files:
+                if not fname.endswith('.yml'):
+                    continue
+
+                path = os.path.join(root, fname)
+                self.add_link(path)
+                paths.append(path)
+
+        return paths
+
+    def directories_changed(self):
+        # files are added, removed or renamed in one of the walked directories,
+        # or a subdirectory was created below them
+        return any(
+            directory_mtime(path) != mtime for path, mtime in self.directories.items()
+        )
+
+    def add_link(self, fname):
+        name = os.path.relpath(fname, self.root if len(self.root) != 0 else os.curdir)
+        if name.endswith('.yml'):
+            name = name[:-4]
+        self.add_link_name(name, fname)
+
+    def add_link_name(self, name, fname=None):
+        if self.links is None:
+            self.links = {}
+        self.file_names[os.path.basename(name)] = fname
+        added = name not in self.links
+
+        # exact file names take precedence over -N suffixed variants, of those the one with
+        # the lowest arity is linked no matter in which order the files were found
+        self.links[name] = name
+        match = SUFFIX_REGEX.search(name)
+        if match is not None:
+            base = name[:match.start()]
+            variants = self.variants.setdefault(base, [])
+            if name not in variants:
+                variants.append(name)
+                variants.sort(key=lambda x: int(SUFFIX_REGEX.search(x).group(1)))
+            if self.links.get(base) != base:
+                self.links[base] = variants[0]
+        return added
+
+    def target(self, name):
+        # the page a file name links to
+        if self.links is None:
+            self.index_directory()
+        return self.links.get(name)
+
+    def page_link(self, fname):
+        if self.absolute_link_path is not None and len(self.absolute_link_path) != 0:
+            if self.absolute_link_path[-1] == '/':
+                fname = self.absolute_link_path + fname
+            else:
+                fname = '%s/%s' % (self.absolute_link_path, fname)
+        if self.link_extensions:
+            fname += '.md'
+        return fname
@@ -0,0 +1,158 @@
+import hashlib
+import json
+import os
+
+from item_md import TYPE_NAMESPACE
+
+
+MANIFEST_NAME = '.docfxmd-manifest.json'
+MANIFEST_VERSION = 2
+
+
+def hash_bytes(data):
+    return hashlib.sha1(data).hexdigest()
+
+def hash_fragments(fragments):
+    digest = hashlib.sha1()
+    for fragment in fragments:
+        digest.update(fragment.encode('utf-8'))
+    return digest.hexdigest()
+
+def hash_file(fname):
+    with open(fname, 'rb') as file:
+        return hash_bytes(file.read())
+
+def stat_file(fname):
+    try:
+        stat = os.stat(fname)
+    except FileNotFoundError:
+        return None
+    return {
+        'size': stat.st_size,
+        'mtime': stat.st_mtime_ns,
+    }
+
+
+class Manifest:
+    def __init__(self, path, options=None):
+        self.path = path
+        self.options = options if options is not None else {}
+
+        # basename -> {'input', 'output', 'uids', 'type', 'namespace', 'links', 'items'}
+        self.pages = {}
+
+    @staticmethod
+    def load(path, options=None):
+        manifest = Manifest(path, options)
+
+        try:
+            with open(path, 'r', encoding='utf-8') as file:
+                data = json.load(file)
+        except (FileNotFoundError, ValueError):
+            return manifest
+
+        # a manifest written with different options describes different outputs
+        if data.get('version') != MANIFEST_VERSION or data.get('options') != manifest.options:
+            return manifest
+
+        manifest.pages = data.get('pages', {})
+        return manifest
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or os.curdir, exist_ok=True)
+        with open(self.path, 'w', encoding='utf-8') as file:
+            json.dump({
+                'version': MANIFEST_VERSION,
+                'options': self.options,
+                'pages': self.pages,
+            }, file, indent=1, sort_keys=True)
+
+    def input_changed(self, basename, fname):
+        page = self.pages.get(basename)
+        if page is None:
+            return True
+
+        record = page['input']
+        stat = stat_file(fname)
+        if stat is None or stat['size'] != record['size']:
+            return True
+        if stat['mtime'] == record['mtime']:
+            return False
+        return hash_file(fname) != record['hash']
+
+    def output_changed(self, basename):
+        record = self.pages[basename]['output']
+        if record is None:
+            return False
+
+        stat = stat_file(record['path'])
+        if stat is None or stat['size'] != record['size']:
+            return True
+        if stat['mtime'] == record['mtime']:
+            return False
+        return hash_file(record['path']) != record['hash']
+
+    def references_changed(self, basename, doc_md, changed):
+        page = self.pages[basename]
+
+        for query, target in page['links'].items():
+            if doc_md.link_index.links.get(query) != target:
+                return True
+
+        for uid, source in page['items'].items():
+            current = doc_md.get_item_source(uid)
+            if current != source or current in changed:
+                return True
+
+        return False
+
+    def changed_pages(self, fnames):
+        return set(
+            basename for basename, fname in fnames.items() if self.input_changed(basename, fname)
+        )
+
+    def dirty_pages(self, doc_md, fnames, changed):
+        dirty = set(changed)
+        for basename in fnames:
+            if basename in dirty:
+                continue
+            if self.output_changed(basename) or self.references_changed(basename, doc_md, changed):
+                dirty.add(basename)
+        return dirty
+
+    def unchanged_uids(self, changed):
+        for basename, page in self.pages.items():
+            if basename not in changed:
+                for uid in page['uids']:
+                    yield uid, basename
+
+    def unchanged_types(self, changed):
+        for basename, page in self.pages.items():
+            if basename not in changed and page['type'] not in (None, TYPE_NAMESPACE):
+                yield basename, page['namespace'], page['type']
+
+    def namespace_pages(self):
+        return [
+            basename for basename, page in self.pages.items() if page['type'] == TYPE_NAMESPACE
+        ]
+
+    def update_page(self, basename, fname, record):
+        with open(fname, 'rb') as file:
+            data = file.read()
+        stat = stat_file(fname)
+
+        record['input'] = {
+            'size': stat['size'],
+            'mtime': stat['mtime'],
+            'hash': hash_bytes(data),
+        }
+        self.pages[basename] = record
+
+    def prune(self, basenames):
+        removed = []
+        for basename in list(self.pages.keys()):
+            if basename not in basenames:
+                output = self.pages.pop(basename)['output']
+                if output is not None:
+                    removed.append(output['path'])
+        return removed
@@ -0,0 +1,172 @@
+from item_md import ident_name, split_namespace
+from lru import LruCache, MISSING
+import name_parser
+from stats import STAGE_PARSE
+
+
+DEFAULT_MEMO_SIZE = 65536
+
+# cached in place of a parse tree for strings name_parser rejects
+PARSE_ERROR = object()
+
+
+class References:
+    def __init__(self, stats=None):
+        self.stats = stats
+
+        # link name -> page and uid -> source looked up while rendering,
+        # None while nothing is tracked
+        self.links = None
+        self.items = None
+
+    def start(self):
+        self.links = {}
+        self.items = {}
+
+    def end(self):
+        refs = (self.links, self.items)
+        self.links = None
+        self.items = None
+        return refs
+
+    def link(self, name, target):
+        if self.links is not None:
+            self.links[name] = target
+
+    def item(self, uid, source):
+        if self.items is not None:
+            self.items[uid] = source
+
+    def usable(self, entry, name):
+        # entries rendered while references were not tracked do not know their links
+        if entry is not None and (self.links is None or entry[1] is not None):
+            if self.stats is not None:
+                self.stats.count('%s_hits' % name)
+            return True
+
+        if self.stats is not None:
+            self.stats.count('%s_misses' % name)
+        return False
+
+    def replay(self, entry):
+        if self.links is not None:
+            self.links.update(entry[1])
+            self.items.update(entry[2])
+        return entry[0]
+
+    def tracked(self, render):
+        # renders and returns (result, links, items) with the references looked up on the way
+        refs = (self.links, self.items)
+        if refs[0] is not None:
+            self.start()
+        try:
+            result = render()
+        finally:
+            links, items = self.links, self.items
+            if refs[0] is not None:
+                refs[0].update(links)
+                refs[1].update(items)
+                self.links, self.items = refs
+        return result, links, items
+
+
+class NamespaceNames:
+    def __init__(self, max_size):
+        # namespace -> (its parts, {identifier: name relative to the namespace}),
+        # shared by every item of the namespace and filled up to max_size names
+        self.names = {}
+        self.size = 0
+        self.max_size = max_size
+
+    def ident_name(self, namespace, string):
+        entry = self.names.get(namespace)
+        if entry is None:
+            entry = self.names[namespace] = (split_namespace(namespace), {})
+
+        names = entry[1]
+        result = names.get(string)
+        if result is None:
+            result = ident_name(entry[0], string)
+            if self.size < self.max_size:
+                names[string] = result
+                self.size += 1
+        return result
+
+    def clear(self):
+        self.names.clear()
+        self.size = 0
+
+
+class NameMemo:
+    def __init__(self, refs, **kwargs):
+        self.refs = refs
+        self.stats = kwargs.get('stats')
+
+        memo_size = kwargs.get('memo_size', DEFAULT_MEMO_SIZE)
+        self.parse_cache = LruCache(memo_size) if memo_size != 0 else None
+        self.ident_cache = LruCache(memo_size) if memo_size != 0 else None
+        self.namespace_names = NamespaceNames(memo_size)
+
+        # basename -> {(member uid, namespace): rendered link} of the members the page
+        # declares, shared by every page that inherits them
+        self.member_links = {}
+
+    def parse_name(self, string):
+        if self.parse_cache is None:
+            return self._parse_name(string)
+
+        result = self.parse_cache.get(string, MISSING)
+        if self.stats is not None:
+            self.stats.count('parse_cache_hits' if result is not MISSING else 'parse_cache_misses')
+
+        if result is MISSING:
+            try:
+                result = self._parse_name(string)
+            except ValueError:
+                self.parse_cache.put(string, PARSE_ERROR)
+                raise
+            self.parse_cache.put(string, result)
+        elif result is PARSE_ERROR:
+            raise ValueError('cannot parse name: ' + string)
+
+        # the parse tree is shared between callers and must not be modified
+        return result
+
+    def _parse_name(self, string):
+        if self.stats is None:
+            return name_parser.parse(string)
+
+        with self.stats.timer(STAGE_PARSE):
+            return name_parser.parse(string)
+
+    def ident_name(self, namespace, string):
+        return self.namespace_names.ident_name(namespace, string)
+
+    def cached_ident(self, key, render):
+        if self.ident_cache is None:
+            return render()
+
+        entry = self.ident_cache.get(key)
+        if self.refs.usable(entry, 'ident_cache'):
+            return self.refs.replay(entry)
+
+        entry = self.refs.tracked(render)
+        self.ident_cache.put(key, entry)
+        return entry[0]
+
+    def member_link(self, source, key, render):
+        links = self.member_links.setdefault(source, {})
+        entry = links.get(key)
+        if self.refs.usable(entry, 'member_link'):
+            return self.refs.replay(entry)
+
+        entry = links[key] = self.refs.tracked(render)
+        return entry[0]
+
+    def clear(self):
+        if self.parse_cache is not None:
+            self.parse_cache.clear()
+        if self.ident_cache is not None:
+            self.ident_cache.clear()
+        self.member_links.clear()
+        self.namespace_names.clear()
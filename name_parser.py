@@ -1,4 +1,4 @@
-from collections import deque
+import re
 
 
 TOKEN_STR = 'str'
@@ -13,53 +13,26 @@ TOKEN_COMMA = ','
 TOKEN_LT = '<'
 TOKEN_GT = '>'
 
+TOKEN_REGEX = re.compile(r'([A-Za-z_][A-Za-z0-9_`]*)|([.()\[\],<>{}])| +|(.)', re.DOTALL)
+
 def tokenize(string):
     tokens = []
-    idx = 0
-
-    while idx < len(string):
-        char = string[idx]
-        if char in 'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz_':
-            i = idx
-            while i < len(string):
-                cur = string[i]
-                if cur not in 'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789_`':
-                    break
-                i += 1
-
-            name = string[idx:i]
-            idx = i - 1
+
+    for name, punct, invalid in TOKEN_REGEX.findall(string):
+        if name:
             tokens.append( (TOKEN_STR, name) )
-        elif char == '.':
-            tokens.append( (TOKEN_DOT, None) )
-        elif char == '(':
-            tokens.append( (TOKEN_LPAREN, None) )
-        elif char == ')':
-            tokens.append( (TOKEN_RPAREN, None) )
-        elif char == '[':
-            tokens.append( (TOKEN_LBRACKET, None) )
-        elif char == ']':
-            tokens.append( (TOKEN_RBRACKET, None) )
-        elif char == ',':
-            tokens.append( (TOKEN_COMMA, None) )
-        elif char == '<':
-            tokens.append( (TOKEN_LT, None) )
-        elif char == '>':
-            tokens.append( (TOKEN_GT, None) )
-        elif char == '{':
-            tokens.append( (TOKEN_LBRACE, None) )
-        elif char == '}':
-            tokens.append( (TOKEN_RBRACE, None) )
-        elif char == ' ':
-            pass
-        else:
+        elif punct:
+            # the punctuation token types are the characters themselves
+            tokens.append( (punct, None) )
+        elif invalid:
             raise ValueError('cannot parse name: ' + string)
-        idx += 1
 
     return tokens
 
 def tostring(ident, **kwargs):
     include_containers = kwargs.get('include_containers', True)
+    # generic containers become `N like in docfx uids and file names when not included
+    generic_arity = kwargs.get('generic_arity', False)
     prepare_sub_ident = kwargs.get('prepare_sub_ident')
 
     result = ''
@@ -77,6 +50,8 @@ def tostring(ident, **kwargs):
         if container is not None and include_containers:
             surround, idlist = container
             result += surround[0] + ', '.join(map(tostr_ident, idlist)) + surround[1]
+        elif container is not None and generic_arity and container[0] == '<>':
+            result += '`%d' % len(container[1])
 
         if i != len(ident) - 1:
             result += '.'
@@ -95,108 +70,78 @@ container = LPAREN , idlist , RPAREN
 """
 
 def parse(string):
-    tokens = deque(tokenize(string))
+    tokens = tokenize(string)
 
-    idlist = _idlist(tokens)
-    if len(tokens) != 0:
-        raise ValueError()
+    idlist, pos = _idlist(tokens, 0)
+    if pos != len(tokens):
+        raise ValueError('cannot parse name: ' + string)
     return idlist
 
-def _idlist(queue):
-    identifiers = []
-    identifier = _identifier(queue)
+def _idlist(tokens, pos):
+    identifier, pos = _identifier(tokens, pos)
     if identifier is None:
-        return None
-    identifiers.append(identifier)
+        return None, pos
+    identifiers = [identifier]
 
-    while len(queue) != 0:
-        token = queue.popleft()
-        if token[0] != TOKEN_COMMA:
-            queue.appendleft(token)
-            break
-
-        identifier = _identifier(queue)
+    while pos < len(tokens) and tokens[pos][0] == TOKEN_COMMA:
+        identifier, pos = _identifier(tokens, pos + 1)
         if identifier is None:
             raise ValueError()
         identifiers.append(identifier)
 
-    return identifiers
+    return identifiers, pos
 
-def _identifier(queue):
-    segments = []
-    segment = _segment(queue)
+def _identifier(tokens, pos):
+    segment, pos = _segment(tokens, pos)
     if segment is None:
-        return None
-    segments.append(segment)
-
-    while len(queue) != 0:
-        token = queue.popleft()
-        if token[0] != TOKEN_DOT:
-            queue.appendleft(token)
-            break
+        return None, pos
+    segments = [segment]
 
-        segment = _segment(queue)
+    while pos < len(tokens) and tokens[pos][0] == TOKEN_DOT:
+        segment, pos = _segment(tokens, pos + 1)
         if segment is None:
             raise ValueError()
         segments.append(segment)
 
-    return segments
-
-def _segment(queue):
-    if len(queue) == 0:
-        return None
-
-    token = queue.popleft()
-    if token[0] != TOKEN_STR:
-        queue.appendleft(token)
-        return None
-    return (token[1], _container(queue))
+    return segments, pos
 
-def _container(queue):
-    if len(queue) == 0:
-        return None
+def _segment(tokens, pos):
+    if pos >= len(tokens) or tokens[pos][0] != TOKEN_STR:
+        return None, pos
 
-    token = queue.popleft()
+    container, end = _container(tokens, pos + 1)
+    return (tokens[pos][1], container), end
 
-    def handle(close_token, wrapper, on_none=None):
-        idlist = _idlist(queue)
-        if idlist is None:
-            if on_none is None:
-                raise ValueError()
-            idlist = on_none()
+CONTAINERS = {
+    TOKEN_LPAREN: (TOKEN_RPAREN, '()'),
+    TOKEN_LBRACKET: (TOKEN_RBRACKET, '[]'),
+    TOKEN_LT: (TOKEN_GT, '<>'),
+    TOKEN_LBRACE: (TOKEN_RBRACE, '<>'),
+}
 
-        if len(queue) == 0:
-            raise ValueError()
-        token = queue.popleft()
-        if token[0] != close_token:
-            raise ValueError()
-        return (wrapper, idlist)
-
-    if token[0] == TOKEN_LPAREN:
-        return handle(TOKEN_RPAREN, '()')
-    if token[0] == TOKEN_LBRACKET:
-        return handle(TOKEN_RBRACKET, '[]', on_none=lambda: [])
-    if token[0] == TOKEN_LT:
-        return handle(TOKEN_GT, '<>')
-
-    def lbrace_or_idlist():
-        token = queue.popleft()
-        if token[0] != TOKEN_LBRACE:
-            raise ValueError()
+def _container(tokens, pos):
+    if pos >= len(tokens) or tokens[pos][0] not in CONTAINERS:
+        return None, pos
 
-        token = queue.popleft()
-        if token[0] != TOKEN_STR:
-            raise ValueError()
-        value = token[1]
+    kind = tokens[pos][0]
+    close_token, wrapper = CONTAINERS[kind]
 
-        token = queue.popleft()
-        if token[0] != TOKEN_RBRACE:
+    idlist, pos = _idlist(tokens, pos + 1)
+    if idlist is None:
+        if kind == TOKEN_LBRACKET:
+            idlist = []
+        elif kind == TOKEN_LBRACE:
+            idlist, pos = _brace_name(tokens, pos)
+        else:
             raise ValueError()
 
-        return [[(value, None)]]
-
-    if token[0] == TOKEN_LBRACE:
-        return handle(TOKEN_RBRACE, '<>', on_none=lbrace_or_idlist)
+    if pos >= len(tokens) or tokens[pos][0] != close_token:
+        raise ValueError()
+    return (wrapper, idlist), pos + 1
 
-    queue.appendleft(token)
-    return None
+def _brace_name(tokens, pos):
+    # the {{T}} form docfx uses for unbound type parameters
+    kinds = [token[0] for token in tokens[pos:pos + 3]]
+    if kinds != [TOKEN_LBRACE, TOKEN_STR, TOKEN_RBRACE]:
+        raise ValueError()
+    return [[(tokens[pos + 1][1], None)]], pos + 3
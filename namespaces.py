@@ -0,0 +1,135 @@
+from convert import text_to_md
+from item_md import TYPE_NAMESPACE, TYPE_CLASS, TYPE_STRUCT, TYPE_INTERFACE, TYPE_ENUM
+from writer import FragmentWriter
+
+
+# types counted on the namespace index pages, in the order they are listed
+TYPE_COUNTS = (
+    (TYPE_CLASS, 'Classes'),
+    (TYPE_STRUCT, 'Structs'),
+    (TYPE_INTERFACE, 'Interfaces'),
+    (TYPE_ENUM, 'Enums'),
+)
+
+
+def parent_namespace(name, names):
+    parts = name.split('.')
+    for num in range(len(parts) - 1, 0, -1):
+        parent = '.'.join(parts[:num])
+        if parent in names:
+            return parent
+    return ''
+
+
+class NamespaceRegistry:
+    def __init__(self):
+        # namespace name -> ItemRef of its namespace page
+        self.namespaces = {}
+
+        # basename -> (namespace, type) of the type a page documents
+        self.page_types = {}
+
+    def add_page(self, basename, items):
+        self.page_types.pop(basename, None)
+        if len(items) != 0 and items[0].type == TYPE_NAMESPACE:
+            self.namespaces[items[0].name] = items[0]
+        elif len(items) != 0:
+            self.add_page_type(basename, items[0].namespace_name, items[0].type)
+
+    def remove_page(self, basename, items):
+        for itm in items:
+            if itm.type == TYPE_NAMESPACE and self.namespaces.get(itm.name) is itm:
+                del self.namespaces[itm.name]
+        self.page_types.pop(basename, None)
+
+    def add_page_type(self, basename, namespace, type_):
+        self.page_types[basename] = (namespace, type_)
+
+    def tree(self):
+        # namespace -> the nearest namespaces below it, '' holds the top level ones. dotted
+        # prefixes that namespaces branch off from get a node even without a namespace page,
+        # like Microsoft for Microsoft.Azure and Microsoft.Extensions
+        branches = {}
+        for name in self.namespaces:
+            parts = name.split('.')
+            for num in range(1, len(parts)):
+                branches.setdefault('.'.join(parts[:num]), set()).add(parts[num])
+
+        nodes = set(self.namespaces)
+        nodes.update(prefix for prefix, names in branches.items() if len(names) > 1)
+
+        tree = {'': []}
+        for name in sorted(nodes):
+            tree[name] = []
+            tree[parent_namespace(name, nodes)].append(name)
+        return tree
+
+    def type_counts(self):
+        # namespace -> {type: number of pages}
+        counts = {}
+        for namespace, type_ in self.page_types.values():
+            namespace_counts = counts.setdefault(namespace, {})
+            namespace_counts[type_] = namespace_counts.get(type_, 0) + 1
+        return counts
+
+
+def namespace_index_md(doc_md):
+    out = FragmentWriter()
+    write_namespace_index_md(doc_md, out)
+    return out.getvalue()
+
+def write_namespace_index_md(doc_md, out):
+    out.write('# Namespaces\n\n')
+
+    for name in sorted(doc_md.namespace_registry.namespaces.keys()):
+        write_namespace_entry_md(doc_md, out, name)
+
+def namespace_index_pages(doc_md, index_name):
+    # [(page name, fragments)], index_name lists the top level namespaces and
+    # index_name.NAMESPACE the namespaces right below each one that has any
+    tree = doc_md.namespace_registry.tree()
+    counts = doc_md.namespace_registry.type_counts()
+
+    pages = []
+    for name, children in sorted(tree.items()):
+        if len(name) != 0 and len(children) == 0:
+            continue
+
+        out = FragmentWriter()
+        if len(name) == 0:
+            page_name = index_name
+            out.write('# Namespaces\n\n')
+        else:
+            page_name = '%s.%s' % (index_name, name)
+            out.write('# Namespaces in %s\n\n' % text_to_md(name))
+
+        for child in children:
+            index_link = None
+            if len(tree[child]) != 0:
+                index_link = doc_md.link_index.page_link('%s.%s' % (index_name, child))
+            write_namespace_entry_md(doc_md, out, child, counts.get(child, {}), index_link)
+        pages.append((page_name, out.fragments))
+    return pages
+
+def write_namespace_entry_md(doc_md, out, name, counts=None, index_link=None):
+    namespace = doc_md.namespace_registry.namespaces.get(name)
+    if namespace is None:
+        # a prefix several namespaces share, there is no page to link to
+        out.write('## %s\n\n' % text_to_md(name))
+    else:
+        out.write('## [%s](%s)\n\n' % (text_to_md(name), doc_md.get_link(namespace.uid)))
+
+        summary = namespace.summary()
+        if summary is not None:
+            out.write(summary)
+
+    if counts is not None:
+        labels = [
+            '%s: %d' % (label, counts[type_]) for type_, label in TYPE_COUNTS
+            if type_ in counts
+        ]
+        if len(labels) != 0:
+            out.write('%s\n\n' % ', '.join(labels))
+
+    if index_link is not None:
+        out.write('[Namespaces in %s](%s)\n\n' % (text_to_md(name), index_link))
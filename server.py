@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+
+import argparse
+import collections
+import json
+import os
+import sys
+import time
+import urllib.parse
+from wsgiref.simple_server import make_server
+
+from cache import DocumentCache, DEFAULT_CACHE_SIZE
+from docfxmd_class import DocfxMd
+from lru import LruCache
+from memo import DEFAULT_MEMO_SIZE
+from namespaces import namespace_index_md
+from stats import percentiles
+
+
+DEFAULT_PAGE_CACHE_SIZE = 1024
+
+# render latencies kept for the percentiles
+LATENCY_SAMPLES = 10000
+
+INDEX_PAGE = '!Namespaces'
+STATS_PATH = '_stats'
+UID_PREFIX = 'uid/'
+
+
+class PageServer:
+    # renders pages when they are requested, startup only walks the directory for the link
+    # table and every yml is indexed when a page first needs one of its uids
+    def __init__(self, dname, **kwargs):
+        start = time.perf_counter()
+
+        cache = None
+        if kwargs.get('cache_dir') is not None:
+            cache = DocumentCache(kwargs['cache_dir'], kwargs.get('cache_size', DEFAULT_CACHE_SIZE))
+
+        self.doc_md = DocfxMd(dname, **dict(
+            kwargs, streaming=True, lazy=True, cache=cache, stats=None
+        ))
+        self.doc_md.link_index.index_directory()
+
+        # basename -> ({basename: input mtime} of the files it was rendered from, markdown)
+        self.pages = LruCache(kwargs.get('page_cache_size', DEFAULT_PAGE_CACHE_SIZE))
+        self.index = None
+
+        # basename -> mtime of the input the loaded uids came from
+        self.mtimes = {}
+
+        # hits, misses and invalidated pages
+        self.counts = collections.Counter()
+        self.latencies = collections.deque(maxlen=LATENCY_SAMPLES)
+        self.startup_seconds = time.perf_counter() - start
+
+    def __call__(self, environ, start_response):
+        path = urllib.parse.unquote(environ.get('PATH_INFO', '/')).lstrip('/')
+
+        if path == STATS_PATH:
+            return respond(start_response, '200 OK', 'application/json', json.dumps(
+                self.stats(), indent=2
+            ))
+
+        if path in ('', INDEX_PAGE, INDEX_PAGE + '.md'):
+            markdown = self.index_md()
+        elif path.startswith(UID_PREFIX):
+            markdown = self.uid_md(path[len(UID_PREFIX):])
+        else:
+            markdown = self.page_md(path[:-3] if path.endswith('.md') else path)
+
+        if markdown is None:
+            return respond(start_response, '404 Not Found', 'text/plain', 'not found\n')
+        return respond(start_response, '200 OK', 'text/markdown', markdown)
+
+    def page_md(self, name):
+        target = self.doc_md.link_index.links.get(name)
+        if target is None:
+            # the file may have been added since the directory was walked, which
+            # is only walked again when one of its directories changed
+            if not self.doc_md.link_index.directories_changed():
+                return None
+            self.reindex()
+            target = self.doc_md.link_index.links.get(name)
+            if target is None:
+                return None
+        return self.render(os.path.basename(target))
+
+    def reindex(self):
+        links = set(self.doc_md.link_index.links)
+        self.doc_md.link_index.index_directory()
+        if not links.issuperset(self.doc_md.link_index.links):
+            # names rendered before the new pages appeared are not linked to them
+            self.doc_md.names.clear()
+            self.pages.clear()
+            self.index = None
+
+    def uid_md(self, uid):
+        source = self.doc_md.get_item_source(uid)
+        if source is None:
+            return None
+        return self.render(source)
+
+    def render(self, basename):
+        entry = self.pages.get(basename)
+        if entry is not None and not self.refresh(entry[0]):
+            self.counts['hits'] += 1
+            return entry[1]
+
+        if entry is None:
+            self.counts['misses'] += 1
+        else:
+            self.counts['invalidated'] += 1
+
+        # inputs loaded for an earlier page may have changed since, then the page is
+        # rendered once more from their new version
+        for _ in range(2):
+            fname = self.doc_md.link_index.file_names.get(basename)
+            if fname is None or self.input_mtime(basename) is None:
+                return None
+
+            start = time.perf_counter()
+            self.doc_md.refs.start()
+            try:
+                markdown = self.doc_md.docfx_file_to_md(fname)
+            finally:
+                _, items = self.doc_md.refs.end()
+            self.latencies.append(time.perf_counter() - start)
+
+            sources = {basename}
+            sources.update(source for source in items.values() if source is not None)
+            mtimes = {source: self.loaded(source) for source in sources}
+            if not self.refresh(mtimes):
+                break
+
+        self.pages.put(basename, (mtimes, markdown))
+        return markdown
+
+    def refresh(self, mtimes):
+        # drops the uids of the inputs that changed since they were loaded,
+        # returns whether any of them did
+        changed = [
+            basename for basename, mtime in mtimes.items() if self.input_mtime(basename) != mtime
+        ]
+        if len(changed) == 0:
+            return False
+
+        for basename in changed:
+            if self.mtimes.get(basename) != self.input_mtime(basename):
+                self.mtimes.pop(basename, None)
+                self.doc_md.remove_file(basename)
+                self.index = None
+        if any(self.input_mtime(basename) is None for basename in changed):
+            self.doc_md.link_index.index_directory()
+
+        # rendered names and parsed links may point at what was dropped
+        self.doc_md.names.clear()
+        return True
+
+    def loaded(self, basename):
+        if basename not in self.mtimes:
+            self.mtimes[basename] = self.input_mtime(basename)
+        return self.mtimes[basename]
+
+    def input_mtime(self, basename):
+        fname = self.doc_md.link_index.file_names.get(basename)
+        if fname is None:
+            return None
+        try:
+            return os.stat(fname).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def index_md(self):
+        # the index needs every namespace, so it is the one request that loads all files
+        if self.index is not None and not self.refresh(self.index[0]):
+            return self.index[1]
+
+        self.doc_md.link_index.index_directory()
+        for basename, fname in sorted(self.doc_md.link_index.file_names.items()):
+            if fname is not None and basename not in self.doc_md.uids.items_by_file:
+                self.doc_md.load_index(fname)
+
+        mtimes = {basename: self.loaded(basename) for basename in self.doc_md.uids.items_by_file}
+        self.index = (mtimes, namespace_index_md(self.doc_md))
+        return self.index[1]
+
+    def stats(self):
+        requests = sum(self.counts.values())
+        latencies = percentiles(self.latencies)
+        return {
+            'startup_seconds': self.startup_seconds,
+            'files': len(self.doc_md.link_index.file_names),
+            'loaded_files': len(self.doc_md.uids.items_by_file),
+            'uids': len(self.doc_md.uids.items),
+            'cached_pages': len(self.pages),
+            'hits': self.counts['hits'],
+            'misses': self.counts['misses'],
+            'invalidated': self.counts['invalidated'],
+            'hit_rate': self.counts['hits'] / requests if requests != 0 else None,
+            'render_ms': {
+                'p%d' % point: seconds * 1000 if seconds is not None else None
+                for point, seconds in latencies.items()
+            },
+        }
+
+
+def respond(start_response, status, content_type, body):
+    body = body.encode('utf-8')
+    start_response(status, [
+        ('Content-Type', '%s; charset=utf-8' % content_type),
+        ('Content-Length', str(len(body))),
+    ])
+    return [body]
+
+def main(args):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-d', '--dir',
+        action='store', metavar='DIR', required=True,
+        help='docfx api directory containing yml files'
+    )
+    parser.add_argument('--host',
+        action='store', default='127.0.0.1',
+        help='address to listen on (default %(default)s)'
+    )
+    parser.add_argument('-p', '--port',
+        action='store', type=int, default=8000,
+        help='port to listen on (default %(default)s)'
+    )
+    parser.add_argument('--abpath',
+        action='store', metavar='PATH',
+        help='set the absolute path prefix for links'
+    )
+    parser.add_argument('--page-cache-size',
+        action='store', metavar='N', type=int, default=DEFAULT_PAGE_CACHE_SIZE,
+        help='rendered pages kept in memory (default %(default)s)'
+    )
+    parser.add_argument('--cache-dir',
+        action='store', metavar='DIR',
+        help='cache parsed yml files in DIR to skip parsing on later starts'
+    )
+    parser.add_argument('--memo-size',
+        action='store', metavar='N', type=int, default=DEFAULT_MEMO_SIZE,
+        help='entries kept in the parsed and rendered identifier caches, 0 disables them'
+        ' (default %(default)s)'
+    )
+    argspace = parser.parse_args(args[1:])
+
+    app = PageServer(
+        argspace.dir,
+        absolute_link_path=argspace.abpath,
+        link_extensions=True,
+        compact=True,
+        page_cache_size=argspace.page_cache_size,
+        cache_dir=argspace.cache_dir,
+        memo_size=argspace.memo_size,
+    )
+    print('found %d files in %.3fs, serving on http://%s:%d/' % (
+        len(app.doc_md.link_index.file_names), app.startup_seconds, argspace.host, argspace.port
+    ))
+
+    with make_server(argspace.host, argspace.port, app) as httpd:
+        try:
+            httpd.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == '__main__':
+    main(sys.argv)
@@ -0,0 +1,138 @@
+import heapq
+import json
+import time
+
+
+STAGE_LOAD = 'load'
+STAGE_ITEMS = 'items'
+STAGE_RENDER = 'render'
+STAGE_LINK = 'get_link'
+STAGE_PARSE = 'name_parser.parse'
+STAGE_HTML = 'html_to_md'
+STAGE_WRITE = 'write'
+STAGE_TOTAL = 'total'
+
+STAGES = (
+    STAGE_LOAD,
+    STAGE_ITEMS,
+    STAGE_RENDER,
+    STAGE_LINK,
+    STAGE_PARSE,
+    STAGE_HTML,
+    STAGE_WRITE,
+    STAGE_TOTAL,
+)
+
+
+def percentiles(values, points=(50, 90, 99)):
+    # nearest rank percentiles of the values, None for each point when there are none
+    values = sorted(values)
+    result = {}
+    for point in points:
+        if len(values) == 0:
+            result[point] = None
+        else:
+            rank = max(1, -(-point * len(values) // 100))
+            result[point] = values[rank - 1]
+    return result
+
+
+class Timer:
+    def __init__(self, stats, stage):
+        self.stats = stats
+        self.stage = stage
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stats.add_time(self.stage, time.perf_counter() - self.start)
+
+
+class BuildStats:
+    def __init__(self):
+        self.times = {}
+        self.calls = {}
+        self.counts = {}
+        self.pages = []
+
+    def timer(self, stage):
+        return Timer(self, stage)
+
+    def add_time(self, stage, seconds):
+        self.times[stage] = self.times.get(stage, 0) + seconds
+        self.calls[stage] = self.calls.get(stage, 0) + 1
+
+    def count(self, name, num=1):
+        self.counts[name] = self.counts.get(name, 0) + num
+
+    def add_page(self, name, seconds):
+        self.pages.append((seconds, name))
+
+    def take(self):
+        # hands the collected numbers to the parent process and starts over
+        data = {
+            'times': self.times,
+            'calls': self.calls,
+            'counts': self.counts,
+            'pages': self.pages,
+        }
+        self.times = {}
+        self.calls = {}
+        self.counts = {}
+        self.pages = []
+        return data
+
+    def merge(self, data):
+        for stage, seconds in data['times'].items():
+            self.times[stage] = self.times.get(stage, 0) + seconds
+        for stage, calls in data['calls'].items():
+            self.calls[stage] = self.calls.get(stage, 0) + calls
+        for name, num in data['counts'].items():
+            self.count(name, num)
+        self.pages.extend(map(tuple, data['pages']))
+
+    def slowest_pages(self, top=10):
+        return heapq.nlargest(top, self.pages)
+
+    def to_dict(self, top=10):
+        return {
+            'stages': {
+                stage: {
+                    'seconds': self.times[stage],
+                    'calls': self.calls[stage],
+                } for stage in self._stages()
+            },
+            'counts': dict(sorted(self.counts.items())),
+            'slowest_pages': [
+                {'page': name, 'seconds': seconds} for seconds, name in self.slowest_pages(top)
+            ],
+        }
+
+    def to_json(self, top=10):
+        return json.dumps(self.to_dict(top), indent=2)
+
+    def format(self, top=10):
+        lines = ['%-20s %10s %10s' % ('stage', 'seconds', 'calls')]
+        for stage in self._stages():
+            lines.append('%-20s %10.3f %10d' % (stage, self.times[stage], self.calls[stage]))
+
+        if len(self.counts) != 0:
+            lines.append('')
+            for name, num in sorted(self.counts.items()):
+                lines.append('%-31s %10d' % (name, num))
+
+        pages = self.slowest_pages(top)
+        if len(pages) != 0:
+            lines.append('')
+            lines.append('slowest pages')
+            for seconds, name in pages:
+                lines.append('%10.3f  %s' % (seconds, name))
+
+        return '\n'.join(lines) + '\n'
+
+    def _stages(self):
+        stages = [stage for stage in STAGES if stage in self.times]
+        return stages + sorted(stage for stage in self.times if stage not in STAGES)
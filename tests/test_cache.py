@@ -0,0 +1,70 @@
+import datetime
+import marshal
+import os
+import pickle
+import tempfile
+import unittest
+
+from cache import DocumentCache
+
+DOCUMENT = {'items': [{'uid': 'Ns.Foo', 'name': 'Foo'}]}
+
+
+def unpickled():
+    raise AssertionError('cache entry was unpickled')
+
+class Exploit:
+    def __reduce__(self):
+        return (unpickled, ())
+
+
+class DocumentCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory() #pylint: disable=consider-using-with
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_get_put(self):
+        cache = DocumentCache(self.tmpdir.name)
+        key = cache.key('Ns.Foo.yml', b'uid: Ns.Foo')
+
+        self.assertIsNone(cache.get(key))
+        cache.put(key, DOCUMENT)
+        self.assertDictEqual(cache.get(key), DOCUMENT)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+        self.assertNotEqual(key, cache.key('Ns.Foo.yml', b'uid: Ns.Bar'))
+        self.assertNotEqual(key, cache.key('Ns.Foo.yml', b'uid: Ns.Foo', compact=True))
+
+    def test_plain_data(self):
+        cache = DocumentCache(self.tmpdir.name)
+        key = cache.key('Ns.Foo.yml', b'')
+
+        self.assertFalse(cache.put(key, {'date': datetime.date(2020, 1, 1)}))
+        self.assertFalse(os.path.exists(cache.path(key)))
+
+        # a pickle dropped into a shared cache directory is never unpickled
+        os.makedirs(os.path.dirname(cache.path(key)), exist_ok=True)
+        with open(cache.path(key), 'wb') as file:
+            pickle.dump(Exploit(), file)
+        self.assertIsNone(cache.get(key))
+
+        # marshal loads code objects and sets, neither is a document
+        for data in (unpickled.__code__, {'items': {1, 2}}):
+            with open(cache.path(key), 'wb') as file:
+                marshal.dump(data, file)
+            self.assertIsNone(cache.get(key))
+        self.assertFalse(cache.put(key, {'items': {1, 2}}))
+
+    def test_evict(self):
+        cache = DocumentCache(self.tmpdir.name)
+        keys = [cache.key('%d.yml' % i, b'') for i in range(3)]
+        for idx, key in enumerate(keys):
+            cache.put(key, DOCUMENT)
+            os.utime(cache.path(key), ns=(idx, idx))
+
+        cache.max_size = os.path.getsize(cache.path(keys[0])) * 2
+        self.assertEqual(cache.evict(), 1)
+        self.assertFalse(os.path.exists(cache.path(keys[0])))
+        self.assertTrue(os.path.exists(cache.path(keys[2])))
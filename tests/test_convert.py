@@ -18,6 +18,64 @@ REPLACE_STRINGS = [
     },
 ]
 
+ESCAPER = [
+    {
+        STR: 'Foo_Bar(x) <T> {a|b} #1 $2 ^3 *4*',
+        REPL: convert.TEXT_ESCAPES,
+        VALUE: r'Foo\_Bar\(x\) &lt;T&gt; \{a\|b\} \#1 \$2 \^3 \*4\*',
+    },
+    {
+        STR: 'plain text',
+        REPL: convert.TEXT_ESCAPES,
+        VALUE: 'plain text',
+    },
+    {
+        STR: 'List<T>.Add(T) ' * 10,
+        REPL: convert.TEXT_ESCAPES,
+        VALUE: r'List&lt;T&gt;.Add\(T\) ' * 10,
+    },
+    {
+        STR: 'a.p.p.l.e',
+        REPL: {
+            '.': '',
+            'l': '',
+            'pp': 'p',
+        },
+        VALUE: 'appe'
+    },
+    {
+        STR: 'ab' * 40,
+        REPL: {
+            'a': 'b',
+            'b': 'c',
+        },
+        VALUE: 'bc' * 40
+    },
+]
+
+HTML_TO_MD = {
+    'plain_text (x)': r'plain\_text \(x\)',
+    '<p>Returns <code>List&lt;T&gt;</code>.</p>': 'Returns `List&lt;T&gt;`.',
+    '<code>List<T></code>': '`List<T>`',
+    '<b>bold</b> <em>it</em>': '**bold** *it*',
+    'a<br>b<br/>c': 'a<br/>b<br/>c',
+    '<a href="https://example.com">a_link</a>': r'[a\_link](https://example.com)',
+    '<paramref name="value"/> or <see langword="null"/>': '`value` or `null`',
+    '<xref href="System.String" data-throw-if-not-resolved="false"></xref>': 'String',
+    '<see cref="M:Ns.Foo.Run(System.Int32)"/>': 'Run',
+    '<pre><code class="lang-csharp">a < b</code></pre>': '\n```\na < b\n```\n',
+    '<b>open': '**open**',
+    'stray</b> close': 'stray close',
+    '<b>x<i>y</b>z': '**x*y***z',
+    '<unknown attr="1">kept</unknown>': 'kept',
+}
+
+# table cells keep code blocks on one line and | inside the cell
+CELL_HTML_TO_MD = {
+    '<pre><code>if (a || b)\n    run();</code></pre>': r'<code>if (a \|\| b)<br/>    run();</code>',
+    'use <code>a|b</code> | c': r'use `a\|b` \| c',
+}
+
 NEWLINE_TO_BR = {
     'abc\n123': 'abc<br/>123'
 }
@@ -28,6 +86,19 @@ class ConvertTest(unittest.TestCase):
         for entry in REPLACE_STRINGS:
             self.assertEqual(convert.replace_strings(entry[STR], entry[REPL]), entry[VALUE])
 
+    def test_escaper(self):
+        for entry in ESCAPER:
+            self.assertEqual(convert.Escaper(entry[REPL])(entry[STR]), entry[VALUE])
+        self.assertRaises(ValueError, convert.Escaper, {'': 'x'})
+
+    def test_html_to_md(self):
+        for key, val in HTML_TO_MD.items():
+            self.assertEqual(convert.html_to_md(key), val)
+
+    def test_cell_html_to_md(self):
+        for key, val in CELL_HTML_TO_MD.items():
+            self.assertEqual(convert.newline_to_br(convert.html_to_md(key, cell=True)), val)
+
     def test_newline_to_br(self):
         for key, val in NEWLINE_TO_BR.items():
             self.assertEqual(convert.newline_to_br(key), val)
@@ -0,0 +1,358 @@
+import contextlib
+import io
+import json
+import os
+import shutil
+import tarfile
+import tempfile
+import unittest
+from unittest import mock
+import zipfile
+
+import yaml
+
+import docfxmd
+from docfxmd_class import DocfxMd
+from namespaces import namespace_index_md
+import manifest
+from watch import Watcher
+from writer import OutputWriter
+
+API_DIR = 'api'
+
+DOCUMENTS = {
+    'Ns': {
+        'items': [{
+            'uid': 'Ns',
+            'id': 'Ns',
+            'name': 'Ns',
+            'type': 'Namespace',
+            'summary': 'The <code>Ns</code> namespace',
+        }],
+        'references': [
+            {'uid': 'Ns.Foo'},
+            {'uid': 'Ns.Bar`1'},
+            {'uid': 'Ns.Kind'},
+            {'uid': 'Other.Missing'},
+        ],
+    },
+    'Ns.Foo': {
+        'items': [
+            {
+                'uid': 'Ns.Foo',
+                'id': 'Foo',
+                'name': 'Foo',
+                'type': 'Class',
+                'namespace': 'Ns',
+                'summary': 'A foo',
+                'inheritance': ['System.Object', 'Ns.Bar{System.Int32}'],
+                'inheritedMembers': ['Ns.Bar`1.Baz(System.Int32)', 'System.Object.ToString'],
+                'syntax': {'content': 'public class Foo : Bar<int>'},
+            },
+            {
+                'uid': 'Ns.Foo.Get(Ns.Kind)',
+                'id': 'Get(Ns.Kind)',
+                'name': 'Get(Kind)',
+                'type': 'Method',
+                'namespace': 'Ns',
+                'syntax': {
+                    'content': 'public Foo Get(Kind kind)',
+                    'parameters': [{'id': 'kind', 'type': 'Ns.Kind', 'description': 'the kind'}],
+                    'return': {'type': 'System.Collections.Generic.List{Ns.Foo}'},
+                },
+            },
+        ],
+    },
+    'Ns.Bar-1': {
+        'items': [
+            {
+                'uid': 'Ns.Bar`1',
+                'id': 'Bar`1',
+                'name': 'Bar<T>',
+                'type': 'Class',
+                'namespace': 'Ns',
+                'syntax': {'content': 'public class Bar<T>'},
+            },
+            {
+                'uid': 'Ns.Bar`1.Baz(System.Int32)',
+                'id': 'Baz(System.Int32)',
+                'name': 'Baz(Int32)',
+                'type': 'Method',
+                'namespace': 'Ns',
+                'syntax': {'content': 'public void Baz(int x)'},
+            },
+        ],
+    },
+    'Ns.Kind': {
+        'items': [
+            {
+                'uid': 'Ns.Kind',
+                'id': 'Kind',
+                'name': 'Kind',
+                'type': 'Enum',
+                'namespace': 'Ns',
+                'syntax': {'content': 'public enum Kind'},
+            },
+            {
+                'uid': 'Ns.Kind.A',
+                'id': 'A',
+                'name': 'A',
+                'type': 'Field',
+                'namespace': 'Ns',
+                'description': 'first',
+            },
+        ],
+    },
+    'toc': [{'uid': 'Ns', 'name': 'Ns'}],
+}
+
+
+def write_documents(dname, documents):
+    os.makedirs(dname, exist_ok=True)
+    for basename, data in documents.items():
+        with open(os.path.join(dname, basename + '.yml'), 'w', encoding='utf-8') as file:
+            yaml.safe_dump(data, file)
+
+def read_tree(dname):
+    result = {}
+    for root, _, files in os.walk(dname):
+        for fname in files:
+            path = os.path.join(root, fname)
+            with open(path, 'r', encoding='utf-8') as file:
+                result[os.path.relpath(path, dname)] = file.read()
+    return result
+
+
+class BuildDirectoryTest(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmpdir = tempfile.TemporaryDirectory() #pylint: disable=consider-using-with
+        os.chdir(self.tmpdir.name)
+        write_documents(API_DIR, DOCUMENTS)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.tmpdir.cleanup()
+
+    def build(self, output_name, **kwargs):
+        docfxmd.build_directory(API_DIR, output_name, namespace_index='!Namespaces', **kwargs)
+        return read_tree(output_name)
+
+    def test_build(self):
+        tree = self.build('out')
+        self.assertSetEqual(set(tree.keys()), {
+            '!Namespaces.md', 'Ns.md', 'Ns.Foo.md', 'Ns.Bar-1.md', 'Ns.Kind.md',
+        })
+        self.assertIn('[Bar&lt;System.Int32&gt;](Ns.Bar-1.md)', tree['Ns.Foo.md'])
+        self.assertIn('## [Ns](Ns.md)', tree['!Namespaces.md'])
+
+    def test_build_jobs(self):
+        self.assertDictEqual(self.build('out_jobs', jobs=2), self.build('out'))
+
+    def test_build_write_threads(self):
+        self.assertDictEqual(self.build('out_threads', write_threads=2), self.build('out'))
+
+    def test_build_streaming(self):
+        self.assertDictEqual(self.build('out_streaming', streaming=True), self.build('out'))
+
+    def test_build_stats(self):
+        self.build('out', stats_json='stats.json', jobs=2)
+        with open('stats.json', 'r', encoding='utf-8') as file:
+            stats = json.load(file)
+
+        self.assertEqual(stats['stages']['render']['calls'], len(DOCUMENTS))
+        self.assertEqual(stats['counts']['files_parsed'], len(DOCUMENTS))
+        self.assertGreater(stats['counts']['link_lookups'], 0)
+        self.assertEqual(len(stats['slowest_pages']), len(DOCUMENTS))
+
+    def test_build_incremental(self):
+        self.build('out_inc', incremental=True)
+        kind_mtime = os.stat(os.path.join('out_inc', 'Ns.Kind.md')).st_mtime_ns
+
+        documents = dict(DOCUMENTS)
+        documents['Ns.Foo'] = {'items': [dict(DOCUMENTS['Ns.Foo']['items'][0], summary='changed')]}
+        write_documents(API_DIR, documents)
+        os.remove(os.path.join(API_DIR, 'Ns.Bar-1.yml'))
+
+        tree = self.build('out_inc', incremental=True, write_threads=2)
+        del tree[manifest.MANIFEST_NAME]
+        self.assertDictEqual(tree, self.build('out'))
+        self.assertEqual(os.stat(os.path.join('out_inc', 'Ns.Kind.md')).st_mtime_ns, kind_mtime)
+
+    def test_build_namespace_pages(self):
+        tree = self.build('out', namespace_pages=True)
+        self.assertIn('Classes: 2, Enums: 1\n', tree['!Namespaces.md'])
+
+        # unchanged pages are not loaded again, their types come from the manifest
+        self.build('out_inc', namespace_pages=True, incremental=True)
+        os.remove(os.path.join('out_inc', 'Ns.Kind.md'))
+
+        tree = self.build('out_inc', namespace_pages=True, incremental=True)
+        full = self.build('out', namespace_pages=True)
+        self.assertEqual(tree['!Namespaces.md'], full['!Namespaces.md'])
+
+    def test_build_unchanged(self):
+        tree = self.build('out')
+        mtimes = {name: os.stat(os.path.join('out', name)).st_mtime_ns for name in tree}
+
+        self.assertDictEqual(self.build('out'), tree)
+        for name, mtime in mtimes.items():
+            self.assertEqual(os.stat(os.path.join('out', name)).st_mtime_ns, mtime)
+
+    def test_build_prune(self):
+        self.build('out', prune=True)
+        os.remove(os.path.join(API_DIR, 'Ns.Bar-1.yml'))
+
+        # pages the build did not write stay, wherever they are
+        hand_written = [
+            'notes.txt', 'Home.md', os.path.join('guides', 'Setup.md'),
+            os.path.join('.git', 'README.md'),
+        ]
+        for name in hand_written:
+            os.makedirs(os.path.dirname(os.path.join('out', name)) or 'out', exist_ok=True)
+            with open(os.path.join('out', name), 'w', encoding='utf-8') as file:
+                file.write('kept')
+
+        self.assertIn('Ns.Bar-1.md', self.build('out'))
+        tree = self.build('out', prune=True)
+        self.assertNotIn('Ns.Bar-1.md', tree)
+        for name in hand_written:
+            self.assertIn(name, tree)
+
+    def test_build_archives(self):
+        tree = self.build('out')
+
+        self.build('out.zip', jobs=2)
+        with zipfile.ZipFile('out.zip') as archive:
+            self.assertDictEqual(
+                {name: archive.read(name).decode('utf-8') for name in archive.namelist()}, tree
+            )
+
+        # the parallel build writes the pages in the order of the serial build
+        self.build('serial.zip')
+        with zipfile.ZipFile('serial.zip') as serial, zipfile.ZipFile('out.zip') as archive:
+            self.assertListEqual(archive.namelist(), serial.namelist())
+
+        self.build('out.tar.gz', write_threads=2)
+        with tarfile.open('out.tar.gz') as archive:
+            self.assertDictEqual({
+                info.name: archive.extractfile(info).read().decode('utf-8') for info in archive
+            }, tree)
+
+    def test_build_jsonl(self):
+        tree = self.build('out')
+
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout):
+            self.build('-', verbose=1)
+        lines = stdout.getvalue().splitlines()
+        self.assertDictEqual({
+            record['path']: record['markdown'] for record in map(json.loads, lines)
+        }, tree)
+
+        with self.assertRaises(ValueError):
+            self.build('out.jsonl', incremental=True)
+
+
+class WatchTest(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmpdir = tempfile.TemporaryDirectory() #pylint: disable=consider-using-with
+        os.chdir(self.tmpdir.name)
+        write_documents(API_DIR, DOCUMENTS)
+
+        self.doc_md = DocfxMd(API_DIR)
+        self.watcher = Watcher(self.doc_md)
+        self.writer = OutputWriter()
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.tmpdir.cleanup()
+
+    def poll(self):
+        pages, removed = self.watcher.poll()
+        for path in removed.values():
+            self.writer.remove(str(docfxmd._output_path('out', path).with_suffix('.md')))
+        for basename in pages:
+            path = self.doc_md.link_index.file_names[basename]
+            _, record = docfxmd._render_page(
+                self.doc_md, self.writer, (basename, path, docfxmd._output_path('out', path)), True
+            )
+            self.watcher.update_page(basename, record['links'], record['items'])
+        return pages, set(removed.keys())
+
+    def assert_built(self):
+        shutil.rmtree('full', ignore_errors=True)
+        docfxmd.build_directory(API_DIR, 'full')
+        self.assertDictEqual(read_tree('out'), read_tree('full'))
+
+    def test_poll(self):
+        self.assertEqual(self.poll(), (set(DOCUMENTS.keys()), set()))
+        self.assertEqual(self.poll(), (set(), set()))
+        self.assert_built()
+
+        documents = {'Ns.Kind': dict(DOCUMENTS['Ns.Kind'])}
+        documents['Ns.Kind']['items'] = [dict(DOCUMENTS['Ns.Kind']['items'][0], name='Kinds')]
+        documents['Ns.Kind']['items'] += DOCUMENTS['Ns.Kind']['items'][1:]
+        write_documents(API_DIR, documents)
+        self.assertEqual(self.poll(), ({'Ns', 'Ns.Kind'}, set()))
+        self.assert_built()
+
+        os.remove(os.path.join(API_DIR, 'Ns.Bar-1.yml'))
+        self.assertEqual(self.poll(), ({'Ns', 'Ns.Foo'}, {'Ns.Bar-1'}))
+        self.assert_built()
+
+        with open(os.path.join(API_DIR, 'Broken.yml'), 'w', encoding='utf-8') as file:
+            file.write('items: [')
+        self.assertEqual(self.poll(), (set(), set()))
+
+    def test_watch_directory(self):
+        docfxmd.watch_directory(API_DIR, 'out', watch_polls=1)
+        self.assert_built()
+
+
+class DocumentsTest(unittest.TestCase):
+    def test_from_documents(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            cwd = os.getcwd()
+            os.chdir(tmpdir)
+            try:
+                write_documents(API_DIR, DOCUMENTS)
+                docfxmd.build_directory(API_DIR, 'out', namespace_index='!Namespaces')
+                tree = read_tree('out')
+            finally:
+                os.chdir(cwd)
+
+        documents = dict(DOCUMENTS)
+        documents['Ns.Kind'] = yaml.safe_dump(DOCUMENTS['Ns.Kind']).encode('utf-8')
+        documents['Ns.Foo.yml'] = yaml.safe_dump(DOCUMENTS['Ns.Foo'])
+        del documents['Ns.Foo']
+
+        def no_io(*args, **kwargs):
+            raise AssertionError('filesystem accessed')
+
+        with mock.patch('builtins.open', no_io), mock.patch('os.walk', no_io), \
+                mock.patch('os.stat', no_io):
+            doc_md = DocfxMd.from_documents(documents)
+            pages = dict(doc_md.pages_md())
+            index = namespace_index_md(doc_md)
+
+            out = io.StringIO()
+            self.assertTrue(doc_md.write_page_md('Ns.Foo.yml', out))
+            self.assertFalse(doc_md.write_page_md('toc', out))
+            self.assertIsNone(doc_md.page_md('Missing'))
+
+        self.assertEqual(index, tree.pop('!Namespaces.md'))
+        self.assertDictEqual({name + '.md': markdown for name, markdown in pages.items()}, tree)
+        self.assertEqual(out.getvalue(), tree['Ns.Foo.md'])
+
+    def test_add_document_after_render(self):
+        documents = {name: data for name, data in DOCUMENTS.items() if name != 'Ns.Kind'}
+        doc_md = DocfxMd.from_documents(documents)
+        before = doc_md.page_md('Ns.Foo')
+        self.assertNotIn('[Kind](Ns.Kind.md)', before)
+
+        doc_md.add_document('Ns.Kind', DOCUMENTS['Ns.Kind'])
+        after = doc_md.page_md('Ns.Foo')
+        self.assertIn('[Kind](Ns.Kind.md)', after)
+        self.assertEqual(after, DocfxMd.from_documents(DOCUMENTS).page_md('Ns.Foo'))
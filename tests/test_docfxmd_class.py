@@ -0,0 +1,356 @@
+import os
+import unittest
+
+from docfxmd_class import DocfxMd
+from documents import load_yaml
+from namespaces import namespace_index_pages
+from item_md import NOT_LOADED
+from stats import BuildStats
+
+ROOT = 'api'
+
+LINK_FILES = [
+    'Ns.Foo.yml',
+    'Ns.Bar-2.yml',
+    'Ns.Bar-1.yml',
+    'Ns.Baz-1.yml',
+    'Ns.Baz.yml',
+    'Ns.Qux-10.yml',
+    'Ns.Qux-2.yml',
+]
+
+GET_LINK = {
+    'Ns.Foo': 'Ns.Foo',
+    'Ns.Bar': 'Ns.Bar-1',
+    'Ns.Bar`1': 'Ns.Bar-1',
+    'Ns.Bar`2': 'Ns.Bar-2',
+    'Ns.Baz': 'Ns.Baz',
+    'Ns.Qux': 'Ns.Qux-2',
+    'Ns.Missing': None,
+}
+
+COMPACT_YAML = b"""### YamlMime:ManagedReference
+items:
+- uid: Ns.Foo
+  name: Foo
+  langs: [csharp, vb]
+  source:
+    path: Foo.cs
+  syntax:
+    content: public class Foo
+    parameters:
+    - id: x
+      type: System.Int32
+references:
+- uid: Ns
+  nameWithType: Ns
+"""
+
+XREF_YAML = b"""### YamlMime:ManagedReference
+items:
+- uid: Ns.Foo
+  id: Foo
+  name: Foo
+  type: Class
+  namespace: Ns
+- uid: Ns.Foo.Run
+  id: Run
+  name: Run()
+  type: Method
+  namespace: Ns
+  summary: Runs <code>Foo</code>.
+"""
+
+RESOLVE_XREF = {
+    '<xref href="Ns.Foo"></xref>': '[Foo](Ns.Foo)',
+    '<xref href="Ns.Foo.Run" data-throw-if-not-resolved="false"></xref>':
+        r'[Run\(\)](Ns.Foo#run)',
+    '<see cref="T:Ns.Foo">the foo</see>': '[the foo](Ns.Foo)',
+    '<xref href="System.String"></xref>': 'String',
+}
+
+ANCHOR_YAML = b"""### YamlMime:ManagedReference
+items:
+- {uid: Ns.Foo`1, id: Foo`1, name: Foo<T>, type: Class, namespace: Ns}
+- {uid: Ns.Foo`1.Run, id: Run, name: Run(), type: Method, namespace: Ns}
+- {uid: Ns.Foo`1.Run(System.Int32), id: Run(System.Int32), name: Run(Int32), type: Method,
+   namespace: Ns}
+- {uid: Ns.Foo`1.Run(System.Int64), id: Run(System.Int64), name: Run(Int32), type: Method,
+   namespace: Ns}
+- {uid: Ns.Foo`1.Size, id: Size, name: Size, type: Property, namespace: Ns}
+"""
+
+ENUM_YAML = b"""### YamlMime:ManagedReference
+items:
+- {uid: Ns.Kind, id: Kind, name: Kind, type: Enum, namespace: Ns}
+- {uid: Ns.Kind.A, id: A, name: A, type: Field, namespace: Ns}
+- {uid: Ns.Kind.Parse, id: Parse, name: Parse, type: Method, namespace: Ns}
+"""
+
+MEMBER_LINKS = {
+    'Ns.Foo`1.Run(System.Int32)': r'[Foo`1.Run\(System.Int32\)](Ns.Foo-1#runint32)',
+    'Ns.Foo`1.Run(System.Int64)': r'[Foo`1.Run\(System.Int64\)](Ns.Foo-1#runint32-1)',
+    'Ns.Foo{System.String}.Run':
+        r'[Foo&lt;System.String&gt;.Run](Ns.Foo-1#run)',
+    'Ns.Foo`1.Missing(System.Int32)':
+        r'[Foo`1.Missing\(System.Int32\)](Ns.Foo-1#missingsystemint32)',
+}
+
+SLUG_YAML = b"""### YamlMime:ManagedReference
+items:
+- {uid: Ns.Tup, id: Tup, name: Tup, type: Class, namespace: Ns}
+- {uid: 'Ns.Tup.Method0(System.Tuple{System.Int32,System.Func{System.Int32,System.String}})',
+   id: 'Method0(System.Tuple{System.Int32,System.Func{System.Int32,System.String}})',
+   name: 'Method0(Tuple<Int32, Func<Int32, String>>)', type: Method, namespace: Ns}
+- {uid: 'Ns.Tup.Method1(System.Object[],System.Byte[])', id: 'Method1(System.Object[],System.Byte[])',
+   name: 'Method1(Object[], Byte[])', type: Method, namespace: Ns}
+"""
+
+SLUG_ANCHORS = {
+    'Ns.Tup.Method0(System.Tuple{System.Int32,System.Func{System.Int32,System.String}})':
+        'method0tupleint32-funcint32-string',
+    'Ns.Tup.Method1(System.Object[],System.Byte[])': 'method1object-byte',
+}
+
+INHERITING_YAML = b"""### YamlMime:ManagedReference
+items:
+- {uid: Ns.Bar, id: Bar, name: Bar, type: Class, namespace: Ns, inheritedMembers: [
+   'Ns.Foo`1.Run(System.Int32)', 'Ns.Foo{System.String}.Run', 'Ns.Foo`1.Missing(System.Int32)']}
+- {uid: Ns.Baz, id: Baz, name: Baz, type: Class, namespace: Ns, inheritedMembers: [
+   'Ns.Foo`1.Run(System.Int32)', 'Ns.Foo{System.String}.Run', 'Ns.Foo`1.Missing(System.Int32)']}
+"""
+
+NAMESPACE_DOCUMENTS = {
+    'A': [{'uid': 'A', 'id': 'A', 'name': 'A', 'type': 'Namespace'}],
+    'A.B': [{'uid': 'A.B', 'id': 'A.B', 'name': 'A.B', 'type': 'Namespace', 'summary': 'Bs'}],
+    'A.B.C.D': [{'uid': 'A.B.C.D', 'id': 'A.B.C.D', 'name': 'A.B.C.D', 'type': 'Namespace'}],
+    'A.B.C.E': [{'uid': 'A.B.C.E', 'id': 'A.B.C.E', 'name': 'A.B.C.E', 'type': 'Namespace'}],
+    'Y.P.Q': [{'uid': 'Y.P.Q', 'id': 'Y.P.Q', 'name': 'Y.P.Q', 'type': 'Namespace'}],
+    'Y.R': [{'uid': 'Y.R', 'id': 'Y.R', 'name': 'Y.R', 'type': 'Namespace'}],
+    'Z': [{'uid': 'Z', 'id': 'Z', 'name': 'Z', 'type': 'Namespace'}],
+    'A.B.Foo': [
+        {'uid': 'A.B.Foo', 'id': 'Foo', 'name': 'Foo', 'type': 'Class', 'namespace': 'A.B'},
+    ],
+    'A.B.Bar': [
+        {'uid': 'A.B.Bar', 'id': 'Bar', 'name': 'Bar', 'type': 'Class', 'namespace': 'A.B'},
+    ],
+    'A.B.Kind': [
+        {'uid': 'A.B.Kind', 'id': 'Kind', 'name': 'Kind', 'type': 'Enum', 'namespace': 'A.B'},
+    ],
+    'Z.Baz': [{'uid': 'Z.Baz', 'id': 'Baz', 'name': 'Baz', 'type': 'Struct', 'namespace': 'Z'}],
+}
+
+NAMESPACE_PAGES = {
+    '!Namespaces': (
+        '# Namespaces\n\n'
+        '## [A](A.md)\n\n'
+        '[Namespaces in A](!Namespaces.A.md)\n\n'
+        '## Y\n\n'
+        '[Namespaces in Y](!Namespaces.Y.md)\n\n'
+        '## [Z](Z.md)\n\n'
+        'Structs: 1\n\n'
+    ),
+    '!Namespaces.A': (
+        '# Namespaces in A\n\n'
+        '## [A.B](A.B.md)\n\n'
+        'Bs\n'
+        'Classes: 2, Enums: 1\n\n'
+        '[Namespaces in A.B](!Namespaces.A.B.md)\n\n'
+    ),
+    '!Namespaces.A.B': (
+        '# Namespaces in A.B\n\n'
+        '## A.B.C\n\n'
+        '[Namespaces in A.B.C](!Namespaces.A.B.C.md)\n\n'
+    ),
+    '!Namespaces.A.B.C': (
+        '# Namespaces in A.B.C\n\n'
+        '## [A.B.C.D](A.B.C.D.md)\n\n'
+        '## [A.B.C.E](A.B.C.E.md)\n\n'
+    ),
+    '!Namespaces.Y': (
+        '# Namespaces in Y\n\n'
+        '## [Y.P.Q](Y.P.Q.md)\n\n'
+        '## [Y.R](Y.R.md)\n\n'
+    ),
+}
+
+
+class DocfxMdTest(unittest.TestCase):
+    def test_get_link(self):
+        doc_md = DocfxMd(ROOT, link_extensions=False)
+        for fname in LINK_FILES:
+            doc_md.link_index.add_link(os.path.join(ROOT, fname))
+
+        for key, val in GET_LINK.items():
+            self.assertEqual(doc_md.get_link(key), val)
+
+        reverse = DocfxMd(ROOT, link_extensions=False)
+        for fname in reversed(LINK_FILES):
+            reverse.link_index.add_link(os.path.join(ROOT, fname))
+        self.assertDictEqual(reverse.link_index.links, doc_md.link_index.links)
+        self.assertListEqual(doc_md.link_index.variants['Ns.Qux'], ['Ns.Qux-2', 'Ns.Qux-10'])
+
+    def test_member_anchors(self):
+        doc_md = DocfxMd(ROOT, link_extensions=False)
+        doc_md.link_index.add_link(os.path.join(ROOT, 'Ns.Foo-1.yml'))
+        doc_md.add_file(os.path.join(ROOT, 'Ns.Foo-1.yml'), load_yaml(ANCHOR_YAML))
+
+        self.assertDictEqual(doc_md.uids.anchors, {})
+        self.assertEqual(doc_md.member_anchor('Ns.Foo`1.Size'), 'size')
+        self.assertIsNone(doc_md.member_anchor('Ns.Missing'))
+
+        doc_md.add_file(os.path.join(ROOT, 'Ns.Kind.yml'), load_yaml(ENUM_YAML))
+        self.assertIsNone(doc_md.member_anchor('Ns.Kind.A'))
+        self.assertEqual(doc_md.member_anchor('Ns.Kind.Parse'), 'parse')
+
+        itm = doc_md.load_page(os.path.join(ROOT, 'Ns.Foo-1.yml'))[1][0]
+        for key, val in MEMBER_LINKS.items():
+            self.assertEqual(itm.ident_str(key, is_member=True), val)
+
+    def test_anchor_slugs(self):
+        # generic and array parameters lose their brackets like the wiki's header anchors
+        doc_md = DocfxMd(ROOT, link_extensions=False)
+        doc_md.link_index.add_link(os.path.join(ROOT, 'Ns.Tup.yml'))
+        doc_md.add_file(os.path.join(ROOT, 'Ns.Tup.yml'), load_yaml(SLUG_YAML))
+
+        for uid, anchor in SLUG_ANCHORS.items():
+            self.assertEqual(doc_md.member_anchor(uid), anchor)
+            self.assertTrue(doc_md.has_anchor('Ns.Tup', anchor))
+        self.assertFalse(doc_md.has_anchor('Ns.Tup', 'method1object[]-byte[]'))
+
+        itm = doc_md.load_page(os.path.join(ROOT, 'Ns.Tup.yml'))[1][0]
+        self.assertEqual(
+            itm.ident_str('Ns.Tup.Missing(System.Byte[])', is_member=True),
+            r'[Tup.Missing\(System.Byte[]\)](Ns.Tup#missingsystembyte)'
+        )
+
+    def test_member_links(self):
+        doc_md = DocfxMd(ROOT, link_extensions=False, stats=BuildStats())
+        doc_md.link_index.add_link(os.path.join(ROOT, 'Ns.Foo-1.yml'))
+        doc_md.add_file(os.path.join(ROOT, 'Ns.Foo-1.yml'), load_yaml(ANCHOR_YAML))
+        doc_md.add_file(os.path.join(ROOT, 'Ns.Bar.yml'), load_yaml(INHERITING_YAML))
+
+        bar, baz = doc_md.load_page(os.path.join(ROOT, 'Ns.Bar.yml'))[1]
+        expected = ''.join(
+            ['Inherited Members\n'] +
+            ['- %s\n' % MEMBER_LINKS[uid] for uid in bar.item['inheritedMembers']] +
+            ['\n']
+        )
+        doc_md.refs.start()
+        self.assertEqual(bar.inherited_members(), expected)
+        refs = doc_md.refs.end()
+        self.assertEqual(len(doc_md.names.member_links['Ns.Foo-1']), 1)
+        self.assertEqual(refs[1]['Ns.Foo`1.Run(System.Int32)'], 'Ns.Foo-1')
+
+        # the second page gets the same links and references without rendering them again
+        doc_md.refs.start()
+        self.assertEqual(baz.inherited_members(), expected)
+        self.assertTupleEqual(doc_md.refs.end(), refs)
+        self.assertEqual(doc_md.stats.counts['member_link_hits'], 3)
+        self.assertEqual(doc_md.stats.counts['member_link_misses'], 3)
+
+        self.assertDictEqual(
+            doc_md.uids.broken_anchors, {'Ns.Foo`1.Missing(System.Int32)': 'Ns.Foo-1'}
+        )
+
+        doc_md.remove_file('Ns.Foo-1')
+        self.assertNotIn('Ns.Foo-1', doc_md.names.member_links)
+
+    def test_namespace_pages(self):
+        # registered while loading, nothing has to be rendered first
+        doc_md = DocfxMd.from_documents(
+            {name: {'items': items} for name, items in reversed(NAMESPACE_DOCUMENTS.items())},
+            link_extensions=True,
+        )
+
+        # A.B.C and Y have no namespace page, Y.P only leads to Y.P.Q and gets no node
+        self.assertDictEqual(doc_md.namespace_registry.tree(), {
+            '': ['A', 'Y', 'Z'], 'A': ['A.B'], 'A.B': ['A.B.C'], 'A.B.C': ['A.B.C.D', 'A.B.C.E'],
+            'A.B.C.D': [], 'A.B.C.E': [], 'Y': ['Y.P.Q', 'Y.R'], 'Y.P.Q': [], 'Y.R': [], 'Z': [],
+        })
+        self.assertDictEqual(doc_md.namespace_registry.type_counts(), {
+            'A.B': {'class': 2, 'enum': 1}, 'Z': {'struct': 1},
+        })
+
+        pages = {
+            name: ''.join(fragments)
+            for name, fragments in namespace_index_pages(doc_md, '!Namespaces')
+        }
+        self.assertDictEqual(pages, NAMESPACE_PAGES)
+
+        doc_md.remove_file('A.B.Kind')
+        self.assertDictEqual(doc_md.namespace_registry.type_counts()['A.B'], {'class': 2})
+
+    def test_compat_api(self):
+        # the entry points DocfxMd had before its state was split up
+        doc_md = DocfxMd.from_documents(
+            {name: {'items': items} for name, items in NAMESPACE_DOCUMENTS.items()},
+            link_extensions=True,
+        )
+
+        self.assertEqual(doc_md.root, '')
+        self.assertTrue(doc_md.link_extensions)
+        self.assertIs(doc_md.files, doc_md.documents.files)
+        self.assertIs(doc_md.items, doc_md.uids.items)
+        self.assertIs(doc_md.items_by_file, doc_md.uids.items_by_file)
+        self.assertListEqual(sorted(doc_md.namespaces), ['A', 'A.B', 'A.B.C.D', 'A.B.C.E',
+                                                         'Y.P.Q', 'Y.R', 'Z'])
+
+        self.assertEqual(doc_md.docfx_file_to_md('A.B.Foo.yml'), doc_md.page_md('A.B.Foo'))
+        self.assertTrue(doc_md.namespace_index_md().startswith('# Namespaces\n\n## [A](A.md)'))
+        self.assertEqual(
+            doc_md.namespace_md({'items': NAMESPACE_DOCUMENTS['A.B'], 'references': []}),
+            '# Namespace A.B\n\n',
+        )
+        self.assertEqual(doc_md.item_header(doc_md.items['A.B.Foo']), '# Class Foo\n\n')
+        self.assertEqual(doc_md.sanitize_link('Ns.Foo`1 Run'), 'Ns.Foo-1-Run')
+
+    def test_load_yaml_compact(self):
+        data = load_yaml(COMPACT_YAML)
+        compact = load_yaml(COMPACT_YAML, compact=True)
+
+        self.assertIn('source', data['items'][0])
+        self.assertDictEqual(compact, {
+            'items': [{
+                'uid': 'Ns.Foo',
+                'name': 'Foo',
+                'syntax': {
+                    'content': 'public class Foo',
+                    'parameters': [{'id': 'x', 'type': 'System.Int32'}],
+                },
+            }],
+            'references': [{'uid': 'Ns'}],
+        })
+
+    def test_parse_name_cache(self):
+        doc_md = DocfxMd(ROOT)
+
+        first = doc_md.names.parse_name('Ns.Foo{System.Int32}')
+        self.assertIs(doc_md.names.parse_name('Ns.Foo{System.Int32}'), first)
+        for _ in range(2):
+            self.assertRaises(ValueError, doc_md.names.parse_name, 'Ns.Foo(')
+        self.assertEqual(doc_md.names.parse_cache.info()['hits'], 2)
+
+    def test_resolve_xref(self):
+        doc_md = DocfxMd(ROOT, link_extensions=False)
+        doc_md.link_index.add_link(os.path.join(ROOT, 'Ns.Foo.yml'))
+        doc_md.add_file(os.path.join(ROOT, 'Ns.Foo.yml'), load_yaml(XREF_YAML))
+
+        for key, val in RESOLVE_XREF.items():
+            self.assertEqual(doc_md.html_to_md(key), val)
+
+    def test_item_refs(self):
+        doc_md = DocfxMd(ROOT, link_extensions=False)
+        doc_md.link_index.add_link(os.path.join(ROOT, 'Ns.Foo.yml'))
+        doc_md.add_file(os.path.join(ROOT, 'Ns.Foo.yml'), load_yaml(XREF_YAML))
+
+        foo = doc_md.get_item('Ns.Foo')
+        run = doc_md.get_item('Ns.Foo.Run')
+        self.assertFalse(hasattr(run, '__dict__'))
+        self.assertListEqual(
+            [itm.uid for itm in doc_md.uids.items_by_file['Ns.Foo']], ['Ns.Foo', 'Ns.Foo.Run']
+        )
+
+        self.assertIsNone(foo.summary())
+        self.assertIs(run.summary_html, NOT_LOADED)
+        self.assertEqual(run.summary(), 'Runs `Foo`.\n')
@@ -0,0 +1,32 @@
+import unittest
+
+from docfxmd_class import DocfxMd
+from item_md import ident_name, split_namespace
+
+
+IDENT_NAME = {
+    ('Ns.Sub', 'Ns.Sub.Foo'): 'Foo',
+    ('Ns.Sub', 'Ns.Other.Foo'): 'Other.Foo',
+    ('Ns.Sub', 'Ns.Sub'): 'Sub',
+    ('Ns', 'Ns'): 'Ns',
+    ('Ns', 'Nsx.Foo'): 'Nsx.Foo',
+    ('Ns', 'Other.Foo'): 'Other.Foo',
+    ('Ns', 'Global.Foo'): 'Foo',
+    ('Ns', 'Ns.List<T>'): 'List&lt;T&gt;',
+    (None, 'Ns.Foo'): 'Ns.Foo',
+}
+
+
+class ItemMdTest(unittest.TestCase):
+    def test_ident_name(self):
+        for (namespace, string), val in IDENT_NAME.items():
+            self.assertEqual(ident_name(split_namespace(namespace), string), val)
+
+    def test_ident_name_memo(self):
+        doc_md = DocfxMd('api', memo_size=2)
+        for (namespace, string), val in IDENT_NAME.items():
+            self.assertEqual(doc_md.names.ident_name(namespace, string), val)
+            self.assertEqual(doc_md.names.ident_name(namespace, string), val)
+
+        self.assertEqual(doc_md.names.namespace_names.size, 2)
+        self.assertTupleEqual(doc_md.names.namespace_names.names['Ns.Sub'][0], ('Ns', 'Sub'))
@@ -0,0 +1,30 @@
+import unittest
+
+from lru import LruCache
+
+
+class LruCacheTest(unittest.TestCase):
+    def test_eviction(self):
+        cache = LruCache(2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        self.assertEqual(cache.get('a'), 1)
+
+        cache.put('c', 3)
+        self.assertIn('a', cache)
+        self.assertNotIn('b', cache)
+        self.assertEqual(len(cache), 2)
+
+    def test_info(self):
+        cache = LruCache(4)
+        cache.put('a', 1)
+        cache.get('a')
+        cache.get('b')
+
+        self.assertDictEqual(cache.info(), {
+            'hits': 1,
+            'misses': 1,
+            'size': 1,
+            'maxsize': 4,
+            'hit_rate': 0.5,
+        })
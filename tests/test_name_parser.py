@@ -48,6 +48,22 @@ PARSE = {
     'string[]': [[
         ('string', ('[]', []))
     ]],
+    'List{{T}}': [[
+        ('List', ('<>', [[('T', None)]]))
+    ]],
+    'Dictionary{string, int[]}': [[
+        ('Dictionary', ('<>', [
+            [('string', None)],
+            [('int', ('[]', []))],
+        ]))
+    ]],
+    'abc{': None,
+    'abc{{': None,
+    'abc{{T': None,
+    'abc{{T}': None,
+    'abc[a': None,
+    'abc<>': None,
+    'a,': None,
 }
 
 
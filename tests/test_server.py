@@ -0,0 +1,116 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import yaml
+
+from server import PageServer
+from test_docfxmd import API_DIR, DOCUMENTS, write_documents, read_tree
+import docfxmd
+
+
+class PageServerTest(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmpdir = tempfile.TemporaryDirectory() #pylint: disable=consider-using-with
+        os.chdir(self.tmpdir.name)
+        write_documents(API_DIR, DOCUMENTS)
+
+        docfxmd.build_directory(API_DIR, 'out', namespace_index='!Namespaces')
+        self.tree = read_tree('out')
+        self.app = PageServer(API_DIR, page_cache_size=2)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.tmpdir.cleanup()
+
+    def get(self, path):
+        result = {}
+        def start_response(status, headers):
+            result['status'] = status
+        body = b''.join(self.app({'PATH_INFO': path}, start_response))
+        return result['status'], body.decode('utf-8')
+
+    def test_pages(self):
+        self.assertEqual(self.get('/Ns.Foo.md'), ('200 OK', self.tree['Ns.Foo.md']))
+        self.assertEqual(self.get('/Ns.Bar-1'), ('200 OK', self.tree['Ns.Bar-1.md']))
+        self.assertEqual(self.get('/Ns.Bar'), ('200 OK', self.tree['Ns.Bar-1.md']))
+        self.assertEqual(self.get('/uid/Ns.Kind.A'), ('200 OK', self.tree['Ns.Kind.md']))
+        self.assertEqual(self.get('/'), ('200 OK', self.tree['!Namespaces.md']))
+        self.assertEqual(self.get('/Missing.md')[0], '404 Not Found')
+        self.assertEqual(self.get('/uid/Missing')[0], '404 Not Found')
+        self.assertEqual(self.get('/toc')[0], '404 Not Found')
+
+    def test_startup(self):
+        # nothing is parsed until a page needs it
+        self.assertEqual(self.app.stats()['loaded_files'], 0)
+        self.get('/Ns.Kind.md')
+        self.assertEqual(self.app.stats()['loaded_files'], 1)
+
+    def test_dependencies(self):
+        self.assertEqual(self.get('/Ns.md'), ('200 OK', self.tree['Ns.md']))
+        self.assertEqual(self.get('/uid/Ns.Kind.A')[0], '200 OK')
+
+        items = DOCUMENTS['Ns.Kind']['items']
+        self.rewrite('Ns.Kind', [dict(items[0], name='Kinds'), dict(items[1], uid='Ns.Kind.B')])
+
+        # the namespace page lists the changed type, the old uid is gone
+        self.assertIn('Kinds', self.get('/Ns.md')[1])
+        self.assertEqual(self.get('/uid/Ns.Kind.A')[0], '404 Not Found')
+        self.assertEqual(self.get('/uid/Ns.Kind.B')[0], '200 OK')
+        # both the namespace page and the enum page read Ns.Kind
+        self.assertEqual(self.app.stats()['invalidated'], 2)
+
+    def rewrite(self, basename, items):
+        path = os.path.join(API_DIR, basename + '.yml')
+        stat = os.stat(path)
+        with open(path, 'w', encoding='utf-8') as file:
+            yaml.safe_dump({'items': items}, file)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+
+    def test_cache(self):
+        self.get('/Ns.Foo.md')
+        self.get('/Ns.Foo.md')
+        self.get('/Ns.md')
+        self.get('/Ns.Kind.md')
+
+        items = DOCUMENTS['Ns.Kind']['items']
+        self.rewrite('Ns.Kind', [dict(items[0], name='Kinds')] + items[1:])
+
+        self.assertIn('# Enum Kinds', self.get('/Ns.Kind.md')[1])
+        self.get('/Ns.Foo.md')
+
+        stats = json.loads(self.get('/_stats')[1])
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['misses'], 4)
+        self.assertEqual(stats['invalidated'], 1)
+        self.assertEqual(stats['cached_pages'], 2)
+        self.assertIsNotNone(stats['render_ms']['p50'])
+
+    def test_added_pages(self):
+        kind = os.path.join(API_DIR, 'Ns.Kind.yml')
+        with open(kind, 'rb') as file:
+            data = file.read()
+        os.remove(kind)
+        self.app = PageServer(API_DIR)
+        self.assertNotEqual(self.get('/Ns.Foo.md')[1], self.tree['Ns.Foo.md'])
+
+        # unknown paths only walk the directory again once it changed
+        with mock.patch('os.walk', wraps=os.walk) as walk:
+            for _ in range(3):
+                self.assertEqual(self.get('/favicon.ico')[0], '404 Not Found')
+            self.assertEqual(walk.call_count, 0)
+
+            stat = os.stat(API_DIR)
+            with open(kind, 'wb') as file:
+                file.write(data)
+            os.utime(API_DIR, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+
+            self.assertEqual(self.get('/Ns.Kind.md'), ('200 OK', self.tree['Ns.Kind.md']))
+            self.assertEqual(self.get('/favicon.ico')[0], '404 Not Found')
+            self.assertEqual(walk.call_count, 1)
+
+        # the page rendered before Ns.Kind existed links to it now
+        self.assertEqual(self.get('/Ns.Foo.md'), ('200 OK', self.tree['Ns.Foo.md']))
@@ -0,0 +1,97 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+
+from writer import FragmentWriter, OutputWriter, ThreadedWriter, WRITTEN, UNCHANGED, DELETED
+from writer import OUTPUTS_NAME
+
+
+SECTIONS = [
+    [],
+    [None],
+    ['a'],
+    ['a\n', None, 'b\n'],
+    [None, '', None, 'c'],
+]
+
+
+class WriterTest(unittest.TestCase):
+    def test_sections(self):
+        for sections in SECTIONS:
+            for sink in (None, io.StringIO()):
+                out = FragmentWriter(sink)
+                writer = out.sections()
+                for section in sections:
+                    writer.write(section)
+
+                self.assertEqual(
+                    out.getvalue(),
+                    '\n'.join(filter(lambda x: x is not None, sections))
+                )
+
+
+class OutputWriterTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory() #pylint: disable=consider-using-with
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_write(self):
+        writer = OutputWriter()
+        path = os.path.join(self.tmpdir.name, 'a', 'b', 'page.md')
+
+        self.assertEqual(writer.write(path, ['# a', '\n']), WRITTEN)
+        mtime = os.stat(path).st_mtime_ns
+        self.assertEqual(writer.write(path, ['# ', 'a\n']), UNCHANGED)
+        self.assertEqual(os.stat(path).st_mtime_ns, mtime)
+
+        for fragments in (['# b\n'], ['# a\n\n'], []):
+            self.assertEqual(writer.write(path, fragments), WRITTEN)
+            with open(path, 'r', encoding='utf-8') as file:
+                self.assertEqual(file.read(), ''.join(fragments))
+
+        self.assertListEqual(os.listdir(os.path.dirname(path)), ['page.md'])
+
+    def test_prune(self):
+        writer = OutputWriter()
+        names = ('a.md', 'b.md', 'Home.md', os.path.join('.git', 'c.md'))
+        paths = [os.path.join(self.tmpdir.name, name) for name in names]
+        for path in paths:
+            writer.write(path, ['x'])
+
+        # nothing is recorded yet, so nothing is removed
+        self.assertListEqual(writer.prune(self.tmpdir.name, paths[:2]), [])
+        with open(os.path.join(self.tmpdir.name, OUTPUTS_NAME), 'w', encoding='utf-8') as file:
+            json.dump(['a.md', 'b.md', '.git/c.md', '../d.md'], file)
+
+        self.assertListEqual(writer.prune(self.tmpdir.name, paths[:1]), [paths[1]])
+        self.assertListEqual(
+            sorted(os.listdir(self.tmpdir.name)), sorted(['.git', OUTPUTS_NAME, 'Home.md', 'a.md'])
+        )
+        self.assertTrue(os.path.exists(paths[3]))
+        self.assertIsNone(writer.remove(paths[1]))
+        self.assertEqual(writer.remove(paths[2]), DELETED)
+
+    def test_threaded(self):
+        writer = OutputWriter()
+        paths = [os.path.join(self.tmpdir.name, str(num % 3), '%d.md' % num) for num in range(20)]
+        writer.write(paths[0], ['0'])
+
+        threaded = ThreadedWriter(writer, 3, 2)
+        for num, path in enumerate(paths):
+            threaded.write(path, [str(num)])
+        threaded.close()
+
+        self.assertDictEqual(writer.counts, {WRITTEN: 19, UNCHANGED: 1, DELETED: 0})
+        for num, path in enumerate(paths):
+            with open(path, 'r', encoding='utf-8') as file:
+                self.assertEqual(file.read(), str(num))
+
+    def test_threaded_error(self):
+        threaded = ThreadedWriter(OutputWriter(), 2)
+        threaded.write(self.tmpdir.name, ['a directory'])
+        with self.assertRaises(OSError):
+            threaded.close()
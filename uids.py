@@ -0,0 +1,69 @@
+from item_md import MEMBER_TYPES, TYPE_ENUM, TYPE_FIELD, escape_anchor
+
+
+def page_anchors(items):
+    # repeated headers get -1, -2, ... appended to their anchor like the wiki does,
+    # enum fields are rows of a table and have no header to link to
+    enum_page = len(items) != 0 and items[0].type == TYPE_ENUM
+    anchors = {}
+    seen = {}
+    for itm in items:
+        if itm.type not in MEMBER_TYPES or (enum_page and itm.type == TYPE_FIELD):
+            continue
+
+        anchor = escape_anchor(itm.name)
+        num = seen.get(anchor, 0)
+        seen[anchor] = num + 1
+        anchors[itm.uid] = anchor if num == 0 else '%s-%d' % (anchor, num)
+    return anchors
+
+
+class UidTable:
+    def __init__(self):
+        # basename -> ItemRef of the items the file declares, in render order
+        self.items_by_file = {}
+        self.items = {}
+
+        # uid -> basename of the file that declares it, also for files that are not loaded
+        self.sources = {}
+
+        # basename -> {member uid: anchor of its header}, built when a link first needs it
+        self.anchors = {}
+
+        # member uid -> link of its type page that has no header for it
+        self.broken_anchors = {}
+
+    def add_items(self, basename, items):
+        self.items_by_file[basename] = items
+        self.anchors.pop(basename, None)
+
+        for itm in items:
+            self.items[itm.uid] = itm
+            self.sources[itm.uid] = basename
+
+    def remove_items(self, basename):
+        self.anchors.pop(basename, None)
+
+        items = self.items_by_file.pop(basename, [])
+        for itm in items:
+            if self.sources.get(itm.uid) == basename:
+                del self.sources[itm.uid]
+                self.items.pop(itm.uid, None)
+        return items
+
+    def add_source(self, uid, basename):
+        self.sources[uid] = basename
+
+    def page_anchors(self, basename):
+        anchors = self.anchors.get(basename)
+        if anchors is None:
+            anchors = self.anchors[basename] = page_anchors(self.items_by_file.get(basename, []))
+        return anchors
+
+    def broken_anchor(self, uid, link):
+        self.broken_anchors[uid] = link
+
+    def take_broken_anchors(self):
+        broken = self.broken_anchors
+        self.broken_anchors = {}
+        return broken
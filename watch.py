@@ -0,0 +1,131 @@
+import os
+import sys
+
+import yaml
+
+
+DEFAULT_WATCH_INTERVAL = 1.0
+
+
+class Watcher:
+    # keeps a DocfxMd in sync with its yml directory and finds the pages an edit affects
+    def __init__(self, doc_md):
+        self.doc_md = doc_md
+
+        # path -> (mtime, size) of every yml file loaded so far
+        self.inputs = {}
+
+        # basename -> (links, items) the page looked up when it was last rendered,
+        # and the reverse maps from each link name and uid to the pages that looked it up
+        self.references = {}
+        self.link_referrers = {}
+        self.item_referrers = {}
+
+    def scan(self):
+        inputs = {}
+        for root, _, files in os.walk(self.doc_md.link_index.root):
+            for fname in files:
+                if not fname.endswith('.yml'):
+                    continue
+
+                path = os.path.join(root, fname)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                inputs[path] = (stat.st_mtime_ns, stat.st_size)
+        return inputs
+
+    def poll(self):
+        # returns the basenames of the pages to render and {basename: path} of removed inputs
+        doc_md = self.doc_md
+        inputs = self.scan()
+
+        changed = [path for path, stat in inputs.items() if self.inputs.get(path) != stat]
+        removed = {
+            basename_of(path): path for path in self.inputs if path not in inputs
+        }
+        if len(changed) == 0 and len(removed) == 0:
+            return set(), removed
+
+        links = self.reindex(changed, removed)
+
+        uids = set()
+        for basename, path in removed.items():
+            uids.update(itm.uid for itm in doc_md.uids.items_by_file.get(basename, []))
+            doc_md.remove_file(basename)
+            if doc_md.link_index.file_names.get(basename) == path:
+                del doc_md.link_index.file_names[basename]
+            del self.inputs[path]
+            self.remove_page(basename)
+
+        pages = set()
+        for path in changed:
+            if self.reload(path, uids):
+                pages.add(basename_of(path))
+            self.inputs[path] = inputs[path]
+
+        # rendered names and links may point at what was just reloaded
+        doc_md.names.clear()
+
+        for name in links:
+            pages.update(self.link_referrers.get(name, ()))
+        for uid in uids:
+            pages.update(self.item_referrers.get(uid, ()))
+        pages.difference_update(removed.keys())
+        return pages, removed
+
+    def reindex(self, changed, removed):
+        # returns the link names that resolve to another page once files were added or removed
+        link_index = self.doc_md.link_index
+        if link_index.links is not None and not removed and all(
+                path in self.inputs for path in changed):
+            return set()
+
+        old_links = link_index.links or {}
+        link_index.index_directory()
+        return set(
+            name for name in old_links.keys() | link_index.links.keys()
+            if old_links.get(name) != link_index.links.get(name)
+        )
+
+    def reload(self, path, uids):
+        # adds the uids the file declared before and after to uids, returns whether it loaded
+        basename = basename_of(path)
+        try:
+            data = self.doc_md.documents.parse_file(path)
+        except (OSError, yaml.YAMLError) as exc:
+            # the last good version stays loaded until the file changes again
+            sys.stderr.write('failed to load %s: %s\n' % (path, exc))
+            return False
+
+        uids.update(itm.uid for itm in self.doc_md.uids.items_by_file.get(basename, []))
+        self.doc_md.remove_file(basename)
+        self.doc_md.add_file(path, data)
+        uids.update(itm.uid for itm in self.doc_md.uids.items_by_file.get(basename, []))
+        return True
+
+    def update_page(self, basename, links, items):
+        self.remove_page(basename)
+        self.references[basename] = (links, items)
+
+        for name in links:
+            self.link_referrers.setdefault(name, set()).add(basename)
+        for uid in items:
+            self.item_referrers.setdefault(uid, set()).add(basename)
+
+    def remove_page(self, basename):
+        references = self.references.pop(basename, None)
+        if references is None:
+            return
+
+        links, items = references
+        for name in links:
+            self.link_referrers[name].discard(basename)
+        for uid in items:
+            self.item_referrers[uid].discard(basename)
+
+
+def basename_of(path):
+    basename = os.path.basename(path)
+    return basename[:-4] if basename.endswith('.yml') else basename
@@ -0,0 +1,343 @@
+import io
+import json
+import os
+import queue
+import sys
+import tarfile
+import tempfile
+import threading
+import time
+import zipfile
+
+
+class FragmentWriter:
+    def __init__(self, sink=None):
+        self.sink = sink
+        self.fragments = []
+
+        # anything with a write method works as a sink, such as files and io.StringIO
+        self.write = self.fragments.append if sink is None else sink.write
+
+    def getvalue(self):
+        if self.sink is not None:
+            return self.sink.getvalue()
+        return ''.join(self.fragments)
+
+    def sections(self):
+        return SectionWriter(self)
+
+
+class SectionWriter:
+    # writes what '\n'.join of the sections that are not None would return
+    def __init__(self, out):
+        self.out = out
+        self.empty = True
+
+    def start(self):
+        if not self.empty:
+            self.out.write('\n')
+        self.empty = False
+        return self.out
+
+    def write(self, section):
+        if section is not None:
+            self.start().write(section)
+
+
+WRITTEN = 'written'
+UNCHANGED = 'unchanged'
+DELETED = 'deleted'
+
+DEFAULT_MAX_PENDING = 64
+
+FORMAT_DIRECTORY = 'directory'
+FORMAT_ZIP = 'zip'
+FORMAT_TAR = 'tar'
+FORMAT_JSONL = 'jsonl'
+
+OUTPUT_FORMATS = (FORMAT_DIRECTORY, FORMAT_ZIP, FORMAT_TAR, FORMAT_JSONL)
+
+OUTPUT_SUFFIXES = (
+    ('.zip', FORMAT_ZIP, None),
+    ('.tar', FORMAT_TAR, 'w'),
+    ('.tar.gz', FORMAT_TAR, 'w:gz'),
+    ('.tgz', FORMAT_TAR, 'w:gz'),
+    ('.tar.bz2', FORMAT_TAR, 'w:bz2'),
+    ('.tar.xz', FORMAT_TAR, 'w:xz'),
+    ('.jsonl', FORMAT_JSONL, None),
+)
+
+STDOUT_NAME = '-'
+
+# pages written by the last pruning build, relative to the output directory
+OUTPUTS_NAME = '.docfxmd-outputs.json'
+
+
+def output_format(output_name):
+    if output_name == STDOUT_NAME:
+        return FORMAT_JSONL
+    for suffix, name, _ in OUTPUT_SUFFIXES:
+        if output_name.lower().endswith(suffix):
+            return name
+    return FORMAT_DIRECTORY
+
+def open_output(output_name, format_name=None):
+    if format_name is None:
+        format_name = output_format(output_name)
+
+    if format_name == FORMAT_DIRECTORY:
+        return OutputWriter()
+    if format_name == FORMAT_ZIP:
+        return ZipWriter(output_name)
+    if format_name == FORMAT_TAR:
+        mode = 'w'
+        for suffix, _, suffix_mode in OUTPUT_SUFFIXES:
+            if suffix_mode is not None and output_name.lower().endswith(suffix):
+                mode = suffix_mode
+        return TarWriter(output_name, mode)
+    if format_name == FORMAT_JSONL:
+        return JsonlWriter(output_name)
+    raise ValueError('unknown output format %s' % format_name)
+
+
+class BaseWriter:
+    stdout = False
+
+    def __init__(self):
+        self.counts = {WRITTEN: 0, UNCHANGED: 0, DELETED: 0}
+
+    def count(self, status, num=1):
+        if status is not None:
+            self.counts[status] += num
+
+    def close(self):
+        pass
+
+
+class OutputWriter(BaseWriter):
+    # replaces files atomically and leaves the ones whose content did not change untouched
+    def __init__(self):
+        super().__init__()
+        self.dirs = set()
+
+        # temporary files are created readable by the owner only, give them the usual mode
+        umask = os.umask(0)
+        os.umask(umask)
+        self.mode = 0o666 & ~umask
+
+    def makedirs(self, dname):
+        if dname not in self.dirs:
+            os.makedirs(dname, exist_ok=True)
+            self.dirs.add(dname)
+
+    def write(self, path, fragments):
+        chunks = encode_fragments(fragments)
+        if same_content(path, chunks):
+            return UNCHANGED
+
+        dname = os.path.dirname(path) or os.curdir
+        self.makedirs(dname)
+
+        fd, tmp_path = tempfile.mkstemp(
+            dir=dname, prefix='.%s.' % os.path.basename(path), suffix='.tmp'
+        )
+        try:
+            with os.fdopen(fd, 'wb') as file:
+                file.writelines(chunks)
+            os.chmod(tmp_path, self.mode)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        return WRITTEN
+
+    def remove(self, path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            return None
+        return DELETED
+
+    def prune(self, dname, keep):
+        # only pages an earlier pruning build recorded are removed, anything else in the
+        # directory, like hand written pages or a .git directory, is never looked at
+        record = os.path.join(dname, OUTPUTS_NAME)
+        keep = {os.path.relpath(path, dname).replace(os.sep, '/') for path in keep}
+
+        removed = []
+        for name in load_outputs(record):
+            parts = name.split('/')
+            if name in keep or '..' in parts or any(part.startswith('.') for part in parts):
+                continue
+
+            path = os.path.join(dname, *parts)
+            if self.remove(path) is not None:
+                removed.append(path)
+
+        self.makedirs(dname)
+        with open(record, 'w', encoding='utf-8') as file:
+            json.dump(sorted(keep), file, indent=1)
+        return removed
+
+
+class StreamWriter(BaseWriter):
+    # writes every page into one file, pages are named by their path relative to the output
+    # name, so nothing is created per page
+    def __init__(self, output_name):
+        super().__init__()
+        self.output_name = output_name
+        self.lock = threading.Lock()
+
+        dname = os.path.dirname(output_name)
+        if output_name != STDOUT_NAME and dname != '':
+            os.makedirs(dname, exist_ok=True)
+
+    def write(self, path, fragments):
+        name = os.path.relpath(path, self.output_name).replace(os.sep, '/')
+        with self.lock:
+            self.add(name, ''.join(fragments))
+        return WRITTEN
+
+    def add(self, name, data):
+        raise NotImplementedError()
+
+    def remove(self, path): #pylint: disable=unused-argument
+        return None
+
+    def prune(self, dname, keep): #pylint: disable=unused-argument
+        # archives and streams start out empty, there is nothing stale in them
+        return []
+
+
+class ZipWriter(StreamWriter):
+    def __init__(self, output_name):
+        super().__init__(output_name)
+        self.date_time = time.localtime()[:6]
+        self.archive = zipfile.ZipFile(output_name, 'w') #pylint: disable=consider-using-with
+
+    def add(self, name, data):
+        info = zipfile.ZipInfo(name, self.date_time)
+        info.compress_type = zipfile.ZIP_DEFLATED
+        info.external_attr = 0o644 << 16
+        self.archive.writestr(info, data.encode('utf-8'))
+
+    def close(self):
+        self.archive.close()
+
+
+class TarWriter(StreamWriter):
+    def __init__(self, output_name, mode='w'):
+        super().__init__(output_name)
+        self.mtime = int(time.time())
+        self.archive = tarfile.open(output_name, mode) #pylint: disable=consider-using-with
+
+    def add(self, name, data):
+        data = data.encode('utf-8')
+        info = tarfile.TarInfo(name)
+        info.size = len(data)
+        info.mtime = self.mtime
+        info.mode = 0o644
+        self.archive.addfile(info, io.BytesIO(data))
+
+    def close(self):
+        self.archive.close()
+
+
+class JsonlWriter(StreamWriter):
+    # one {"path": ..., "markdown": ...} record per line, to a file or to stdout
+    def __init__(self, output_name):
+        super().__init__(output_name)
+        if output_name == STDOUT_NAME:
+            self.stdout = True
+            self.file = sys.stdout
+        else:
+            #pylint: disable=consider-using-with
+            self.file = open(output_name, 'w', encoding='utf-8')
+
+    def add(self, name, data):
+        self.file.write(json.dumps({'path': name, 'markdown': data}, ensure_ascii=False) + '\n')
+
+    def close(self):
+        if self.stdout:
+            self.file.flush()
+        else:
+            self.file.close()
+
+
+class PageCollector:
+    # keeps the pages for the process that owns the output to write them
+    def __init__(self):
+        self.pages = []
+
+    def write(self, path, fragments):
+        self.pages.append((path, ''.join(fragments)))
+
+
+class ThreadedWriter:
+    # pages are handed to writer threads so rendering goes on while earlier pages are written,
+    # at most max_pending rendered pages wait in memory before write blocks
+    def __init__(self, writer, threads, max_pending=DEFAULT_MAX_PENDING):
+        self.writer = writer
+        self.queue = queue.Queue(max(max_pending, 1))
+        self.lock = threading.Lock()
+        self.error = None
+
+        self.threads = [threading.Thread(target=self._run, daemon=True) for _ in range(threads)]
+        for thread in self.threads:
+            thread.start()
+
+    def write(self, path, fragments):
+        if self.error is not None:
+            raise self.error
+        self.queue.put((path, fragments))
+
+    def close(self):
+        for _ in self.threads:
+            self.queue.put(None)
+        for thread in self.threads:
+            thread.join()
+        if self.error is not None:
+            raise self.error
+
+    def _run(self):
+        while True:
+            task = self.queue.get()
+            if task is None:
+                return
+            if self.error is not None:
+                continue
+
+            try:
+                status = self.writer.write(*task)
+            except Exception as exc: #pylint: disable=broad-except
+                self.error = exc
+                continue
+            with self.lock:
+                self.writer.count(status)
+
+
+def load_outputs(record):
+    try:
+        with open(record, 'r', encoding='utf-8') as file:
+            names = json.load(file)
+    except (FileNotFoundError, ValueError):
+        return []
+    return [name for name in names if isinstance(name, str)] if isinstance(names, list) else []
+
+def encode_fragments(fragments):
+    # the same bytes a file opened in text mode would have written
+    if os.linesep != '\n':
+        return [fragment.replace('\n', os.linesep).encode('utf-8') for fragment in fragments]
+    return [fragment.encode('utf-8') for fragment in fragments]
+
+def same_content(path, chunks):
+    try:
+        if os.stat(path).st_size != sum(map(len, chunks)):
+            return False
+        with open(path, 'rb') as file:
+            for chunk in chunks:
+                if file.read(len(chunk)) != chunk:
+                    return False
+    except FileNotFoundError:
+        return False
+    return True